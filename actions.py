@@ -0,0 +1,230 @@
+import time
+from bisect import bisect_left
+
+from dog import tracks_changes
+
+
+class ActionError(Exception):
+    """未知动作或参数不合法"""
+
+
+class ActionStats:
+    """单个动作的调用次数、错误次数和耗时直方图"""
+
+    # 直方图各桶的上限（毫秒），最后一个桶收集更慢的调用
+    BUCKETS = [0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 25, 50, 100]
+
+    def __init__(self):
+        self.calls = 0
+        self.errors = 0
+        self.total_time = 0.0
+        self.max_time = 0.0
+        self.histogram = [0] * (len(self.BUCKETS) + 1)
+
+    def record(self, elapsed):
+        self.calls += 1
+        self.total_time += elapsed
+        self.max_time = max(self.max_time, elapsed)
+        self.histogram[bisect_left(self.BUCKETS, elapsed * 1000)] += 1
+
+    def percentile(self, fraction):
+        """按直方图估计的分位数（取所在桶的上限，毫秒）"""
+        if not self.calls:
+            return 0
+        target = fraction * self.calls
+        count = 0
+        for i, bucket_count in enumerate(self.histogram):
+            count += bucket_count
+            if count >= target:
+                return self.BUCKETS[i] if i < len(self.BUCKETS) else round(self.max_time * 1000, 3)
+        return round(self.max_time * 1000, 3)
+
+    def stats(self):
+        labels = [f"<={bucket}ms" for bucket in self.BUCKETS] + [f">{self.BUCKETS[-1]}ms"]
+        return {
+            "calls": self.calls,
+            "errors": self.errors,
+            "avg_ms": round(self.total_time / self.calls * 1000, 4) if self.calls else 0,
+            "p50_ms": self.percentile(0.5),
+            "p99_ms": self.percentile(0.99),
+            "max_ms": round(self.max_time * 1000, 3),
+            "histogram": {label: count for label, count in zip(labels, self.histogram) if count}
+        }
+
+
+class Action:
+    """注册的动作：处理函数、参数声明（参数名 -> (类型, 默认值)）和统计
+
+    类型可以是元组，此时接受其中任一类型，需要转换时使用第一个。
+    """
+
+    def __init__(self, name, handler, params):
+        self.name = name
+        self.handler = handler
+        self.params = params
+        self.stats = ActionStats()
+
+    def parse_params(self, params):
+        """按声明取出参数：缺省时使用默认值，类型不符时尝试转换"""
+        values = {}
+        for key, (kind, default) in self.params.items():
+            value = params.get(key) if params else None
+            if value is None:
+                values[key] = default
+            elif isinstance(value, kind):
+                values[key] = value
+            else:
+                convert = kind[0] if isinstance(kind, tuple) else kind
+                try:
+                    values[key] = convert(value)
+                except (TypeError, ValueError):
+                    raise ActionError(f"动作 {self.name} 的参数 {key} 应为 {convert.__name__}")
+        return values
+
+
+class ActionRegistry:
+    """动作注册表：动作名直接查表找到处理函数，新增动作不会增加分发开销
+
+    处理函数的签名为 handler(target, **params)，返回给玩家看的结果文字。
+    """
+
+    def __init__(self):
+        self.actions = {}
+
+    def register(self, name, handler=None, **params):
+        """注册动作，可作为装饰器使用：@registry.register("feed", food_type=(str, "普通狗粮"))"""
+        if handler is None:
+            return lambda func: self.register(name, func, **params)
+        self.actions[name] = Action(name, handler, params)
+        return handler
+
+    def __contains__(self, name):
+        return name in self.actions
+
+    def prepare(self, name, params=None):
+        """查找动作并检查参数，返回可以直接执行的 (动作, 参数)"""
+        action = self.actions.get(name)
+        if action is None:
+            raise ActionError(f"未知的动作: {name}")
+        return action, action.parse_params(params)
+
+    def run(self, prepared, target):
+        """执行 prepare 返回的动作并记录耗时"""
+        action, values = prepared
+        start = time.perf_counter()
+        try:
+            return action.handler(target, **values)
+        except Exception:
+            action.stats.errors += 1
+            raise
+        finally:
+            action.stats.record(time.perf_counter() - start)
+
+    def dispatch(self, name, target, params=None):
+        """执行动作并记录耗时"""
+        return self.run(self.prepare(name, params), target)
+
+    def stats(self):
+        return {name: action.stats.stats() for name, action in self.actions.items() if action.stats.calls}
+
+
+# 宠物动作注册表，Web 端的 interact 事件和桌面版 UI 共用
+pet_actions = ActionRegistry()
+
+
+@pet_actions.register("feed", food_type=(str, "普通狗粮"))
+def feed(dog, food_type):
+    return dog.feed(food_type)
+
+
+@pet_actions.register("play", game_type=(str, "普通玩耍"))
+def play(dog, game_type):
+    return dog.play(game_type)
+
+
+@pet_actions.register("clean")
+def clean(dog):
+    return dog.bath()
+
+
+@pet_actions.register("sleep", duration=((int, float), 8), is_day=(bool, False))
+def sleep(dog, duration, is_day):
+    return dog.sleep(duration, is_day=is_day)
+
+
+@pet_actions.register("train", skill=(str, "坐下"))
+def train(dog, skill):
+    return dog.train(skill)
+
+
+@pet_actions.register("pet")
+def pet(dog):
+    return dog.pet()
+
+
+# 可以通过语音命令表演的技能
+SKILL_COMMANDS = {'坐下', '握手', '打滚', '接飞盘', '捡球', '原地等待'}
+
+# 语音命令中的关键词 -> 对应的动作（按顺序匹配）
+VOICE_KEYWORDS = [
+    (('喂', '吃'), lambda dog: dog.feed('普通狗粮')),
+    (('玩',), lambda dog: dog.play('普通玩耍')),
+    (('洗澡', '清洁'), lambda dog: dog.bath()),
+    (('睡',), lambda dog: dog.sleep(8)),
+]
+
+
+@pet_actions.register("voice_command", command=(str, ''))
+@tracks_changes
+def voice_command(dog, command):
+    if command in SKILL_COMMANDS:
+        # 如果是技能命令
+        if command in dog.skills:
+            dog.happiness = min(100, dog.happiness + 5)
+            return f"{dog.name}听到你的命令，表演了{command}！"
+        return f"{dog.name}似乎不理解\"{command}\"命令，也许需要先训练这个技能？"
+    for keywords, perform in VOICE_KEYWORDS:
+        if any(keyword in command for keyword in keywords):
+            return perform(dog)
+    return f"{dog.name}疑惑地看着你，似乎不理解你的命令。"
+
+
+# 迷你游戏奖励规则：快乐度增加量、精力消耗量（按得分计算），
+# 已学会技能时每 level_divisor 分提升一级（最高5级），未学会时得分达到 learn_score 学会技能
+MINIGAME_REWARDS = {
+    "fetch": {"skill": "接飞盘", "happiness": lambda score: min(30, score * 2),
+              "energy": lambda score: min(40, 20 + score * 2), "level_divisor": 5, "learn_score": 3},
+    "maze": {"skill": "智力游戏", "happiness": lambda score: min(20, score),
+             "energy": lambda score: min(30, 15 + score), "level_divisor": 10, "learn_score": 5},
+    "race": {"skill": "障碍跑", "happiness": lambda score: min(20, score // 5),
+             "energy": lambda score: min(30, 10 + score // 5), "level_divisor": 20, "learn_score": 10},
+}
+
+
+@tracks_changes
+def apply_minigame_reward(dog, game_type, score):
+    """按规则表结算迷你游戏奖励，返回技能变化的提示（没有变化时为 None）"""
+    rule = MINIGAME_REWARDS.get(game_type)
+    if rule is None:
+        return None
+    dog.happiness = min(100, dog.happiness + rule["happiness"](score))
+    dog.energy = max(0, dog.energy - rule["energy"](score))
+
+    skill = rule["skill"]
+    if skill in dog.skills:
+        current_level = dog.skills[skill]
+        if current_level < 5:  # 最高5级
+            new_level = min(5, current_level + score // rule["level_divisor"])
+            if new_level > current_level:
+                dog.skills[skill] = new_level
+                return f"{dog.name}的\"{skill}\"技能提升到了Lv.{new_level}！"
+    elif score >= rule["learn_score"]:
+        dog.skills[skill] = 1
+        return f"{dog.name}学会了\"{skill}\"技能！"
+    return None
+
+
+@pet_actions.register("minigame", game_type=(str, 'fetch'), result=(dict, None))
+def minigame(dog, game_type, result):
+    score = (result or {}).get('score', 0)
+    return apply_minigame_reward(dog, game_type, score) or "操作完成"
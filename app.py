@@ -1,20 +1,90 @@
 from flask import Flask, render_template, jsonify, request
 from flask_socketio import SocketIO, emit
-from dog import Dog
+from dog import Dog, capture_state, changed_fields
+from population import PetPopulation
+from persistence import WriteBehindSaver, write_json_atomic
+from storage import open_storage, EventLogStorage
+from scheduler import SimulationScheduler
+from residency import ResidentPetCache
+from delta_sync import DeltaSync
+from actions import pet_actions, ActionError
+from rng import RandomStream, derive_seed
+import copy
+from contextlib import contextmanager
 import json
 import os
 import time
-import random
+import atexit
 
 app = Flask(__name__)
 app.config['SECRET_KEY'] = 'ai_pet_dog_secret'
+# 宠物状态更新方式：lazy=访问时按需精确推进，tick=后台每分钟整体更新所有宠物
+app.config['PET_UPDATE_MODE'] = os.environ.get('PET_UPDATE_MODE', 'lazy')
+# 存档合并写盘的时间窗口（秒），窗口内对同一宠物的多次保存只写一次
+app.config['SAVE_COALESCE_WINDOW'] = float(os.environ.get('SAVE_COALESCE_WINDOW', 2.0))
+# 宠物存档后端：json=每只宠物一个文件，binary=每只宠物一个二进制快照文件（snapshot.py），
+# sqlite=单个 WAL 模式数据库（可用 tools/migrate_saves.py 迁移），events=每只宠物一个只追加的事件日志加定期快照
+app.config['STORAGE_BACKEND'] = os.environ.get('STORAGE_BACKEND', 'json')
+# 事件日志后端下每追加多少个事件生成一次快照
+app.config['EVENT_SNAPSHOT_EVERY'] = int(os.environ.get('EVENT_SNAPSHOT_EVERY', 100))
+# 常驻内存的宠物上限（数量、估计内存）和空闲淘汰时间（秒），被淘汰的宠物保存后按需重新加载
+app.config['MAX_RESIDENT_PETS'] = int(os.environ.get('MAX_RESIDENT_PETS', 10000))
+app.config['MAX_RESIDENT_MEMORY_MB'] = float(os.environ.get('MAX_RESIDENT_MEMORY_MB', 256))
+app.config['PET_IDLE_TIMEOUT'] = float(os.environ.get('PET_IDLE_TIMEOUT', 1800))
+# 增量同步保留的历史版本数，客户端确认的版本比这更旧时发送全量
+app.config['SYNC_HISTORY'] = 64
+# 随机数种子：指定时新宠物的种子和世界的随机事件（天气、玩具位置）都由它确定，可以重现整个运行过程
+app.config['RANDOM_SEED'] = int(os.environ['RANDOM_SEED']) if os.environ.get('RANDOM_SEED') else None
+# 一次批量互动最多包含的动作数
+app.config['MAX_BATCH_ACTIONS'] = 200
+# 各周期任务的运行间隔（秒）
+app.config['CLOCK_INTERVAL'] = 60
+app.config['WEATHER_INTERVAL'] = 60
+app.config['PET_DECAY_INTERVAL'] = 60
+app.config['AUTOSAVE_INTERVAL'] = 60
+# tick 模式下把种群中有变化的宠物写回并保存的间隔（被访问或修改的宠物不受此限制）
+app.config['PET_SAVE_INTERVAL'] = 300
+app.config['BROADCAST_INTERVAL'] = 60
+app.config['EVICTION_INTERVAL'] = 60
+app.config['COMPACTION_INTERVAL'] = 60
 socketio = SocketIO(app)
 
-# 存储所有在线宠物
-pets = {}
+# 本次运行的启动时间
+SERVER_START_TIME = time.time()
+# 本次运行的随机数流，新宠物的种子由它的种子和宠物 ID 派生，天气等世界事件使用 world 子流
+session_rng = RandomStream(app.config['RANDOM_SEED'])
+world_rng = session_rng.spawn("world")
+# 在线宠物的数值属性（按列存储，后台任务整体更新）
+population = PetPopulation()
 # 数据保存路径
 SAVE_DIR = os.path.join(os.path.dirname(__file__), "data/saves/web")
 os.makedirs(SAVE_DIR, exist_ok=True)
+# 宠物存档后端
+storage_options = {'snapshot_every': app.config['EVENT_SNAPSHOT_EVERY']} if app.config['STORAGE_BACKEND'] == 'events' else {}
+storage = open_storage(app.config['STORAGE_BACKEND'], SAVE_DIR, **storage_options)
+# 事件日志后端下宠物的每次修改追加为一个事件，不再整体重写存档
+event_log = storage if isinstance(storage, EventLogStorage) else None
+# 尚未追加到日志的事件（pet_id -> [事件, ...]），在保存宠物时写出
+pending_events = {}
+# 后写式存档，磁盘写入不占用请求处理时间
+saver = WriteBehindSaver(window=app.config['SAVE_COALESCE_WINDOW'])
+
+def emit_to(event, data, to, callback=None, skip_sid=None):
+    socketio.emit(event, data, to=to, callback=callback, skip_sid=skip_sid)
+
+def join_channel(sid, channel):
+    socketio.server.enter_room(sid, channel, namespace='/')
+
+def leave_channel(sid, channel):
+    socketio.server.leave_room(sid, channel, namespace='/')
+
+# 增量同步：每个宠物、每个环境分片一个房间，客户端只收到其确认版本之后变化的字段
+sync = DeltaSync(emit_to, join=join_channel, leave=leave_channel, max_history=app.config['SYNC_HISTORY'])
+# 环境分片房间（目前所有客户端共享一个环境）
+ENVIRONMENT_CHANNEL = "env:default"
+
+def pet_channel(pet_id):
+    return f"pet:{pet_id}"
 
 # 环境状态
 environment_state = {
@@ -27,26 +97,70 @@ environment_state = {
     "day": 0
 }
 
+def write_pets(items):
+    """把一批脏宠物写入存档后端（SQLite 下为一个事务）"""
+    storage.save_many([(pet_id, data) for (_, pet_id), data in items])
+
+def write_environment(items):
+    """把环境数据写入文件"""
+    write_json_atomic(os.path.join(SAVE_DIR, "environment.json"), items[-1][1])
+
+# 宠物最近一次保存、发布时的版本号（Dog.version），没有变化的宠物不再重复保存和发布
+saved_versions = {}
+published_versions = {}
+
+@contextmanager
+def pet_event(pet_id, dog, cmd, args=None):
+    """把 with 块内对宠物的修改记录为一个事件（命令、参数和变化了的属性的新值）
+
+    只在事件日志后端下记录；块内抛出异常时不记录。
+    """
+    if event_log is None:
+        yield
+        return
+    captured = capture_state(dog)
+    yield
+    changes = changed_fields(dog, captured)
+    changes['last_update_time'] = dog.last_update_time
+    events = pending_events.setdefault(pet_id, [])
+    if cmd == 'decay' and events and events[-1]['cmd'] == 'decay':
+        # 连续的时间推进合并成一个事件，重放结果相同
+        events[-1]['set'].update(changes)
+        events[-1]['time'] = time.time()
+        return
+    events.append({'time': time.time(), 'cmd': cmd, 'args': args or {}, 'set': changes})
+
+def append_pet_events(pet_id, dog):
+    """把宠物尚未写出的事件追加到日志，事件数达到阈值时生成快照"""
+    events = pending_events.pop(pet_id, None)
+    if events and event_log.append(pet_id, events):
+        event_log.snapshot(pet_id, dog.to_dict())
+
 def save_pet_data(pet_id, dog):
-    """保存宠物数据到文件"""
-    save_path = os.path.join(SAVE_DIR, f"{pet_id}.json")
-    with open(save_path, "w") as f:
-        json.dump(dog.to_dict(), f, indent=4)
+    """保存宠物数据（由后台线程合并写盘，事件日志后端下追加事件）"""
+    saved_versions[pet_id] = dog.version
+    if event_log is not None:
+        append_pet_events(pet_id, dog)
+        return
+    saver.mark_dirty(("pet", pet_id), write_pets, dog.to_dict())
+
+def save_pet_if_changed(pet_id, dog):
+    """宠物自上次保存以来有变化（或有未写出的事件）时才保存"""
+    if saved_versions.get(pet_id) != dog.version or pet_id in pending_events:
+        save_pet_data(pet_id, dog)
 
 def load_pet_data(pet_id):
-    """从文件加载宠物数据"""
-    save_path = os.path.join(SAVE_DIR, f"{pet_id}.json")
-    if os.path.exists(save_path):
-        with open(save_path, "r") as f:
-            dog_data = json.load(f)
+    """从存档后端加载宠物数据"""
+    # 先写出尚未落盘的修改，避免读到旧存档
+    saver.flush(key=("pet", pet_id))
+    dog_data = storage.load(pet_id)
+    if dog_data:
         return Dog.from_dict(dog_data)
     return None
 
 def save_environment_data():
-    """保存环境数据到文件"""
-    save_path = os.path.join(SAVE_DIR, "environment.json")
-    with open(save_path, "w") as f:
-        json.dump(environment_state, f, indent=4)
+    """保存环境数据到文件（由后台线程合并写盘）"""
+    saver.mark_dirty(("environment",), write_environment, environment_state)
 
 def load_environment_data():
     """从文件加载环境数据"""
@@ -56,6 +170,77 @@ def load_environment_data():
         with open(save_path, "r") as f:
             environment_state = json.load(f)
 
+def register_pet(pet_id, dog):
+    """把宠物加入在线列表"""
+    pets.put(pet_id, dog)
+    if app.config['PET_UPDATE_MODE'] == 'tick':
+        population.add(pet_id, dog)
+
+def refresh_pet(pet_id):
+    """读取宠物前把它的状态更新到当前时刻，找不到宠物时返回 None"""
+    dog = pets.get(pet_id)
+    if dog is None:
+        return None
+    with pet_event(pet_id, dog, 'decay'):
+        if app.config['PET_UPDATE_MODE'] == 'tick':
+            population.store_to_dog(pet_id, dog)
+        else:
+            dog.catch_up()
+    return dog
+
+def commit_pet(pet_id, dog):
+    """宠物被修改后同步状态并保存"""
+    if app.config['PET_UPDATE_MODE'] == 'tick':
+        population.load_from_dog(pet_id, dog)
+        population.mark_clean(pet_id)
+    pets.resize(pet_id)
+    save_pet_data(pet_id, dog)
+
+def reload_pet(pet_id):
+    """按需重新加载被淘汰出内存的宠物"""
+    dog = load_pet_data(pet_id)
+    # 只恢复本次运行中加载过的宠物，其他宠物需要先通过 create_pet 加载
+    if dog is None or dog.last_update_time < SERVER_START_TIME:
+        return None
+    # 淘汰期间时间照常流逝，直接推进到当前时刻
+    with pet_event(pet_id, dog, 'decay'):
+        dog.catch_up()
+    if app.config['PET_UPDATE_MODE'] == 'tick':
+        population.add(pet_id, dog)
+    return dog
+
+def evict_pet(pet_id, dog):
+    """宠物被移出内存前更新到当前时刻并保存"""
+    with pet_event(pet_id, dog, 'decay'):
+        if app.config['PET_UPDATE_MODE'] == 'tick':
+            population.store_to_dog(pet_id, dog)
+        else:
+            dog.catch_up()
+    if app.config['PET_UPDATE_MODE'] == 'tick':
+        population.remove(pet_id)
+    save_pet_if_changed(pet_id, dog)
+    saved_versions.pop(pet_id, None)
+    published_versions.pop(pet_id, None)
+    sync.drop(pet_channel(pet_id))
+
+# 常驻内存的在线宠物（LRU 缓存）
+pets = ResidentPetCache(
+    loader=reload_pet,
+    on_evict=evict_pet,
+    max_count=app.config['MAX_RESIDENT_PETS'],
+    max_memory=int(app.config['MAX_RESIDENT_MEMORY_MB'] * 1024 * 1024),
+    idle_timeout=app.config['PET_IDLE_TIMEOUT']
+)
+
+def shutdown():
+    """关闭服务前把所有宠物更新到当前时刻并写出全部未保存的数据"""
+    scheduler.stop()
+    pets.evict_all()
+    saver.stop()
+    storage.close()
+
+atexit.register(shutdown)
+
 # 尝试加载环境数据
 try:
     load_environment_data()
@@ -75,14 +260,25 @@ def create_pet():
     
     # 尝试加载已有宠物数据
     pet_id = name  # 简单起见，使用名字作为ID
-    existing_dog = load_pet_data(pet_id)
+    # 本次运行中加载过的宠物直接使用，磁盘上的存档可能不是最新状态
+    existing_dog = refresh_pet(pet_id)
+    if existing_dog is None:
+        existing_dog = load_pet_data(pet_id)
+        if existing_dog:
+            # 与逐分钟更新一致：宠物只在加载到内存后才随时间变化
+            with pet_event(pet_id, existing_dog, 'resume'):
+                existing_dog.last_update_time = time.time()
     
     if existing_dog:
         dog = existing_dog
     else:
-        dog = Dog(name, breed, personality)
+        dog = Dog(name, breed, personality, seed=derive_seed(session_rng.seed, pet_id))
+        if event_log is not None:
+            # 新宠物的日志从一个快照开始
+            pending_events.pop(pet_id, None)
+            event_log.save(pet_id, dog.to_dict())
     
-    pets[pet_id] = dog
+    register_pet(pet_id, dog)
     save_pet_data(pet_id, dog)
     
     return jsonify({
@@ -94,16 +290,45 @@ def create_pet():
 
 @app.route('/api/get_pet_status/<pet_id>')
 def get_pet_status(pet_id):
-    if pet_id not in pets:
+    dog = refresh_pet(pet_id)
+    if dog is None:
         return jsonify({'status': 'error', 'message': '找不到宠物'})
     
-    dog = pets[pet_id]
     return jsonify({
         'status': 'success',
         'pet_info': dog.get_status(),
         'environment': environment_state
     })
 
+@app.route('/api/server_stats')
+def server_stats():
+    stats = {
+        'status': 'success',
+        'online_pets': len(pets),
+        'residency': pets.stats(),
+        'broadcast': sync.stats(),
+        'actions': pet_actions.stats(),
+        'storage_backend': app.config['STORAGE_BACKEND'],
+        # 用相同的 RANDOM_SEED 重新启动可以重现本次运行
+        'random_seed': str(session_rng.seed),
+        'persistence': saver.stats(),
+        'scheduler': scheduler.stats()
+    }
+    if event_log is not None:
+        stats['event_log'] = event_log.stats()
+    return jsonify(stats)
+
+@app.route('/api/pet_history/<pet_id>')
+def get_pet_history(pet_id):
+    """宠物的事件记录（事件日志后端），?limit= 指定返回最近多少条"""
+    if event_log is None:
+        return jsonify({'status': 'error', 'message': '当前存储后端不记录事件'})
+    dog = pets.get(pet_id)
+    if dog is not None:
+        save_pet_if_changed(pet_id, dog)
+    limit = request.args.get('limit', 100, type=int)
+    return jsonify({'status': 'success', 'pet_id': pet_id, 'events': event_log.history(pet_id, limit)})
+
 @app.route('/api/get_environment')
 def get_environment():
     return jsonify({
@@ -117,9 +342,12 @@ def handle_interaction(data):
     action = data['action']
     params = data.get('params', {})
     
-    if pet_id not in pets and action != 'environment_action':
-        emit('interaction_response', {'status': 'error', 'message': '找不到宠物'})
-        return
+    dog = None
+    if action != 'environment_action':
+        dog = refresh_pet(pet_id)
+        if dog is None:
+            emit('interaction_response', {'status': 'error', 'message': '找不到宠物'})
+            return
     
     result = "操作完成"
     
@@ -132,7 +360,7 @@ def handle_interaction(data):
             result = f"天气变为{weather}"
         elif env_action.startswith('place_toy_'):
             toy_type = env_action.replace('place_toy_', '')
-            position = params.get('position', {'x': random.randint(100, 700), 'y': random.randint(150, 350)})
+            position = params.get('position', {'x': world_rng.randint(100, 700), 'y': world_rng.randint(150, 350)})
             environment_state['toys'].append({
                 'type': toy_type,
                 'position': position
@@ -145,182 +373,330 @@ def handle_interaction(data):
                 result = f"移除了{removed_toy['type']}玩具"
         
         save_environment_data()
-        emit('environment_update', environment_state)
+        sync.commit(ENVIRONMENT_CHANNEL, environment_state)
+        sync.publish(ENVIRONMENT_CHANNEL, 'environment_update')
     # 针对宠物的操作
     else:
-        dog = pets[pet_id]
-        
-        if action == 'feed':
-            food_type = params.get('food_type', '普通狗粮')
-            result = dog.feed(food_type)
-        elif action == 'play':
-            game_type = params.get('game_type', '普通玩耍')
-            result = dog.play(game_type)
-        elif action == 'clean':
-            result = dog.bath()
-        elif action == 'sleep':
-            duration = params.get('duration', 8)
-            result = dog.sleep(duration)
-        elif action == 'train':
-            skill = params.get('skill', '坐下')
-            result = dog.train(skill)
-        elif action == 'pet':
-            result = dog.pet()
-        elif action == 'voice_command':
-            command = params.get('command', '')
-            # 解析语音命令
-            if command in ['坐下', '握手', '打滚', '接飞盘', '捡球', '原地等待']:
-                # 如果是技能命令
-                if command in dog.skills:
-                    result = f"{dog.name}听到你的命令，表演了{command}！"
-                    dog.happiness = min(100, dog.happiness + 5)
-                else:
-                    result = f"{dog.name}似乎不理解\"{command}\"命令，也许需要先训练这个技能？"
-            elif '喂' in command or '吃' in command:
-                result = dog.feed('普通狗粮')
-            elif '玩' in command:
-                result = dog.play('普通玩耍')
-            elif '洗澡' in command or '清洁' in command:
-                result = dog.bath()
-            elif '睡' in command:
-                result = dog.sleep(8)
-            else:
-                result = f"{dog.name}疑惑地看着你，似乎不理解你的命令。"
-        elif action == 'minigame':
-            game_type = params.get('game_type', 'fetch')
-            game_result = params.get('result', {'score': 0})
-            
-            if game_type == 'fetch':
-                score = game_result.get('score', 0)
-                dog.happiness = min(100, dog.happiness + min(30, score * 2))
-                dog.energy = max(0, dog.energy - min(40, 20 + score * 2))
-                
-                # 更新接飞盘技能
-                if "接飞盘" in dog.skills:
-                    current_level = dog.skills["接飞盘"]
-                    if current_level < 5:  # 最高5级
-                        new_level = min(5, current_level + score // 5)
-                        if new_level > current_level:
-                            dog.skills["接飞盘"] = new_level
-                            result = f"{dog.name}的\"接飞盘\"技能提升到了Lv.{new_level}！"
-                elif score >= 3:
-                    dog.skills["接飞盘"] = 1
-                    result = f"{dog.name}学会了\"接飞盘\"技能！"
-            
-            elif game_type == 'maze':
-                score = game_result.get('score', 0)
-                dog.happiness = min(100, dog.happiness + min(20, score))
-                dog.energy = max(0, dog.energy - min(30, 15 + score))
-                
-                # 更新智力游戏技能
-                if "智力游戏" in dog.skills:
-                    current_level = dog.skills["智力游戏"]
-                    if current_level < 5:
-                        new_level = min(5, current_level + score // 10)
-                        if new_level > current_level:
-                            dog.skills["智力游戏"] = new_level
-                            result = f"{dog.name}的\"智力游戏\"技能提升到了Lv.{new_level}！"
-                elif score >= 5:
-                    dog.skills["智力游戏"] = 1
-                    result = f"{dog.name}学会了\"智力游戏\"技能！"
-            
-            elif game_type == 'race':
-                score = game_result.get('score', 0)
-                dog.happiness = min(100, dog.happiness + min(20, score // 5))
-                dog.energy = max(0, dog.energy - min(30, 10 + score // 5))
-                
-                # 更新障碍跑技能
-                if "障碍跑" in dog.skills:
-                    current_level = dog.skills["障碍跑"]
-                    if current_level < 5:
-                        new_level = min(5, current_level + score // 20)
-                        if new_level > current_level:
-                            dog.skills["障碍跑"] = new_level
-                            result = f"{dog.name}的\"障碍跑\"技能提升到了Lv.{new_level}！"
-                elif score >= 10:
-                    dog.skills["障碍跑"] = 1
-                    result = f"{dog.name}学会了\"障碍跑\"技能！"
+        try:
+            with pet_event(pet_id, dog, action, params):
+                result = pet_actions.dispatch(action, dog, params)
+        except ActionError as e:
+            emit('interaction_response', {'status': 'error', 'message': str(e)})
+            return
         
         # 保存宠物数据
-        save_pet_data(pet_id, dog)
+        commit_pet(pet_id, dog)
         
         emit('interaction_response', {
             'status': 'success',
             'message': result
         })
         
-        emit('pet_update', {
-            'pet_id': pet_id,
-            'pet_info': dog.get_status(),
-            'environment': environment_state
+        send_pet_update(request.sid, pet_id, dog)
+        # 同一宠物的其他订阅者也收到变化
+        publish_pet(pet_id)
+
+@socketio.on('interact_batch')
+def handle_interaction_batch(data):
+    """批量互动：按顺序执行多个宠物动作
+
+    每只宠物的动作要么全部生效要么全部不生效，每只宠物只保存一次，
+    最后返回一条合并的结果和每只宠物一条 pet_update。
+    """
+    actions = data.get('actions', []) if isinstance(data, dict) else None
+    if not isinstance(actions, list):
+        emit('interaction_batch_response', {'status': 'error', 'message': 'actions 应为动作列表'})
+        return
+    if len(actions) > app.config['MAX_BATCH_ACTIONS']:
+        emit('interaction_batch_response', {
+            'status': 'error',
+            'message': f"批量互动最多包含{app.config['MAX_BATCH_ACTIONS']}个动作"
         })
+        return
+    
+    # 按宠物分组，保持各自的动作顺序；格式不对、无法归到某只宠物的动作单独报错
+    results = [None] * len(actions)
+    batches = {}
+    for index, item in enumerate(actions):
+        if not isinstance(item, dict) or not isinstance(item.get('pet_id'), str):
+            results[index] = {
+                'index': index,
+                'pet_id': None,
+                'action': None,
+                'status': 'error',
+                'message': '动作应为包含 pet_id（字符串）的对象'
+            }
+            continue
+        batches.setdefault(item['pet_id'], []).append((index, item))
+    
+    pet_results = {}
+    for pet_id, items in batches.items():
+        pet_results[pet_id] = apply_pet_batch(pet_id, items, results)
+    
+    emit('interaction_batch_response', {
+        'status': 'success' if all(result['status'] == 'success' for result in results) else 'partial',
+        'pets': pet_results,
+        'results': results
+    })
+    
+    for pet_id, status in pet_results.items():
+        if status == 'success':
+            send_pet_update(request.sid, pet_id, pets.get(pet_id))
+            publish_pet(pet_id)
 
-# 定期更新宠物状态和环境的后台任务
-def background_task():
-    while True:
-        current_time = time.time()
-        
-        # 更新时间
-        environment_state["minute"] += 10
-        if environment_state["minute"] >= 60:
-            environment_state["hour"] += 1
-            environment_state["minute"] = 0
-            
-            if environment_state["hour"] >= 24:
-                environment_state["hour"] = 0
-                environment_state["day"] += 1
-                
-                # 每4天更换一次季节
-                if environment_state["day"] % 4 == 0:
-                    seasons = ["spring", "summer", "autumn", "winter"]
-                    current_index = seasons.index(environment_state["season"])
-                    next_index = (current_index + 1) % 4
-                    environment_state["season"] = seasons[next_index]
-        
-        # 白天/黑夜判断 (6:00-18:00为白天)
-        environment_state["is_day"] = 6 <= environment_state["hour"] < 18
-        
-        # 随机更改天气 (每3小时有20%的概率)
-        if environment_state["minute"] == 0 and environment_state["hour"] % 3 == 0 and random.random() < 0.2:
-            weathers = ["sunny", "rainy", "cloudy", "snowy"]
-            current_index = weathers.index(environment_state["weather"])
-            # 排除当前天气
-            possible_weathers = weathers[:current_index] + weathers[current_index+1:]
-            # 在冬天增加下雪的概率
-            if environment_state["season"] == "winter" and "snowy" in possible_weathers and random.random() < 0.5:
-                environment_state["weather"] = "snowy"
-            else:
-                environment_state["weather"] = random.choice(possible_weathers)
-        
-        # 保存环境状态
-        save_environment_data()
-        
-        # 更新所有宠物状态
-        for pet_id, dog in pets.items():
-            dog.update_status(60)  # 每分钟更新
-            save_pet_data(pet_id, dog)
-        
-        # 广播更新
-        socketio.emit('time_update', {
-            'time': {
-                'hour': environment_state["hour"],
-                'minute': environment_state["minute"],
-                'day': environment_state["day"],
-                'is_day': environment_state["is_day"]
+def apply_pet_batch(pet_id, items, results):
+    """对一只宠物执行一组动作，全部成功才提交，返回 success 或 error"""
+    def fail(message, failed_index=None):
+        for index, item in items:
+            results[index] = {
+                'index': index,
+                'pet_id': pet_id,
+                'action': item.get('action'),
+                'status': 'error',
+                'message': message if failed_index in (None, index) else '同一宠物的其他动作失败，未执行'
             }
-        })
-        
-        socketio.emit('environment_update', environment_state)
+        return 'error'
+    
+    dog = refresh_pet(pet_id)
+    if dog is None:
+        return fail('找不到宠物')
+    
+    # 先检查全部动作，有一个不合法就整组不执行
+    prepared = []
+    for index, item in items:
+        if not isinstance(item.get('action'), str):
+            return fail('动作名称应为字符串', index)
+        if not isinstance(item.get('params', {}), dict):
+            return fail('动作参数应为对象', index)
+        try:
+            prepared.append((index, item.get('action'), pet_actions.prepare(item.get('action'), item.get('params', {}))))
+        except ActionError as e:
+            return fail(str(e), index)
+    
+    backup = dog.copy()
+    events_backup = copy.deepcopy(pending_events.get(pet_id))
+    
+    def rollback():
+        """恢复到批量开始前的状态（包括尚未写出的事件）"""
+        register_pet(pet_id, backup)
+        pending_events.pop(pet_id, None)
+        if events_backup:
+            pending_events[pet_id] = events_backup
+    
+    messages = []
+    for index, name, action in prepared:
+        try:
+            with pet_event(pet_id, dog, name, action[1]):
+                messages.append((index, name, pet_actions.run(action, dog)))
+        except ActionError as e:
+            rollback()
+            return fail(str(e), index)
+        except Exception:
+            # 动作本身的错误：同样回滚，但不把异常内容发给客户端，记录后继续抛出
+            rollback()
+            app.logger.exception("批量互动执行出错: pet_id=%s, action=%s", pet_id, name)
+            raise
+    
+    commit_pet(pet_id, dog)
+    for index, name, message in messages:
+        results[index] = {
+            'index': index,
+            'pet_id': pet_id,
+            'action': name,
+            'status': 'success',
+            'message': message
+        }
+    return 'success'
+
+def publish_pet(pet_id):
+    """把宠物的变化发布到它的房间"""
+    sync.publish(pet_channel(pet_id), 'pet_update', lambda delta: {'pet_id': pet_id, 'pet_info': delta})
+
+def send_pet_update(sid, pet_id, dog):
+    """向客户端发送宠物（及环境）自其确认版本以来的变化"""
+    channel = pet_channel(pet_id)
+    sync.subscribe(sid, channel)
+    sync.commit(channel, dog.get_status(), digits=2)
+    sync.commit(ENVIRONMENT_CHANNEL, environment_state)
+    deltas = {channel: sync.delta_for(sid, channel)}
+    update = {'pet_id': pet_id, 'pet_info': sync.view(sid, channel, deltas[channel])}
+    if not sync.is_current(sid, ENVIRONMENT_CHANNEL):
+        deltas[ENVIRONMENT_CHANNEL] = sync.delta_for(sid, ENVIRONMENT_CHANNEL)
+        update['environment'] = sync.view(sid, ENVIRONMENT_CHANNEL, deltas[ENVIRONMENT_CHANNEL])
+    sync.send(sid, 'pet_update', update, deltas)
+
+@socketio.on('subscribe')
+def handle_subscribe(data):
+    """订阅宠物：加入宠物房间，立即收到全量状态，之后收到所有人互动带来的变化"""
+    pet_id = data.get('pet_id')
+    dog = refresh_pet(pet_id)
+    if dog is None:
+        emit('interaction_response', {'status': 'error', 'message': '找不到宠物'})
+        return
+    send_pet_update(request.sid, pet_id, dog)
+
+@socketio.on('unsubscribe')
+def handle_unsubscribe(data):
+    sync.unsubscribe(request.sid, pet_channel(data.get('pet_id')))
+
+@socketio.on('sync_ack')
+def handle_sync_ack(data):
+    """确认房间广播的增量（单独发送的消息通过确认回调确认）"""
+    pet_id = data.get('pet_id')
+    channel = ENVIRONMENT_CHANNEL if pet_id is None else pet_channel(pet_id)
+    sync.ack(request.sid, channel, data.get('version', 0))
+
+@socketio.on('resync')
+def handle_resync(data):
+    """客户端本地状态丢失或版本不连续时请求全量同步"""
+    pet_id = data.get('pet_id')
+    if pet_id is None:
+        sync.resync(request.sid, ENVIRONMENT_CHANNEL)
+        sync.publish(ENVIRONMENT_CHANNEL, 'environment_update')
+        return
+    dog = refresh_pet(pet_id)
+    if dog is None:
+        emit('interaction_response', {'status': 'error', 'message': '找不到宠物'})
+        return
+    sync.resync(request.sid, pet_channel(pet_id))
+    send_pet_update(request.sid, pet_id, dog)
+
+# 游戏时钟：每次推进10分钟
+def advance_clock():
+    environment_state["minute"] += 10
+    if environment_state["minute"] >= 60:
+        environment_state["hour"] += 1
+        environment_state["minute"] = 0
         
-        socketio.sleep(60)  # 每分钟更新一次
+        if environment_state["hour"] >= 24:
+            environment_state["hour"] = 0
+            environment_state["day"] += 1
+            
+            # 每4天更换一次季节
+            if environment_state["day"] % 4 == 0:
+                seasons = ["spring", "summer", "autumn", "winter"]
+                current_index = seasons.index(environment_state["season"])
+                next_index = (current_index + 1) % 4
+                environment_state["season"] = seasons[next_index]
+    
+    # 白天/黑夜判断 (6:00-18:00为白天)
+    environment_state["is_day"] = 6 <= environment_state["hour"] < 18
+
+def weather_block():
+    """当前游戏时间所在的3小时时段编号"""
+    return (environment_state["day"] * 24 + environment_state["hour"]) // 3
+
+# 上次掷天气骰子时所在的时段
+last_weather_block = weather_block()
+
+def roll_weather():
+    """随机更改天气 (每进入新的3小时时段有20%的概率)"""
+    global last_weather_block
+    block = weather_block()
+    if block == last_weather_block:
+        return
+    last_weather_block = block
+    
+    if world_rng.random() < 0.2:
+        weathers = ["sunny", "rainy", "cloudy", "snowy"]
+        current_index = weathers.index(environment_state["weather"])
+        # 排除当前天气
+        possible_weathers = weathers[:current_index] + weathers[current_index+1:]
+        # 在冬天增加下雪的概率
+        if environment_state["season"] == "winter" and "snowy" in possible_weathers and world_rng.random() < 0.5:
+            environment_state["weather"] = "snowy"
+        else:
+            environment_state["weather"] = world_rng.choice(possible_weathers)
+
+def decay_pets():
+    """更新所有宠物状态（整个种群一次完成）
+
+    tick 模式下种群数组是宠物状态的来源，这里不逐个写回 Dog：被访问的宠物由 refresh_pet 写回，
+    其余有变化的宠物由 save_population 按掩码定期写回并保存。
+    """
+    # 按需更新模式下宠物在被访问时才推进状态，这里不再逐个处理
+    if app.config['PET_UPDATE_MODE'] == 'tick':
+        population.tick(app.config['PET_DECAY_INTERVAL'])
+
+def save_population():
+    """把种群中自上次保存以来有变化的宠物写回 Dog 并保存"""
+    if app.config['PET_UPDATE_MODE'] != 'tick':
+        return
+    for pet_id in population.take_dirty():
+        dog = pets.peek(pet_id)
+        if dog is None:
+            continue
+        with pet_event(pet_id, dog, 'decay'):
+            population.store_to_dog(pet_id, dog)
+        save_pet_if_changed(pet_id, dog)
+
+def autosave():
+    """保存环境状态"""
+    save_environment_data()
+
+def broadcast_state():
+    """向各房间发布时间、环境和有订阅者的宠物的变化"""
+    socketio.emit('time_update', {
+        'time': {
+            'hour': environment_state["hour"],
+            'minute': environment_state["minute"],
+            'day': environment_state["day"],
+            'is_day': environment_state["is_day"]
+        }
+    }, to=ENVIRONMENT_CHANNEL)
+    
+    sync.commit(ENVIRONMENT_CHANNEL, environment_state)
+    sync.publish(ENVIRONMENT_CHANNEL, 'environment_update')
+    
+    # 只处理有订阅者的宠物，没人关注的宠物不产生任何发送
+    for channel in sync.subscribed_channels("pet:"):
+        pet_id = channel[len("pet:"):]
+        dog = refresh_pet(pet_id)
+        # 自上次发布以来没有变化的宠物不需要重新生成状态和比较
+        if dog is None or published_versions.get(pet_id) == dog.version:
+            continue
+        published_versions[pet_id] = dog.version
+        if sync.commit(channel, dog.get_status(), digits=2):
+            publish_pet(pet_id)
+
+# 全进程唯一的模拟调度器，各任务按各自的间隔运行
+scheduler = SimulationScheduler()
+scheduler.add_job('clock', advance_clock, app.config['CLOCK_INTERVAL'])
+scheduler.add_job('weather', roll_weather, app.config['WEATHER_INTERVAL'])
+scheduler.add_job('pet_decay', decay_pets, app.config['PET_DECAY_INTERVAL'])
+scheduler.add_job('autosave', autosave, app.config['AUTOSAVE_INTERVAL'])
+scheduler.add_job('pet_save', save_population, app.config['PET_SAVE_INTERVAL'])
+scheduler.add_job('broadcast', broadcast_state, app.config['BROADCAST_INTERVAL'])
+scheduler.add_job('evict_idle', pets.evict_idle, app.config['EVICTION_INTERVAL'])
+if event_log is not None:
+    scheduler.add_job('compact_events', event_log.compact, app.config['COMPACTION_INTERVAL'])
+
+def start_simulation():
+    """启动模拟调度器（每个进程只会启动一次）"""
+    # 调试模式下重载器的父进程只负责监视文件，不运行模拟
+    if app.debug and os.environ.get('WERKZEUG_RUN_MAIN') != 'true':
+        return False
+    return scheduler.start(spawn=socketio.start_background_task, sleep=socketio.sleep)
 
 @socketio.on('connect')
-def handle_connect():
-    socketio.start_background_task(background_task)
+def handle_connect(auth=None):
+    # 通过其他方式（如gunicorn）加载应用时，在第一个连接到来时启动
+    start_simulation()
+    # 连接时声明 {"sync": "delta"} 的客户端收到增量消息，其他客户端收到与以前相同的完整状态
+    sync.connect(request.sid, deltas=isinstance(auth, dict) and auth.get('sync') == 'delta')
+    sync.subscribe(request.sid, ENVIRONMENT_CHANNEL)
+    sync.commit(ENVIRONMENT_CHANNEL, environment_state)
+    sync.publish(ENVIRONMENT_CHANNEL, 'environment_update')
+
+@socketio.on('disconnect')
+def handle_disconnect(*args):
+    sync.disconnect(request.sid)
 
 if __name__ == '__main__':
     if not os.path.exists('templates'):
         os.makedirs('templates')
     if not os.path.exists('static'):
         os.makedirs('static')
+    app.debug = True
+    start_simulation()
     socketio.run(app, host='0.0.0.0', port=5000, debug=True)
\ No newline at end of file
@@ -0,0 +1,164 @@
+"""广播流量基准：每次发送全量状态 vs 按确认版本发送增量
+
+模拟 Web 服务器的广播模式：每 60 秒一次 tick（推进时钟、广播环境，每 3 小时游戏时间换一次天气），
+每个客户端在每个 tick 内以一定概率与自己的宠物互动一次（收到 pet_update）。
+统计每个在线客户端平均每秒收到的字节数，以及每个 tick 的环境广播字节数（time_update 两种方式相同，单独列出）。
+"旧客户端"一行为不声明增量协议、也不确认版本的客户端经过 DeltaSync 收到的流量（应与全量发送相同）。
+另外测量一只宠物的状态变化发布到房间的耗时，验证它只与该宠物的订阅者数量有关，与总连接数无关。
+用法：python benchmarks/bench_broadcast.py [客户端数量] [tick 数量]
+"""
+import os
+import sys
+import time
+import random
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from dog import Dog
+from delta_sync import DeltaSync, payload_size
+
+TICK_SECONDS = 60
+INTERACTION_CHANCE = 0.2
+TOY_COUNT = 20
+ACTIONS = ["feed", "play", "pet"]
+WEATHERS = ["sunny", "rainy", "cloudy", "snowy"]
+
+
+def make_environment(rng):
+    return {
+        "weather": "sunny",
+        "season": "spring",
+        "toys": [{"type": rng.choice(["ball", "frisbee", "rope", "puzzle"]),
+                  "position": {"x": rng.randint(100, 700), "y": rng.randint(150, 350)}}
+                 for _ in range(TOY_COUNT)],
+        "is_day": True,
+        "hour": 8,
+        "minute": 0,
+        "day": 0
+    }
+
+
+def advance_clock(environment, tick, rng):
+    environment["minute"] += 10
+    if environment["minute"] >= 60:
+        environment["minute"] = 0
+        environment["hour"] = (environment["hour"] + 1) % 24
+        if environment["hour"] == 0:
+            environment["day"] += 1
+    environment["is_day"] = 6 <= environment["hour"] < 18
+    if tick % 18 == 0:
+        environment["weather"] = rng.choice(WEATHERS)
+
+
+def interact(dog, now, rng):
+    dog.catch_up(now=now)
+    action = rng.choice(ACTIONS)
+    if action == "feed":
+        dog.feed("普通狗粮")
+    elif action == "play":
+        dog.play("普通玩耍")
+    else:
+        dog.pet()
+
+
+def run(clients, ticks, delta, seed=0, legacy=False):
+    """返回 (每个客户端平均每秒收到的字节数, 每个客户端每个 tick 的环境广播字节数)"""
+    rng = random.Random(seed)
+    environment = make_environment(rng)
+    dogs = [Dog(f"dog_{i}", "柯基", "活泼", seed=i) for i in range(clients)]
+    start = dogs[0].last_update_time
+    for dog in dogs:
+        dog.last_update_time = start
+    received = [0] * clients
+    environment_bytes = [0]
+
+    def emit(event, data, sid, callback, skip_sid):
+        # 客户端收到后立即确认（旧客户端不确认）
+        size = payload_size(data)
+        received[sid] += size
+        if event == "environment_update":
+            environment_bytes[0] += size
+        if not legacy:
+            callback()
+
+    sync = DeltaSync(emit)
+    for sid in range(clients):
+        sync.connect(sid, deltas=not legacy)
+        sync.subscribe(sid, "environment")
+
+    for tick in range(1, ticks + 1):
+        now = start + tick * TICK_SECONDS
+        for sid, dog in enumerate(dogs):
+            if rng.random() >= INTERACTION_CHANCE:
+                continue
+            interact(dog, now, rng)
+            if not delta:
+                received[sid] += payload_size({"pet_id": dog.name, "pet_info": dog.get_status(),
+                                               "environment": environment})
+                continue
+            channel = f"pet:{dog.name}"
+            sync.subscribe(sid, channel)
+            sync.commit(channel, dog.get_status(), digits=2)
+            sync.commit("environment", environment)
+            deltas = {channel: sync.delta_for(sid, channel)}
+            update = {"pet_id": dog.name, "pet_info": sync.view(sid, channel, deltas[channel])}
+            if not sync.is_current(sid, "environment"):
+                deltas["environment"] = sync.delta_for(sid, "environment")
+                update["environment"] = sync.view(sid, "environment", deltas["environment"])
+            sync.send(sid, "pet_update", update, deltas)
+
+        advance_clock(environment, tick, rng)
+        time_update = {"time": {key: environment[key] for key in ("hour", "minute", "day", "is_day")}}
+        for sid in range(clients):
+            received[sid] += payload_size(time_update)
+        if delta:
+            sync.commit("environment", environment)
+            sync.publish("environment", "environment_update")
+        else:
+            size = payload_size(environment)
+            environment_bytes[0] += size * clients
+            for sid in range(clients):
+                received[sid] += size
+
+    duration = ticks * TICK_SECONDS
+    return sum(received) / clients / duration, environment_bytes[0] / clients / ticks
+
+
+def bench_fanout(connections, subscribers, rounds=200):
+    """总连接数为 connections、某只宠物有 subscribers 个订阅者时，每次发布的平均耗时（微秒）"""
+    sync = DeltaSync(lambda event, data, to, callback, skip_sid: None, join=lambda sid, room: None)
+    for sid in range(connections):
+        sync.subscribe(sid, "env:default")
+        sync.subscribe(sid, f"pet:dog_{sid}")
+    for sid in range(subscribers):
+        sync.subscribe(sid, "pet:shared")
+    dog = Dog("shared", "柯基", "活泼", seed=0)
+    start = time.perf_counter()
+    for i in range(rounds):
+        dog.affection = i
+        sync.commit("pet:shared", dog.get_status())
+        sync.publish("pet:shared", "pet_update")
+        for sid in range(subscribers):
+            sync.ack(sid, "pet:shared", sync.channels["pet:shared"].version)
+    return (time.perf_counter() - start) / rounds * 1e6
+
+
+if __name__ == "__main__":
+    clients = int(sys.argv[1]) if len(sys.argv) > 1 else 200
+    ticks = int(sys.argv[2]) if len(sys.argv) > 2 else 240
+    full_rate, full_tick = run(clients, ticks, delta=False)
+    delta_rate, delta_tick = run(clients, ticks, delta=True)
+    legacy_rate, legacy_tick = run(clients, ticks, delta=True, legacy=True)
+    time_size = payload_size({"time": {"hour": 8, "minute": 10, "day": 0, "is_day": True}})
+    print(f"客户端数量: {clients}, tick 数量: {ticks}（每 tick {TICK_SECONDS} 秒）")
+    print(f"{'':>8} {'字节/秒/客户端':>14} {'环境广播字节/tick/客户端':>24}")
+    print(f"{'全量发送':>8} {full_rate:>14.2f} {full_tick:>24.1f}")
+    print(f"{'增量发送':>8} {delta_rate:>14.2f} {delta_tick:>24.1f}")
+    print(f"{'旧客户端':>8} {legacy_rate:>14.2f} {legacy_tick:>24.1f}")
+    print(f"{'减少(倍)':>8} {full_rate / delta_rate:>14.1f} {full_tick / delta_tick:>24.1f}")
+    print(f"time_update 每条 {time_size} 字节，两种方式相同")
+
+    print("\n单只宠物发布耗时（微秒）")
+    print(f"{'总连接数':>8} {'1个订阅者':>10} {'10个订阅者':>10}")
+    for connections in (100, 1_000, 10_000):
+        print(f"{connections:>8} {bench_fanout(connections, 1):>10.1f} {bench_fanout(connections, 10):>10.1f}")
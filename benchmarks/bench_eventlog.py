@@ -0,0 +1,97 @@
+"""事件日志基准：每次互动整体重写 JSON 存档 vs 追加一个事件
+
+对同一只宠物执行一串随机互动，分别测量每次互动的保存耗时和写入字节数，
+以及从快照重放事件重建宠物的耗时，并验证重建结果与内存中的宠物完全相同。
+用法：python benchmarks/bench_eventlog.py [互动次数] [快照间隔]
+"""
+import os
+import sys
+import json
+import time
+import random
+import shutil
+import tempfile
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from dog import Dog, capture_state, changed_fields
+from storage import JsonDirStorage, EventLogStorage
+
+ACTIONS = [
+    ("feed", lambda dog: dog.feed("普通狗粮")),
+    ("play", lambda dog: dog.play("接飞盘")),
+    ("bath", lambda dog: dog.bath()),
+    ("train", lambda dog: dog.train("坐下")),
+    ("pet", lambda dog: dog.pet()),
+]
+
+
+def interactions(count, seed=0):
+    """生成 count 次互动：每次先推进一段时间，再执行一个随机动作"""
+    rng = random.Random(seed)
+    for _ in range(count):
+        yield rng.uniform(30, 600), rng.choice(ACTIONS)
+
+
+def run_json(work_dir, count):
+    storage = JsonDirStorage(os.path.join(work_dir, "json"))
+    dog = Dog("bench", "柯基", "活泼", seed=0)
+    now = dog.last_update_time
+    elapsed = 0.0
+    written = 0
+    for seconds, (_, action) in interactions(count):
+        now += seconds
+        dog.catch_up(now=now)
+        action(dog)
+        start = time.perf_counter()
+        storage.save("bench", dog.to_dict())
+        elapsed += time.perf_counter() - start
+        written += os.path.getsize(storage.path("bench"))
+    return elapsed / count * 1e6, written / count
+
+
+def run_events(work_dir, count, snapshot_every):
+    storage = EventLogStorage(os.path.join(work_dir, "events"), snapshot_every=snapshot_every)
+    dog = Dog("bench", "柯基", "活泼", seed=0)
+    storage.save("bench", dog.to_dict())
+    now = dog.last_update_time
+    elapsed = 0.0
+    for seconds, (name, action) in interactions(count):
+        now += seconds
+        events = []
+        for cmd, step in (("decay", lambda dog: dog.catch_up(now=now)), (name, action)):
+            captured = capture_state(dog)
+            step(dog)
+            changes = changed_fields(dog, captured)
+            changes["last_update_time"] = dog.last_update_time
+            events.append({"time": now, "cmd": cmd, "args": {}, "set": changes})
+        start = time.perf_counter()
+        if storage.append("bench", events):
+            storage.snapshot("bench", dog.to_dict())
+        elapsed += time.perf_counter() - start
+    storage.compact()
+
+    start = time.perf_counter()
+    storage.seqs.clear()
+    state = storage.load("bench")
+    replay_ms = (time.perf_counter() - start) * 1000
+    exact = state == json.loads(json.dumps(dog.to_dict()))
+    storage.close()
+    return elapsed / count * 1e6, storage.bytes_appended / count, replay_ms, exact
+
+
+if __name__ == "__main__":
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 5000
+    snapshot_every = int(sys.argv[2]) if len(sys.argv) > 2 else 100
+    work_dir = tempfile.mkdtemp(prefix="bench_eventlog_")
+    try:
+        json_us, json_bytes = run_json(work_dir, count)
+        event_us, event_bytes, replay_ms, exact = run_events(work_dir, count, snapshot_every)
+    finally:
+        shutil.rmtree(work_dir)
+
+    print(f"互动次数: {count}，快照间隔: {snapshot_every} 个事件")
+    print(f"{'':>10} {'微秒/次':>10} {'字节/次':>10}")
+    print(f"{'整体重写':>10} {json_us:>10.1f} {json_bytes:>10.0f}")
+    print(f"{'追加事件':>10} {event_us:>10.1f} {event_bytes:>10.0f}")
+    print(f"从快照重放: {replay_ms:.2f} ms，重建结果{'完全一致' if exact else '不一致'}")
@@ -0,0 +1,93 @@
+"""宠物对象内存基准：原来基于 __dict__ 的 Dog vs 使用 __slots__ 的紧凑 Dog
+
+用 tracemalloc 统计从存档数据（JSON）加载 N 只宠物后每只宠物占用的字节数。
+LegacyDog 按原来的 Dog 的属性布局构造：实例 __dict__、每只宠物一个 appearance 字典、
+各自的衰减系数以及未驻留的品种/性格字符串。
+用法：python benchmarks/bench_memory.py [宠物数量 ...]
+"""
+import os
+import sys
+import gc
+import json
+import random
+import tracemalloc
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from dog import Dog
+
+PERSONALITIES = ["活泼", "温顺", "机警", "粘人", "独立"]
+BREEDS = ["柯基", "哈士奇", "金毛", "拉布拉多", "柴犬"]
+
+
+class LegacyDog:
+    """原来的 Dog 的数据布局（只保留属性，不含方法）"""
+
+    def __init__(self, data):
+        self.name = data["name"]
+        self.breed = data["breed"]
+        self.personality = data["personality"]
+        self.hunger = data["hunger"]
+        self.happiness = data["happiness"]
+        self.health = data["health"]
+        self.cleanliness = data["cleanliness"]
+        self.energy = data["energy"]
+        self.age = data["age"]
+        self.level = data["level"]
+        self.experience = data["experience"]
+        self.growth_stage = data["growth_stage"]
+        self.affection = data["affection"]
+        self.happiness_decay = data["happiness_decay"]
+        self.energy_decay = data["energy_decay"]
+        self.skills = data["skills"]
+        self.is_sleeping = data["is_sleeping"]
+        self.sleep_until = data["sleep_until"]
+        self.appearance = data["appearance"]
+        self.last_update_time = data["last_update_time"]
+
+
+TEMPLATES = [Dog("模板", breed, personality).to_dict() for breed in BREEDS for personality in PERSONALITIES]
+
+
+def make_save(i, rng):
+    """生成一只宠物的存档文本（与磁盘上的 JSON 存档相同）"""
+    data = dict(rng.choice(TEMPLATES))
+    data["name"] = f"dog_{i}"
+    data["hunger"] = rng.uniform(0, 100)
+    data["happiness"] = rng.uniform(0, 100)
+    data["energy"] = rng.uniform(0, 100)
+    data["age"] = rng.uniform(0, 100)
+    data["skills"] = {"坐下": rng.randint(1, 5)} if rng.random() < 0.5 else {}
+    return json.dumps(data)
+
+
+def load_save(i, saves):
+    data = json.loads(saves[i % len(saves)])
+    data["name"] = f"dog_{i}"
+    return data
+
+
+def measure(count, build):
+    """加载 count 只宠物后每只宠物占用的字节数"""
+    rng = random.Random(0)
+    # 预先生成一批存档文本，加载时轮流使用并改成不同的名字
+    saves = [make_save(i, rng) for i in range(1000)]
+    gc.collect()
+    tracemalloc.start()
+    base = tracemalloc.get_traced_memory()[0]
+    pets = [build(load_save(i, saves)) for i in range(count)]
+    gc.collect()
+    used = tracemalloc.get_traced_memory()[0] - base
+    tracemalloc.stop()
+    del pets
+    gc.collect()
+    return used / count
+
+
+if __name__ == "__main__":
+    sizes = [int(arg) for arg in sys.argv[1:]] or [100_000, 1_000_000]
+    print(f"{'宠物数量':>10} {'原Dog(字节/只)':>16} {'紧凑Dog(字节/只)':>18} {'节省':>8}")
+    for count in sizes:
+        legacy = measure(count, LegacyDog)
+        compact = measure(count, Dog.from_dict)
+        print(f"{count:>10} {legacy:>16.0f} {compact:>18.0f} {1 - compact / legacy:>8.1%}")
@@ -0,0 +1,130 @@
+"""种群更新基准：逐个调用 Dog.update_status 与 PetPopulation.tick 的耗时对比
+
+用法：python benchmarks/bench_population.py [宠物数量 ...]
+"""
+import os
+import sys
+import time
+import copy
+import random
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from dog import Dog
+from population import PetPopulation
+
+PERSONALITIES = ["活泼", "温顺", "机警", "粘人", "独立"]
+BREEDS = ["柯基", "哈士奇", "金毛", "拉布拉多", "柴犬"]
+
+
+def random_dog(rng, i):
+    """生成属性随机的宠物，覆盖各个阈值区间"""
+    dog = Dog(f"dog_{i}", rng.choice(BREEDS), rng.choice(PERSONALITIES), seed=i)
+    dog.hunger = rng.uniform(0, 100)
+    dog.happiness = rng.uniform(0, 100)
+    dog.health = rng.uniform(0, 100)
+    dog.cleanliness = rng.uniform(0, 100)
+    dog.energy = rng.uniform(0, 100)
+    dog.age = rng.uniform(0, 1200)
+    dog.level = rng.randint(1, 10)
+    dog.experience = rng.randint(0, dog.level * 120)
+    if rng.random() < 0.1:
+        dog.is_sleeping = True
+        dog.sleep_until = time.time() + rng.choice([-10, 3600])
+    return dog
+
+
+def random_columns(count, seed=0):
+    """直接生成随机列数据，避免构造大量 Dog 对象"""
+    rng = np.random.default_rng(seed)
+    level = rng.integers(1, 10, count)
+    return {
+        "hunger": rng.uniform(0, 100, count),
+        "happiness": rng.uniform(0, 100, count),
+        "health": rng.uniform(0, 100, count),
+        "cleanliness": rng.uniform(0, 100, count),
+        "energy": rng.uniform(0, 100, count),
+        "age": rng.uniform(0, 1200, count),
+        "happiness_decay": rng.choice([0.7, 0.8, 1.0, 1.1, 1.2], count),
+        "energy_decay": rng.choice([0.8, 0.9, 1.0, 1.2], count),
+        "level": level,
+        "experience": rng.integers(0, 120, count) * level,
+    }
+
+
+def check_equivalence(count=2000, ticks=50):
+    """验证向量化结果与逐个对象更新结果一致（包括由各宠物随机数流决定的洗澡结果）"""
+    rng = random.Random(42)
+    dogs = [random_dog(rng, i) for i in range(count)]
+    reference = [copy.deepcopy(dog) for dog in dogs]
+
+    population = PetPopulation()
+    for i, dog in enumerate(dogs):
+        population.add(i, dog)
+
+    for tick in range(ticks):
+        now = time.time()
+        population.tick(60, now=now)
+        population.update_growth_stages()
+        for dog in reference:
+            dog.update_status(60)
+            dog.update_growth_stage()
+        # 每隔几次给一部分宠物洗澡
+        if tick % 5 == 0:
+            mask = np.arange(count) % 3 == tick % 3
+            population.bath(mask)
+            for i in np.flatnonzero(mask):
+                reference[i].bath()
+
+    fields = ["hunger", "happiness", "health", "cleanliness", "energy", "age",
+              "level", "experience", "growth_stage", "is_sleeping", "rng_counter"]
+    mismatches = 0
+    for i, dog in enumerate(reference):
+        population.store_to_dog(i, dogs[i])
+        for field in fields:
+            if getattr(dogs[i], field) != getattr(dog, field):
+                mismatches += 1
+    return mismatches
+
+
+def bench_objects(count, repeat=3):
+    """逐个对象更新的单次 tick 耗时"""
+    rng = random.Random(1)
+    dogs = [random_dog(rng, i) for i in range(count)]
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        for dog in dogs:
+            dog.update_status(60)
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def bench_population(count, repeat=5):
+    """向量化种群的单次 tick 耗时"""
+    population = PetPopulation.from_columns(range(count), random_columns(count))
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        population.tick(60)
+        population.update_growth_stages()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+if __name__ == "__main__":
+    sizes = [int(arg) for arg in sys.argv[1:]] or [10_000, 100_000, 1_000_000]
+
+    mismatches = check_equivalence()
+    print(f"一致性检查: {'通过' if mismatches == 0 else f'{mismatches} 处不一致'}")
+
+    print(f"{'宠物数量':>10} {'逐个对象(ms)':>14} {'向量化(ms)':>12} {'加速比':>8}")
+    for count in sizes:
+        vectorized = bench_population(count)
+        # 逐个对象的方式在百万级别下太慢，只测到十万
+        if count <= 100_000:
+            objects = bench_objects(count)
+            print(f"{count:>10} {objects * 1000:>14.1f} {vectorized * 1000:>12.2f} {objects / vectorized:>8.1f}x")
+        else:
+            print(f"{count:>10} {'-':>14} {vectorized * 1000:>12.2f} {'-':>8}")
@@ -0,0 +1,95 @@
+"""存档格式基准：JSON（indent=4，原有格式）vs 二进制快照（snapshot.py）
+
+分别测量 Dog -> 存档数据 -> Dog 的保存、加载耗时和存档大小（内存中编解码），
+以及通过存储后端把同一批宠物写入目录再读回的耗时。
+用法：python benchmarks/bench_snapshot.py [编解码宠物数量] [写盘宠物数量]
+"""
+import os
+import sys
+import json
+import time
+import random
+import shutil
+import tempfile
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+import snapshot
+from dog import Dog
+from storage import JsonDirStorage, BinaryDirStorage
+
+PERSONALITIES = ["活泼", "温顺", "机警", "粘人", "独立"]
+BREEDS = ["柯基", "哈士奇", "金毛", "拉布拉多", "柴犬"]
+SKILLS = ["坐下", "握手", "打滚", "装死"]
+
+
+def random_dogs(count, seed=0):
+    rng = random.Random(seed)
+    dogs = []
+    for i in range(count):
+        dog = Dog(f"dog_{i}", rng.choice(BREEDS), rng.choice(PERSONALITIES), seed=i)
+        dog.hunger = rng.uniform(0, 100)
+        dog.happiness = rng.uniform(0, 100)
+        dog.energy = rng.uniform(0, 100)
+        dog.age = rng.uniform(0, 1200)
+        dog.level = rng.randint(1, 20)
+        dog.skills = {skill: rng.randint(1, 5) for skill in rng.sample(SKILLS, rng.randint(0, 3))}
+        dogs.append(dog)
+    return dogs
+
+
+def json_dumps(dog):
+    return json.dumps(dog.to_dict(), indent=4).encode("utf-8")
+
+
+def json_loads(blob):
+    return Dog.from_dict(json.loads(blob))
+
+
+def bench_codec(dogs, dumps, loads):
+    """返回 (保存微秒/只, 加载微秒/只, 平均字节数)"""
+    start = time.perf_counter()
+    blobs = [dumps(dog) for dog in dogs]
+    save = time.perf_counter() - start
+    start = time.perf_counter()
+    loaded = [loads(blob) for blob in blobs]
+    load = time.perf_counter() - start
+    assert all(a.to_dict() == b.to_dict() for a, b in zip(dogs[:1000], loaded))
+    count = len(dogs)
+    return save / count * 1e6, load / count * 1e6, sum(map(len, blobs)) / count
+
+
+def bench_storage(dogs, storage_class, work_dir):
+    """通过存储后端写入目录再全部读回，返回 (保存微秒/只, 加载微秒/只)"""
+    storage = storage_class(work_dir)
+    start = time.perf_counter()
+    for dog in dogs:
+        storage.save(dog.name, dog.to_dict())
+    save = time.perf_counter() - start
+    start = time.perf_counter()
+    for pet_id in storage.ids():
+        Dog.from_dict(storage.load(pet_id))
+    load = time.perf_counter() - start
+    return save / len(dogs) * 1e6, load / len(dogs) * 1e6
+
+
+if __name__ == "__main__":
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 100_000
+    disk_count = int(sys.argv[2]) if len(sys.argv) > 2 else 5_000
+    dogs = random_dogs(count)
+
+    print(f"编解码 {count} 只宠物")
+    print(f"{'':>8} {'保存(微秒/只)':>14} {'加载(微秒/只)':>14} {'字节/只':>8}")
+    for label, dumps, loads in (("JSON", json_dumps, json_loads), ("二进制", snapshot.dumps, snapshot.loads)):
+        save, load, size = bench_codec(dogs, dumps, loads)
+        print(f"{label:>8} {save:>14.1f} {load:>14.1f} {size:>8.0f}")
+
+    print(f"\n存储后端写入并读回 {disk_count} 只宠物（每次保存都 fsync）")
+    print(f"{'':>8} {'保存(微秒/只)':>14} {'加载(微秒/只)':>14}")
+    work_dir = tempfile.mkdtemp(prefix="bench_snapshot_")
+    try:
+        for label, storage_class in (("JSON", JsonDirStorage), ("二进制", BinaryDirStorage)):
+            save, load = bench_storage(dogs[:disk_count], storage_class, os.path.join(work_dir, label))
+            print(f"{label:>8} {save:>14.1f} {load:>14.1f}")
+    finally:
+        shutil.rmtree(work_dir)
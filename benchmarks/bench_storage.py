@@ -0,0 +1,93 @@
+"""存档后端基准：每只宠物一个 JSON 文件 vs SQLite（WAL）
+
+分别测量全量写入、一次 tick 内批量保存 10% 的脏宠物、随机读取 1000 只宠物的耗时，
+以及后台线程不断批量写入（模拟后写式存档）时随机读取 1000 只宠物的耗时。
+用法：python benchmarks/bench_storage.py [宠物数量 ...]
+"""
+import os
+import sys
+import time
+import random
+import shutil
+import tempfile
+import threading
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from dog import Dog
+from storage import JsonDirStorage, SqliteStorage
+
+PERSONALITIES = ["活泼", "温顺", "机警", "粘人", "独立"]
+BREEDS = ["柯基", "哈士奇", "金毛", "拉布拉多", "柴犬"]
+
+
+def make_pets(count, seed=0):
+    rng = random.Random(seed)
+    base = Dog("模板", "柯基", "活泼").to_dict()
+    pets = []
+    for i in range(count):
+        data = dict(base)
+        data["name"] = f"dog_{i}"
+        data["breed"] = rng.choice(BREEDS)
+        data["personality"] = rng.choice(PERSONALITIES)
+        data["hunger"] = rng.uniform(0, 100)
+        data["level"] = rng.randint(1, 10)
+        pets.append((data["name"], data))
+    return pets
+
+
+def bench_backend(storage, pets, rng):
+    results = {}
+
+    start = time.perf_counter()
+    storage.save_many(pets)
+    results["全量写入(s)"] = time.perf_counter() - start
+
+    dirty = rng.sample(pets, max(1, len(pets) // 10))
+    start = time.perf_counter()
+    storage.save_many(dirty)
+    results["10%脏数据保存(s)"] = time.perf_counter() - start
+
+    lookups = [rng.choice(pets)[0] for _ in range(1000)]
+    start = time.perf_counter()
+    for pet_id in lookups:
+        storage.load(pet_id)
+    results["1000次读取(ms)"] = (time.perf_counter() - start) * 1000
+
+    # 读取的同时另一个线程不断写入脏数据
+    stop = threading.Event()
+
+    def write_loop():
+        while not stop.is_set():
+            storage.save_many(dirty)
+
+    writer = threading.Thread(target=write_loop)
+    writer.start()
+    try:
+        start = time.perf_counter()
+        for pet_id in lookups:
+            storage.load(pet_id)
+        results["写入时1000次读取(ms)"] = (time.perf_counter() - start) * 1000
+    finally:
+        stop.set()
+        writer.join()
+    return results
+
+
+if __name__ == "__main__":
+    sizes = [int(arg) for arg in sys.argv[1:]] or [1_000, 10_000, 100_000]
+    for count in sizes:
+        pets = make_pets(count)
+        work_dir = tempfile.mkdtemp(prefix="bench_storage_")
+        try:
+            json_results = bench_backend(JsonDirStorage(os.path.join(work_dir, "json")), pets, random.Random(1))
+            sqlite_storage = SqliteStorage(os.path.join(work_dir, "pets.db"))
+            sqlite_results = bench_backend(sqlite_storage, pets, random.Random(1))
+            sqlite_storage.close()
+        finally:
+            shutil.rmtree(work_dir)
+
+        print(f"\n宠物数量: {count}")
+        print(f"{'':>16} {'JSON文件':>12} {'SQLite':>12}")
+        for key in json_results:
+            print(f"{key:>16} {json_results[key]:>12.3f} {sqlite_results[key]:>12.3f}")
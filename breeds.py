@@ -0,0 +1,135 @@
+import os
+import sys
+import json
+from collections import namedtuple
+
+from effects import TEMPLATE_DIR, get_tables
+
+# 未知品种使用的毛色
+DEFAULT_COLORS = ("#A0522D", "#8B4513", "#D2691E")
+
+# 成长阶段（Dog.GROWTH_STAGES 的下标）对应的 growth_rate 键，模板没有 young 时使用 adult
+GROWTH_RATE_KEYS = (("puppy",), ("young", "adult"), ("adult",), ("senior",))
+
+# 品种的全部预计算数据。同一品种的所有宠物共用一个对象，创建后不可修改
+Breed = namedtuple("Breed", [
+    "breed_id",         # 模板 id
+    "name",             # 品种名（宠物存档中保存的字符串）
+    "index",            # 品种编号，用于 PetPopulation 的成长速度查表
+    "colors",           # 毛色
+    "happiness_decay",  # 快乐度衰减倍率（与性格的衰减系数相乘）
+    "energy_decay",     # 能量衰减倍率
+    "growth",           # 各成长阶段的年龄增长倍率
+    "skill_affinity",   # 按技能 id 排列的训练成功率倍率
+])
+
+
+def growth_rates(growth_rate):
+    """模板中的 growth_rate -> 按成长阶段排列的倍率"""
+    rates = []
+    for keys in GROWTH_RATE_KEYS:
+        rate = 1.0
+        for key in keys:
+            if key in growth_rate:
+                rate = float(growth_rate[key])
+                break
+        rates.append(rate)
+    return tuple(rates)
+
+
+def skill_affinities(affinities, skills):
+    """模板中的 skill_affinities（按技能 id 或类别）-> 按技能表 id 排列的倍率，技能 id 优先"""
+    rates = []
+    for tags in skills.tags:
+        rate = 1.0
+        for tag in tags:
+            if tag in affinities:
+                rate = float(affinities[tag])
+                break
+        rates.append(rate)
+    return tuple(rates)
+
+
+class BreedRegistry:
+    """启动时从 data/templates/dog_breeds 加载所有品种模板
+
+    模板中的 name、breed_id 和 aliases 都可以用来查找品种。未知的品种名也会得到一个
+    使用默认倍率的品种对象（按名字缓存），这样任意品种名都能原样保存和恢复。
+    """
+
+    def __init__(self, template_dir=TEMPLATE_DIR, skills=None):
+        self.skills = skills if skills is not None else get_tables().skills
+        self.default = Breed(None, "", 0, DEFAULT_COLORS, 1.0, 1.0, growth_rates({}),
+                             skill_affinities({}, self.skills))
+        self.breeds = [self.default]  # 品种编号 -> 品种
+        self.by_name = {}
+
+        path = os.path.join(template_dir, "dog_breeds")
+        files = sorted(os.listdir(path)) if os.path.isdir(path) else []
+        for file in files:
+            if not file.endswith(".json"):
+                continue
+            try:
+                with open(os.path.join(path, file), "r", encoding="utf-8") as f:
+                    self.register(json.load(f))
+            except Exception as e:
+                print(f"加载品种模板失败: {file}, 错误: {e}")
+        self._growth_matrix = None
+
+    def register(self, template):
+        """把一个品种模板编译成 Breed 并登记它的名字、id 和别名"""
+        decay = template.get("decay", {})
+        appearance = template.get("appearance", {})
+        breed = Breed(
+            breed_id=template.get("breed_id"),
+            name=sys.intern(template["name"]),
+            index=len(self.breeds),
+            colors=tuple(appearance.get("palette", DEFAULT_COLORS)),
+            happiness_decay=float(decay.get("happiness", 1.0)),
+            energy_decay=float(decay.get("energy", 1.0)),
+            growth=growth_rates(template.get("growth_rate", {})),
+            skill_affinity=skill_affinities(template.get("skill_affinities", {}), self.skills),
+        )
+        self.breeds.append(breed)
+        self._growth_matrix = None
+
+        self.by_name[breed.name] = breed
+        if breed.breed_id:
+            self.by_name[breed.breed_id] = breed
+        # 别名共用品种的预计算数据，只有名字不同
+        for alias in template.get("aliases", []):
+            self.by_name[alias] = breed._replace(name=sys.intern(alias))
+        return breed
+
+    def get(self, name):
+        """品种名 -> 共享的品种对象"""
+        breed = self.by_name.get(name)
+        if breed is None:
+            breed = self.by_name[name] = self.default._replace(name=sys.intern(name))
+        return breed
+
+    def __contains__(self, name):
+        return name in self.by_name and self.by_name[name].index != 0
+
+    def names(self):
+        """模板中定义的品种名"""
+        return [breed.name for breed in self.breeds[1:]]
+
+    @property
+    def growth_matrix(self):
+        """品种编号 x 成长阶段的年龄增长倍率（用于 PetPopulation 的向量化计算）"""
+        if self._growth_matrix is None:
+            import numpy as np
+            self._growth_matrix = np.array([breed.growth for breed in self.breeds], dtype=np.float64)
+        return self._growth_matrix
+
+
+_registry = None
+
+
+def get_breeds():
+    """全局共享的品种注册表（首次使用时加载）"""
+    global _registry
+    if _registry is None:
+        _registry = BreedRegistry()
+    return _registry
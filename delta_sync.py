@@ -0,0 +1,341 @@
+import copy
+import json
+import time
+import threading
+from collections import deque
+
+
+def payload_size(payload):
+    """消息序列化后的字节数（与 Socket.IO 默认的 JSON 编码一致）"""
+    return len(json.dumps(payload).encode("utf-8"))
+
+
+def quantize(state, digits=2):
+    """把浮点数字段保留 digits 位小数，避免微小变化产生增量"""
+    return {key: round(value, digits) if isinstance(value, float) else value
+            for key, value in state.items()}
+
+
+class VersionedState:
+    """带版本号的状态：每次提交记录发生变化的字段，用于生成增量
+
+    只保留最近 max_history 个版本的变化记录，更早的版本只能全量同步。
+    提交时可以把浮点数量化后再比较（见 commit），exact 保存最近一次提交的未量化状态。
+    """
+
+    def __init__(self, max_history=64):
+        self.version = 0
+        self.state = {}
+        self.exact = self.state
+        self.history = deque(maxlen=max_history)  # (版本号, 变化的字段)
+        self._full_size = (None, 0)  # (版本号, 全量消息字节数)
+
+    def commit(self, state, digits=None):
+        """提交最新状态，有字段变化时版本号加一，返回变化的字段
+
+        digits 不为 None 时浮点数字段保留 digits 位小数后再比较和记录，
+        原值仍保存在 exact 中。
+        """
+        exact = state
+        if digits is not None:
+            state = quantize(state, digits)
+        changed = {key for key, value in state.items()
+                   if key not in self.state or self.state[key] != value}
+        changed.update(key for key in self.state if key not in state)
+        if changed:
+            self.version += 1
+            self.history.append((self.version, changed))
+            self.state = copy.deepcopy(state)
+        self.exact = self.state if digits is None else copy.deepcopy(exact)
+        return changed
+
+    def full(self):
+        return {"version": self.version, "full": True, "changes": self.state}
+
+    def full_size(self):
+        """全量消息的字节数（按版本缓存）"""
+        if self._full_size[0] != self.version:
+            self._full_size = (self.version, payload_size(self.full()))
+        return self._full_size[1]
+
+    def delta(self, base):
+        """从 base 版本到当前版本的增量；base 未知或落后太多时返回全量"""
+        if base is None or base > self.version:
+            return self.full()
+        if base < self.version and (not self.history or base < self.history[0][0] - 1):
+            return self.full()
+        keys = set()
+        for version, changed in reversed(self.history):
+            if version <= base:
+                break
+            keys.update(changed)
+        return {
+            "version": self.version,
+            "base": base,
+            "full": False,
+            "changes": {key: self.state[key] for key in keys if key in self.state},
+            "removed": [key for key in keys if key not in self.state]
+        }
+
+
+class ClientStats:
+    """单个客户端的发送统计"""
+
+    def __init__(self):
+        self.connected_at = time.time()
+        self.messages = 0
+        self.bytes_sent = 0
+        self.bytes_full = 0  # 同样的消息如果每次都发全量需要的字节数
+        self.full_syncs = 0
+
+    def bytes_per_sec(self, now):
+        return self.bytes_sent / max(1.0, now - self.connected_at)
+
+
+class DeltaSync:
+    """按客户端确认的版本发送增量状态
+
+    每个频道（如 "environment"、"pet:<pet_id>"）保存一份带版本的状态，
+    客户端通过 Socket.IO 的确认回调告知已应用的版本，之后只会收到该版本
+    之后变化的字段；客户端落后超过保留的历史版本时自动发送全量。
+
+    只有声明支持增量协议的客户端（connect 时 deltas=True，或发送过确认）收到带版本的增量消息；
+    其他客户端（旧客户端）每次都收到频道的完整状态本身，与引入增量同步之前的消息格式相同。
+
+    每个频道对应一个 Socket.IO 房间，订阅即加入房间。基准版本相同的多个订阅者
+    共用一次房间广播，这类消息没有确认回调，客户端需发送确认事件（见 ack）。
+
+    emit 为 (event, data, to, callback, skip_sid) -> None 的发送函数，to 为 sid 或房间名；
+    join / leave 为 (sid, room) -> None，用于加入和离开房间。
+    """
+
+    def __init__(self, emit, join=None, leave=None, max_history=64):
+        self.emit = emit
+        self.join = join
+        self.leave = leave
+        self.max_history = max_history
+        self.channels = {}  # 频道 -> VersionedState
+        self.members = {}  # 频道 -> 订阅者 sid 集合
+        self.clients = {}  # sid -> {频道: 客户端确认的版本（None 表示需要全量）}
+        self.sent = {}  # sid -> {频道: 最近一次发送的版本}
+        self.client_stats = {}  # sid -> ClientStats
+        self.delta_clients = set()  # 支持增量协议的客户端
+        self.lock = threading.RLock()
+
+    def connect(self, sid, deltas=False):
+        with self.lock:
+            if deltas:
+                self.delta_clients.add(sid)
+            self.clients.setdefault(sid, {})
+            self.sent.setdefault(sid, {})
+            self.client_stats.setdefault(sid, ClientStats())
+
+    def disconnect(self, sid):
+        """客户端断开（Socket.IO 会自动让它离开所有房间）"""
+        with self.lock:
+            for channel in self.clients.pop(sid, {}):
+                self._remove_member(channel, sid)
+            self.sent.pop(sid, None)
+            self.client_stats.pop(sid, None)
+            self.delta_clients.discard(sid)
+
+    def subscribe(self, sid, channel):
+        """订阅频道并加入对应房间，首次发送时为全量"""
+        with self.lock:
+            self.connect(sid)
+            if channel in self.clients[sid]:
+                return False
+            self.clients[sid][channel] = None
+            self.members.setdefault(channel, set()).add(sid)
+        if self.join is not None:
+            self.join(sid, channel)
+        return True
+
+    def unsubscribe(self, sid, channel):
+        with self.lock:
+            if channel not in self.clients.get(sid, {}):
+                return False
+            del self.clients[sid][channel]
+            self.sent[sid].pop(channel, None)
+            self._remove_member(channel, sid)
+        if self.leave is not None:
+            self.leave(sid, channel)
+        return True
+
+    def _remove_member(self, channel, sid):
+        members = self.members.get(channel)
+        if members is not None:
+            members.discard(sid)
+            if not members:
+                del self.members[channel]
+
+    def subscribers(self, channel):
+        with self.lock:
+            return list(self.members.get(channel, ()))
+
+    def subscribed_channels(self, prefix=""):
+        """有订阅者的频道"""
+        with self.lock:
+            return [channel for channel in self.members if channel.startswith(prefix)]
+
+    def commit(self, channel, state, digits=None):
+        """提交频道的最新状态，返回变化的字段
+
+        digits 不为 None 时浮点数保留 digits 位小数后再比较，微小变化不产生新版本；
+        量化只影响增量协议的消息，旧客户端仍收到原值。
+        """
+        with self.lock:
+            versioned = self.channels.get(channel)
+            if versioned is None:
+                versioned = self.channels[channel] = VersionedState(self.max_history)
+            return versioned.commit(state, digits)
+
+    def drop(self, channel):
+        """删除频道状态（如宠物被移出内存），订阅者下次收到全量"""
+        with self.lock:
+            self.channels.pop(channel, None)
+            for sid in self.members.get(channel, ()):
+                self.clients[sid][channel] = None
+                self.sent[sid].pop(channel, None)
+
+    def is_current(self, sid, channel):
+        """客户端是否已确认频道的最新版本"""
+        with self.lock:
+            versioned = self.channels.get(channel)
+            base = self.clients.get(sid, {}).get(channel)
+            return versioned is not None and base == versioned.version
+
+    def delta_for(self, sid, channel):
+        """为客户端生成频道的增量消息"""
+        with self.lock:
+            versioned = self.channels.get(channel)
+            if versioned is None:
+                return None
+            return versioned.delta(self.clients.get(sid, {}).get(channel))
+
+    def view(self, sid, channel, delta):
+        """发给客户端的频道数据：支持增量协议的客户端收到增量消息本身，
+        旧客户端从不确认版本，收到的总是频道未量化的完整状态"""
+        if delta is None or sid in self.delta_clients:
+            return delta
+        return self.channels[channel].exact
+
+    def ack(self, sid, channel, version):
+        """客户端确认已应用到 version 版本（来自确认回调或客户端的确认事件）"""
+        with self.lock:
+            channels = self.clients.get(sid)
+            if channels is None or channel not in channels:
+                return
+            self.delta_clients.add(sid)
+            versioned = self.channels.get(channel)
+            if versioned is None or version > versioned.version:
+                return
+            if channels[channel] is None or version > channels[channel]:
+                channels[channel] = version
+
+    def resync(self, sid, channel):
+        """客户端要求全量同步（如本地状态丢失或检测到版本不连续）"""
+        with self.lock:
+            channels = self.clients.get(sid)
+            if channels is not None and channel in channels:
+                channels[channel] = None
+                self.sent[sid].pop(channel, None)
+
+    def acknowledger(self, sid, deltas):
+        """生成确认回调：客户端收到消息后调用，一次确认消息中所有频道的版本"""
+        versions = {channel: delta["version"] for channel, delta in deltas.items()}
+
+        def callback(*args):
+            for channel, version in versions.items():
+                self.ack(sid, channel, version)
+        return callback
+
+    def _record(self, sid, deltas, size):
+        """记录发给客户端的版本和流量"""
+        sent = self.sent.get(sid)
+        if sent is not None:
+            for channel, delta in deltas.items():
+                sent[channel] = delta["version"]
+        stats = self.client_stats.get(sid)
+        if stats is not None:
+            stats.messages += 1
+            stats.bytes_sent += size
+            stats.bytes_full += sum(self.channels[channel].full_size()
+                                    for channel in deltas if channel in self.channels)
+            stats.full_syncs += sum(1 for delta in deltas.values() if delta["full"])
+
+    def send(self, sid, event, data, deltas, size=None):
+        """向单个客户端发送消息，deltas 为消息中包含的各频道增量 {频道: 增量}"""
+        if size is None:
+            size = payload_size(data)
+        with self.lock:
+            self._record(sid, deltas, size)
+        self.emit(event, data, sid, self.acknowledger(sid, deltas), None)
+        return size
+
+    def publish(self, channel, event, wrap=None):
+        """把频道的变化发送给还没有收到最新版本的订阅者，返回发送的客户端数
+
+        只遍历该频道的订阅者；相同基准版本的订阅者共用同一份增量消息，
+        多于一人时通过房间广播一次发出（旧客户端和支持增量的客户端分开发送）。
+        wrap 用于把增量（旧客户端为完整状态）包装成完整消息。
+        """
+        with self.lock:
+            versioned = self.channels.get(channel)
+            members = self.members.get(channel)
+            if versioned is None or not members:
+                return 0
+            groups = {}
+            for sid in members:
+                if self.sent[sid].get(channel) != versioned.version:
+                    key = (self.clients[sid][channel], sid in self.delta_clients)
+                    groups.setdefault(key, []).append(sid)
+            messages = []
+            for (base, _), sids in groups.items():
+                delta = versioned.delta(base)
+                view = self.view(sids[0], channel, delta)
+                data = view if wrap is None else wrap(view)
+                size = payload_size(data)
+                skip = None
+                if len(sids) > 1 and self.join is not None:
+                    for sid in sids:
+                        self._record(sid, {channel: delta}, size)
+                    skip = list(members.difference(sids))
+                messages.append((data, delta, size, sids, skip))
+
+        sent = 0
+        for data, delta, size, sids, skip in messages:
+            if skip is not None:
+                self.emit(event, data, channel, None, skip or None)
+            else:
+                for sid in sids:
+                    self.send(sid, event, data, {channel: delta}, size)
+            sent += len(sids)
+        return sent
+
+    def stats(self):
+        """各客户端的流量统计：平均每秒字节数、与全量发送相比节省的比例"""
+        now = time.time()
+        with self.lock:
+            clients = list(self.client_stats.values())
+            channels = len(self.channels)
+            subscriptions = sum(len(members) for members in self.members.values())
+            legacy_clients = len(self.clients) - len(self.delta_clients & self.clients.keys())
+        bytes_sent = sum(stats.bytes_sent for stats in clients)
+        bytes_full = sum(stats.bytes_full for stats in clients)
+        rates = [stats.bytes_per_sec(now) for stats in clients]
+        return {
+            "clients": len(clients),
+            "legacy_clients": legacy_clients,
+            "channels": channels,
+            "subscriptions": subscriptions,
+            "messages": sum(stats.messages for stats in clients),
+            "full_syncs": sum(stats.full_syncs for stats in clients),
+            "bytes_sent": bytes_sent,
+            "bytes_full_equivalent": bytes_full,
+            "reduction": round(1 - bytes_sent / bytes_full, 4) if bytes_full else 0,
+            "bytes_per_sec_per_client": {
+                "avg": round(sum(rates) / len(rates), 2) if rates else 0,
+                "max": round(max(rates), 2) if rates else 0
+            }
+        }
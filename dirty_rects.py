@@ -0,0 +1,107 @@
+"""局部重绘（脏矩形）
+
+界面被划分成若干区域，每个区域提供三个函数：
+    bounds() -> 当前占据的矩形（不显示时为 None）
+    state()  -> 决定外观的状态（可比较的值，例如数值、文字、图片对象）
+    draw()   -> 在屏幕上绘制该区域（None 表示只由背景组成）
+每帧比较各区域的矩形和状态，变化的区域把旧矩形和新矩形都标记为脏。重绘时按矩形设置裁剪区，
+先补上背景，再按添加顺序（即从下到上的绘制顺序）重绘与之相交的所有区域，最后只把这些矩形
+推送到窗口（pygame.display.update）。
+"""
+import pygame
+
+
+class Region:
+    __slots__ = ("name", "bounds", "state", "draw", "rect", "last_state")
+
+    def __init__(self, name, bounds, state, draw):
+        self.name = name
+        self.bounds = bounds
+        self.state = state
+        self.draw = draw
+        self.rect = None  # 上一帧的矩形
+        self.last_state = None
+
+
+def merge_rects(rects):
+    """合并相交的矩形，减少重复绘制"""
+    merged = []
+    for rect in rects:
+        rect = rect.copy()
+        # 与已合并的矩形相交时合并，合并后可能与更多矩形相交，重复直到没有相交
+        index = rect.collidelist(merged)
+        while index != -1:
+            rect.union_ip(merged.pop(index))
+            index = rect.collidelist(merged)
+        merged.append(rect)
+    return merged
+
+
+class DirtyRegions:
+    def __init__(self, screen_rect):
+        self.screen_rect = pygame.Rect(screen_rect)
+        self.regions = []  # 按绘制顺序
+        self.full = True  # 下一帧整屏重绘（第一帧、从迷你游戏返回等）
+
+        # 统计数据
+        self.frames = 0
+        self.full_frames = 0
+        self.drawn_pixels = 0
+        self.last_fraction = 1.0  # 上一帧重绘的面积占整屏的比例
+
+    def add(self, name, bounds, state, draw=None):
+        self.regions.append(Region(name, bounds, state, draw))
+
+    def invalidate(self):
+        """下一帧整屏重绘"""
+        self.full = True
+
+    def collect(self):
+        """比较各区域的矩形和状态，返回本帧需要重绘的矩形（已合并、裁剪到屏幕内）"""
+        dirty = []
+        for region in self.regions:
+            rect = region.bounds()
+            state = region.state()
+            if rect != region.rect or state != region.last_state:
+                if region.rect is not None:
+                    dirty.append(region.rect)
+                if rect is not None:
+                    dirty.append(rect)
+                region.rect = rect
+                region.last_state = state
+
+        if self.full:
+            self.full = False
+            rects = [self.screen_rect.copy()]
+        else:
+            rects = [rect.clip(self.screen_rect) for rect in merge_rects(dirty)]
+            rects = [rect for rect in rects if rect.width and rect.height]
+            # 重绘面积接近整屏时直接整屏重绘
+            if sum(rect.width * rect.height for rect in rects) > self.screen_rect.width * self.screen_rect.height * 0.7:
+                rects = [self.screen_rect.copy()]
+
+        area = sum(rect.width * rect.height for rect in rects)
+        self.frames += 1
+        self.full_frames += rects == [self.screen_rect]
+        self.drawn_pixels += area
+        self.last_fraction = area / (self.screen_rect.width * self.screen_rect.height)
+        return rects
+
+    def redraw(self, screen, background, rects):
+        """在每个矩形内补上背景并按顺序重绘相交的区域"""
+        for rect in rects:
+            screen.set_clip(rect)
+            screen.blit(background, rect, rect)
+            for region in self.regions:
+                if region.draw is not None and region.rect is not None and region.rect.colliderect(rect):
+                    region.draw()
+        screen.set_clip(None)
+
+    def stats(self):
+        screen_pixels = self.screen_rect.width * self.screen_rect.height
+        return {
+            "frames": self.frames,
+            "full_frames": self.full_frames,
+            "average_fraction": round(self.drawn_pixels / (self.frames * screen_pixels), 4) if self.frames else 0,
+            "last_fraction": round(self.last_fraction, 4)
+        }
@@ -1,7 +1,139 @@
-import random
 import time
 import json
 import math
+import sys
+import functools
+from collections import namedtuple
+from contextlib import contextmanager
+from itertools import compress
+from operator import attrgetter, ne
+
+from breeds import get_breeds, DEFAULT_COLORS
+from rng import draw, new_seed, derive_seed
+from effects import get_tables, SKILL_MAX_LEVEL, HUNGER, HAPPINESS, HEALTH, CLEANLINESS, ENERGY, AFFECTION, EXP
+
+# 食物、玩耍和技能的效果表（启动时从 data/templates 加载一次）
+EFFECTS = get_tables()
+
+# 性格对应的衰减系数，同一性格的宠物共用一个对象
+DecayProfile = namedtuple("DecayProfile", ["happiness", "energy"])
+_DECAY_PROFILES = {}
+
+
+def decay_profile(happiness, energy):
+    """取得共享的衰减系数对象（相同系数只保存一份）"""
+    key = (happiness, energy)
+    profile = _DECAY_PROFILES.get(key)
+    if profile is None:
+        profile = _DECAY_PROFILES[key] = DecayProfile(happiness, energy)
+    return profile
+
+
+# 品种注册表（启动时从 data/templates/dog_breeds 加载一次）
+BREEDS = get_breeds()
+
+# 外观中的颜色以它们在调色板中的下标保存
+COLOR_PALETTE = []
+_COLOR_INDEX = {}
+
+
+def color_id(color):
+    """颜色字符串 -> 调色板下标（新颜色追加到调色板）"""
+    index = _COLOR_INDEX.get(color)
+    if index is None:
+        index = _COLOR_INDEX[color] = len(COLOR_PALETTE)
+        COLOR_PALETTE.append(color)
+    return index
+
+
+for _breed in BREEDS.breeds:
+    for _color in _breed.colors:
+        color_id(_color)
+
+
+# 修改跟踪：被跟踪的属性各占脏位掩码中的一位，属性发生变化时置位并增加版本号。
+# 存档、网络同步和界面绘制可以据此跳过没有变化的宠物。last_update_time 只是推进状态用的时间戳，
+# 不计入变化（没有属性变化的时间段从更早的时间戳重新推进结果相同）。
+# rng_counter 也要跟踪，否则重放事件后随机数流会回到旧的位置
+TRACKED_FIELDS = (
+    "hunger", "happiness", "health", "cleanliness", "energy",
+    "age", "level", "experience", "growth_stage", "affection",
+    "is_sleeping", "sleep_until", "rng_counter", "skills"
+)
+FIELD_BITS = {field: 1 << i for i, field in enumerate(TRACKED_FIELDS)}
+DIRTY_ALL = (1 << len(TRACKED_FIELDS)) - 1
+
+# skills 是可变字典，单独复制比较
+_snapshot = attrgetter(*TRACKED_FIELDS[:-1])
+_SCALAR_BITS = tuple(FIELD_BITS[field] for field in TRACKED_FIELDS[:-1])
+_SKILLS_BIT = FIELD_BITS["skills"]
+
+
+def _record_changes(dog, before, skills):
+    """对比修改前后的属性，把变化的属性置脏并增加版本号"""
+    after = _snapshot(dog)
+    changed = 0
+    if after != before:
+        # 各位互不相同，求和即按位或
+        changed = sum(compress(_SCALAR_BITS, map(ne, before, after)))
+    if dog.skills != skills:
+        changed |= _SKILLS_BIT
+    if changed:
+        dog.dirty |= changed
+        dog.version += 1
+
+
+def tracks_changes(func):
+    """装饰修改宠物属性的函数（第一个参数为 Dog）"""
+    @functools.wraps(func)
+    def wrapper(dog, *args, **kwargs):
+        before = _snapshot(dog)
+        skills = dog.skills.copy()
+        try:
+            return func(dog, *args, **kwargs)
+        finally:
+            _record_changes(dog, before, skills)
+    return wrapper
+
+
+def tracks_dog_changes(func):
+    """装饰直接修改 self.dog 属性的方法（交互系统、迷你游戏结算等）"""
+    @functools.wraps(func)
+    def wrapper(self, *args, **kwargs):
+        with track_changes(self.dog):
+            return func(self, *args, **kwargs)
+    return wrapper
+
+
+def capture_state(dog):
+    """记录被跟踪属性的当前值，之后用 changed_fields 取得发生变化的属性"""
+    return _snapshot(dog), dog.skills.copy()
+
+
+def changed_fields(dog, captured):
+    """capture_state 之后发生变化的属性 -> 当前值"""
+    before, skills = captured
+    changes = {}
+    after = _snapshot(dog)
+    if after != before:
+        for field, old, new in zip(TRACKED_FIELDS, before, after):
+            if old != new:
+                changes[field] = new
+    if dog.skills != skills:
+        changes["skills"] = dict(dog.skills)
+    return changes
+
+
+@contextmanager
+def track_changes(dog):
+    """跟踪 with 块内对宠物属性的直接修改"""
+    before = _snapshot(dog)
+    skills = dog.skills.copy()
+    try:
+        yield dog
+    finally:
+        _record_changes(dog, before, skills)
+
 
 class Dog:
     # 定义成长阶段
@@ -12,10 +144,33 @@ class Dog:
         3: "老年期"
     }
     
-    def __init__(self, name, breed, personality):
+    # 性格 -> 衰减系数（快乐度, 能量）
+    PERSONALITY_DECAY = {
+        "活泼": decay_profile(0.8, 1.2),
+        "温顺": decay_profile(1.0, 0.8),
+        "机警": decay_profile(1.1, 1.0),
+        "粘人": decay_profile(1.2, 1.0),
+        "独立": decay_profile(0.7, 0.9)
+    }
+    DEFAULT_DECAY = decay_profile(1.0, 1.0)
+    
+    # 大量宠物常驻内存，用 __slots__ 省去每个实例的 __dict__
+    __slots__ = (
+        "name", "breed_info", "personality",
+        "hunger", "happiness", "health", "cleanliness", "energy",
+        "age", "level", "experience", "growth_stage", "affection",
+        "decay", "skills", "is_sleeping", "sleep_until",
+        "body_color_id", "ear_color_id", "size_percent",
+        "last_update_time", "dirty", "version", "rng_seed", "rng_counter"
+    )
+    # 多只宠物共用的属性，估计单只宠物内存时不计入
+    SHARED_SLOTS = ("breed_info", "personality", "decay")
+    
+    def __init__(self, name, breed, personality, seed=None):
         self.name = name
-        self.breed = breed
-        self.personality = personality
+        # 同一品种的宠物共用一个品种对象；性格只有少数几种，驻留后共用同一个字符串对象
+        self.breed_info = BREEDS.get(breed)
+        self.personality = sys.intern(personality)
         
         # 基础属性
         self.hunger = 100  # 饥饿度 (越高越好)
@@ -32,24 +187,7 @@ class Dog:
         self.affection = 50  # 亲密度
         
         # 个性化属性根据性格设置
-        if personality == "活泼":
-            self.happiness_decay = 0.8
-            self.energy_decay = 1.2
-        elif personality == "温顺":
-            self.happiness_decay = 1.0
-            self.energy_decay = 0.8
-        elif personality == "机警":
-            self.happiness_decay = 1.1
-            self.energy_decay = 1.0
-        elif personality == "粘人":
-            self.happiness_decay = 1.2
-            self.energy_decay = 1.0
-        elif personality == "独立":
-            self.happiness_decay = 0.7
-            self.energy_decay = 0.9
-        else:
-            self.happiness_decay = 1.0
-            self.energy_decay = 1.0
+        self.decay = self.PERSONALITY_DECAY.get(personality, self.DEFAULT_DECAY)
         
         # 技能和训练
         self.skills = {}  # 格式: {技能名: 熟练度}
@@ -58,30 +196,101 @@ class Dog:
         self.is_sleeping = False
         self.sleep_until = 0
         
+        # 随机数流（见 rng.py）：这只宠物的所有随机决定都由种子和计数器确定，随存档保存
+        self.rng_seed = new_seed() if seed is None else seed
+        self.rng_counter = 0
+        
         # 外观
         self.appearance = self._generate_appearance()
         
         # 上次更新时间
         self.last_update_time = time.time()
+        
+        # 脏位掩码（自上次 take_dirty 以来变化的属性）和版本号（每次修改加一）
+        self.dirty = DIRTY_ALL
+        self.version = 0
+    
+    @property
+    def breed(self):
+        return self.breed_info.name
+    
+    @breed.setter
+    def breed(self, value):
+        self.breed_info = BREEDS.get(value)
+    
+    @property
+    def happiness_decay(self):
+        return self.decay.happiness
+    
+    @happiness_decay.setter
+    def happiness_decay(self, value):
+        if value != self.decay.happiness:
+            self.decay = decay_profile(value, self.decay.energy)
+    
+    @property
+    def energy_decay(self):
+        return self.decay.energy
+    
+    @energy_decay.setter
+    def energy_decay(self, value):
+        if value != self.decay.energy:
+            self.decay = decay_profile(self.decay.happiness, value)
+    
+    @property
+    def appearance(self):
+        """外观特征（颜色保存为调色板下标，体型保存为百分比）"""
+        return {
+            "body_color": COLOR_PALETTE[self.body_color_id],
+            "ear_color": COLOR_PALETTE[self.ear_color_id],
+            "size": self.size_percent / 100
+        }
+    
+    @appearance.setter
+    def appearance(self, value):
+        self.body_color_id = color_id(value.get("body_color", DEFAULT_COLORS[0]))
+        self.ear_color_id = color_id(value.get("ear_color", DEFAULT_COLORS[0]))
+        self.size_percent = int(round(value.get("size", 1.0) * 100))
+    
+    def mark_dirty(self, *fields):
+        """外部代码直接修改属性后调用，标记这些属性已变化"""
+        for field in fields:
+            self.dirty |= FIELD_BITS[field]
+        self.version += 1
+    
+    def take_dirty(self, mask=DIRTY_ALL):
+        """取出并清除 mask 中的脏位（供唯一的使用者，如界面绘制，判断哪些部分需要重绘）"""
+        dirty = self.dirty & mask
+        self.dirty &= ~mask
+        return dirty
+    
+    def random(self):
+        """从这只宠物的随机数流中取下一个 [0, 1) 之间的数"""
+        value = draw(self.rng_seed, self.rng_counter)
+        self.rng_counter += 1
+        return value
+    
+    def choice(self, seq):
+        """用这只宠物的随机数流从 seq 中随机选一个"""
+        return seq[int(self.random() * len(seq))]
     
     def _generate_appearance(self):
         """根据品种生成外观特征"""
-        colors = {
-            "柯基": ["#A0522D", "#F4A460", "#D2B48C"],
-            "哈士奇": ["#2F4F4F", "#708090", "#C0C0C0"],
-            "金毛": ["#DAA520", "#CD853F", "#B8860B"],
-            "拉布拉多": ["#8B4513", "#A0522D", "#4A2304"],
-            "柴犬": ["#D2691E", "#CD853F", "#A0522D"]
-        }
-        
-        breed_color = colors.get(self.breed, ["#A0522D", "#8B4513", "#D2691E"])
+        breed_color = self.breed_info.colors
         
         return {
-            "body_color": random.choice(breed_color),
-            "ear_color": random.choice(breed_color),
+            "body_color": self.choice(breed_color),
+            "ear_color": self.choice(breed_color),
             "size": 1.0  # 将来可以随着年龄增长
         }
     
+    def copy(self):
+        """复制一份宠物（用于回滚）：品种和衰减系数仍指向共享的对象，只复制可变的技能表"""
+        dog = Dog.__new__(Dog)
+        for slot in self.__slots__:
+            setattr(dog, slot, getattr(self, slot))
+        dog.skills = dict(self.skills)
+        return dog
+    
     def to_dict(self):
         """将狗的状态转换为字典，用于保存"""
         return {
@@ -104,13 +313,19 @@ class Dog:
             "appearance": self.appearance,
             "last_update_time": self.last_update_time,
             "growth_stage": self.growth_stage,
-            "affection": self.affection
+            "affection": self.affection,
+            "rng_seed": self.rng_seed,
+            "rng_counter": self.rng_counter
         }
     
     @classmethod
     def from_dict(cls, data):
         """从字典恢复狗的状态"""
-        dog = cls(data["name"], data["breed"], data["personality"])
+        # 没有种子的旧存档按名字派生种子，同一个存档每次加载得到相同的随机数流
+        seed = data.get("rng_seed")
+        if seed is None:
+            seed = derive_seed("dog", data["name"])
+        dog = cls(data["name"], data["breed"], data["personality"], seed=seed)
         dog.hunger = data.get("hunger", 100)
         dog.happiness = data.get("happiness", 100)
         dog.health = data.get("health", 100)
@@ -124,11 +339,14 @@ class Dog:
         dog.skills = data.get("skills", {})
         dog.is_sleeping = data.get("is_sleeping", False)
         dog.sleep_until = data.get("sleep_until", 0)
-        dog.appearance = data.get("appearance", dog._generate_appearance())
+        if "appearance" in data:
+            dog.appearance = data["appearance"]
         dog.last_update_time = data.get("last_update_time", time.time())
         dog.growth_stage = data.get("growth_stage", 0)
         dog.affection = data.get("affection", 50)
+        dog.rng_counter = data.get("rng_counter", dog.rng_counter)
         return dog
+    @tracks_changes
     def update_status(self, seconds_passed, is_day=False):
         """更新狗的状态"""
         # 如果在睡觉，检查是否应该醒来
@@ -151,14 +369,16 @@ class Dog:
         minutes_passed = seconds_passed / 60
         days_passed = minutes_passed / 5  # 5分钟现实时间 = 1天游戏时间
         
-        # 根据游戏天数更新属性（原来的衰减值乘以5以适应新的时间比例）
+        # 根据游戏天数更新属性（原来的衰减值乘以5以适应新的时间比例），
+        # 快乐度和能量的衰减还要乘上品种的倍率
+        breed = self.breed_info
         self.hunger = max(0, self.hunger - 1.0 * days_passed)  # 0.2 * 5 = 1.0
-        self.happiness = max(0, self.happiness - 1.5 * days_passed * self.happiness_decay)  # 0.3 * 5 = 1.5
+        self.happiness = max(0, self.happiness - 1.5 * days_passed * (self.happiness_decay * breed.happiness_decay))  # 0.3 * 5 = 1.5
         self.cleanliness = max(0, self.cleanliness - 0.75 * days_passed)  # 0.15 * 5 = 0.75
-        self.energy = max(0, self.energy - 0.5 * days_passed * self.energy_decay)  # 0.1 * 5 = 0.5
+        self.energy = max(0, self.energy - 0.5 * days_passed * (self.energy_decay * breed.energy_decay))  # 0.1 * 5 = 0.5
         
-        # 更新年龄
-        self.age += days_passed
+        # 更新年龄（各品种在不同成长阶段的成长速度不同）
+        self.age += days_passed * breed.growth[self.growth_stage]
         
         # 饥饿会影响健康
         if self.hunger < 20:
@@ -186,32 +406,196 @@ class Dog:
         self.last_update_time = time.time()
         
         return None
-    
+
+    @tracks_changes
+    def catch_up(self, now=None, is_day=False):
+        """按需更新：把状态从 last_update_time 精确推进到 now
+
+        与 update_status 的逐步更新不同，这里使用连续时间下的闭式解，
+        因此一次推进很长时间与分多次推进得到的结果相同。
+        """
+        if now is None:
+            now = time.time()
+        start = self.last_update_time
+        message = None
+
+        # 睡觉期间不消耗属性，醒来后从醒来的时刻开始计算
+        if self.is_sleeping:
+            if now >= self.sleep_until:
+                self.is_sleeping = False
+                self.energy = min(100, self.energy + 80)
+                start = max(start, self.sleep_until)
+                message = f"{self.name}醒来了，精力充沛！"
+            elif is_day:
+                # 还没睡够就被天亮叫醒：一直睡到现在，这段时间同样不消耗属性
+                self.is_sleeping = False
+                self.energy = min(100, self.energy + 50)
+                start = max(start, now)
+                message = f"{self.name}因为天亮了而醒来，开始活动了！"
+            else:
+                self.last_update_time = now
+                return f"{self.name}正在睡觉..."
+
+        if now > start:
+            self._advance_awake((now - start) / 60 / 5)  # 5分钟现实时间 = 1天游戏时间
+
+        self.check_level_up()
+        self.last_update_time = now
+        return message
+
+    def _advance_awake(self, days_passed):
+        """清醒状态下精确推进 days_passed 天
+
+        饥饿度、快乐度、清洁度、能量值线性衰减到0为止；健康值的变化率在
+        饥饿度<20、清洁度<30、快乐度<20 等阈值之间是时间的线性函数，
+        按阈值切分成若干段后每段积分即可得到闭式解。
+        """
+        breed = self.breed_info
+        hunger_rate = 1.0
+        happiness_rate = 1.5 * (self.happiness_decay * breed.happiness_decay)
+        cleanliness_rate = 0.75
+
+        # 属性跨过阈值（包括降到0）的时刻
+        breakpoints = {0.0, days_passed}
+        for value, rate, thresholds in ((self.hunger, hunger_rate, (50, 20, 0)),
+                                        (self.happiness, happiness_rate, (50, 20, 0)),
+                                        (self.cleanliness, cleanliness_rate, (30, 0))):
+            if rate > 0:
+                for threshold in thresholds:
+                    t = (value - threshold) / rate
+                    if 0 < t < days_passed:
+                        breakpoints.add(t)
+        breakpoints = sorted(breakpoints)
+
+        health = self.health
+        for start, end in zip(breakpoints, breakpoints[1:]):
+            # 段内各阈值状态不变，用段中点判断
+            mid = (start + end) / 2
+            hunger = max(0, self.hunger - hunger_rate * start)
+            happiness = max(0, self.happiness - happiness_rate * start)
+            cleanliness = max(0, self.cleanliness - cleanliness_rate * start)
+            hunger_mid = self.hunger - hunger_rate * mid
+            happiness_mid = self.happiness - happiness_rate * mid
+            cleanliness_mid = self.cleanliness - cleanliness_rate * mid
+
+            # 段起点的健康变化率 rate 和它随时间的斜率 slope（每天）
+            rate = 0.0
+            slope = 0.0
+            if hunger_mid < 20:
+                rate -= (20 - hunger) * 0.25
+                if hunger_mid > 0:
+                    slope -= hunger_rate * 0.25
+            if cleanliness_mid < 30:
+                rate -= (30 - cleanliness) * 0.15
+                if cleanliness_mid > 0:
+                    slope -= cleanliness_rate * 0.15
+            if happiness_mid < 20:
+                rate -= (20 - happiness) * 0.1
+                if happiness_mid > 0:
+                    slope -= happiness_rate * 0.1
+            if hunger_mid > 50 and happiness_mid > 50:
+                rate += 0.5
+
+            health = self._integrate_health(health, rate, slope, end - start)
+
+        self.health = health
+        self.hunger = max(0, self.hunger - hunger_rate * days_passed)
+        self.happiness = max(0, self.happiness - happiness_rate * days_passed)
+        self.cleanliness = max(0, self.cleanliness - cleanliness_rate * days_passed)
+        self.energy = max(0, self.energy - 0.5 * days_passed * (self.energy_decay * breed.energy_decay))
+        self.age += days_passed * breed.growth[self.growth_stage]
+
+    @staticmethod
+    def _integrate_health(health, rate, slope, duration):
+        """在 duration 天内积分 health' = rate + slope * t，结果限制在 0-100 之间
+
+        slope 不会为正（各属性只会下降），所以健康值曲线是上凸的：
+        碰到100后保持不变直到变化率降为0，降到0后不会再回升。
+        """
+        if rate > 0:
+            # 到达100所需的时间：解 health + rate*t + slope*t²/2 = 100
+            discriminant = rate * rate + 2 * slope * (100 - health)
+            if health >= 100:
+                hit = 0.0
+            elif discriminant >= 0:
+                hit = 2 * (100 - health) / (rate + math.sqrt(discriminant))
+            else:
+                hit = duration
+
+            if hit < duration:
+                # 在100处停留到变化率降为0，之后开始下降
+                if slope >= 0:
+                    return 100
+                peak = -rate / slope
+                if peak >= duration:
+                    return 100
+                remaining = duration - peak
+                return max(0, 100 + slope * remaining * remaining / 2)
+
+        health = health + rate * duration + slope * duration * duration / 2
+        return max(0, min(100, health))
+
     def add_experience(self, amount):
         """增加经验值"""
         self.experience += amount
         self.check_level_up()
     
+    @staticmethod
+    def levels_gained(level, experience):
+        """按累计经验曲线（第 L 级升级需要 L*100 经验）一次算出能连升几级
+
+        从 level 级连升 k 级共需 50*k*(2*level+k-1) 经验，解二次不等式得到 k，
+        再用精确整数比较修正浮点误差。返回 (升级数, 消耗的经验)。
+        """
+        if experience < level * 100:
+            return 0, 0
+        b = 2 * level - 1
+        k = int((math.sqrt(b * b + experience / 12.5) - b) / 2)
+        if 50 * k * (b + k) > experience:
+            k -= 1
+        elif 50 * (k + 1) * (b + k + 1) <= experience:
+            k += 1
+        return k, 50 * k * (b + k)
+    
     def check_level_up(self):
-        """检查是否升级"""
-        # 计算升级所需经验 (随等级增加)
-        required_exp = self.level * 100
-        
-        if self.experience >= required_exp:
-            self.level += 1
-            self.experience -= required_exp
-            
-            # 升级奖励
-            self.hunger = min(100, self.hunger + 20)
-            self.happiness = min(100, self.happiness + 20)
-            self.health = min(100, self.health + 20)
-            self.cleanliness = min(100, self.cleanliness + 20)
-            self.energy = min(100, self.energy + 20)
-            
+        """检查是否升级（经验足够时一次连升多级）"""
+        levels, used_exp = self.levels_gained(self.level, self.experience)
+        if not levels:
+            return None
+        
+        self.level += levels
+        self.experience -= used_exp
+        
+        # 升级奖励（每升一级各项 +20）
+        bonus = 20 * levels
+        self.hunger = min(100, self.hunger + bonus)
+        self.happiness = min(100, self.happiness + bonus)
+        self.health = min(100, self.health + bonus)
+        self.cleanliness = min(100, self.cleanliness + bonus)
+        self.energy = min(100, self.energy + bonus)
+        
+        if levels == 1:
             return f"{self.name}升级了！现在是{self.level}级了！"
-        
-        return None
+        return f"{self.name}连升{levels}级！现在是{self.level}级了！"
+    
+    def apply_effect(self, row):
+        """应用效果表中的一行：各项属性增减后限制在 0-100，最后增加经验"""
+        if row[HUNGER]:
+            self.hunger = max(0, min(100, self.hunger + row[HUNGER]))
+        if row[HAPPINESS]:
+            self.happiness = max(0, min(100, self.happiness + row[HAPPINESS]))
+        if row[HEALTH]:
+            self.health = max(0, min(100, self.health + row[HEALTH]))
+        if row[CLEANLINESS]:
+            self.cleanliness = max(0, min(100, self.cleanliness + row[CLEANLINESS]))
+        if row[ENERGY]:
+            self.energy = max(0, min(100, self.energy + row[ENERGY]))
+        if row[AFFECTION]:
+            self.affection = max(0, min(100, self.affection + row[AFFECTION]))
+        if row[EXP]:
+            self.add_experience(row[EXP])
     
+    @tracks_changes
     def feed(self, food_type="普通狗粮"):
         """喂食"""
         if self.is_sleeping:
@@ -221,34 +605,21 @@ class Dog:
         if self.energy < 10:
             return f"{self.name}太累了，没力气吃东西。"
         
-        food_values = {
-            "普通狗粮": {"hunger": 20, "happiness": 5, "health": 5, "exp": 10},
-            "高级狗粮": {"hunger": 30, "happiness": 10, "health": 15, "exp": 15},
-            "狗狗零食": {"hunger": 10, "happiness": 15, "health": 0, "exp": 5},
-            "鸡肉": {"hunger": 25, "happiness": 20, "health": 10, "exp": 20},
-            "牛肉": {"hunger": 35, "happiness": 25, "health": 15, "exp": 25}
-        }
-        
-        if food_type not in food_values:
-            food_type = "普通狗粮"
-        
-        values = food_values[food_type]
+        foods = EFFECTS.foods
+        food_id = foods.id(food_type)
+        food_type = foods.name(food_id)
+        values = foods.rows[food_id]
         
         # 如果已经吃饱了
         if self.hunger >= 95:
             return f"{self.name}已经吃饱了，不想再吃了。"
         
-        # 增加属性
-        self.hunger = min(100, self.hunger + values["hunger"])
-        self.happiness = min(100, self.happiness + values["happiness"])
-        self.health = min(100, self.health + values["health"])
-        self.energy = max(0, self.energy - 5)  # 吃饭消耗一点能量
-        
-        # 增加经验
-        self.add_experience(values["exp"])
+        # 增加属性（吃饭也会消耗一点能量）并增加经验
+        self.apply_effect(values)
         
         return f"{self.name}吃了{food_type}，看起来很满足！"
     
+    @tracks_changes
     def play(self, game_type="普通玩耍"):
         """玩耍"""
         if self.is_sleeping:
@@ -262,39 +633,25 @@ class Dog:
         if self.hunger < 20:
             return f"{self.name}太饿了，没心情玩。"
         
-        game_values = {
-            "普通玩耍": {"happiness": 20, "energy": 15, "hunger": 10, "exp": 15},
-            "接飞盘": {"happiness": 25, "energy": 25, "hunger": 15, "exp": 25},
-            "追球": {"happiness": 30, "energy": 30, "hunger": 20, "exp": 20},
-            "拔河": {"happiness": 35, "energy": 35, "hunger": 20, "exp": 30},
-            "智力游戏": {"happiness": 25, "energy": 15, "hunger": 10, "exp": 35}
-        }
-        
-        if game_type not in game_values:
-            game_type = "普通玩耍"
+        games = EFFECTS.games
+        game_id = games.id(game_type)
+        game_type = games.name(game_id)
         
-        values = game_values[game_type]
-        
-        # 更新属性
-        self.happiness = min(100, self.happiness + values["happiness"])
-        self.energy = max(0, self.energy - values["energy"])
-        self.hunger = max(0, self.hunger - values["hunger"])
-        self.cleanliness = max(0, self.cleanliness - 5)  # 玩耍会变脏
-        
-        # 增加经验
-        self.add_experience(values["exp"])
+        # 更新属性（玩耍会变脏）并增加经验
+        self.apply_effect(games.rows[game_id])
         
         # 技能相关
         skill_message = ""
         if game_type in self.skills:
             # 已有技能练习可能会提升熟练度
             skill_level = self.skills[game_type]
-            if skill_level < 5 and random.random() < 0.3:  # 30%几率提升
+            if skill_level < 5 and self.random() < 0.3:  # 30%几率提升
                 self.skills[game_type] += 1
                 skill_message = f"，{game_type}技能提升到了{self.skills[game_type]}级！"
         
         return f"{self.name}和你玩了{game_type}，非常开心{skill_message}"
     
+    @tracks_changes
     def bath(self):
         """洗澡"""
         if self.is_sleeping:
@@ -309,7 +666,7 @@ class Dog:
             return f"{self.name}已经很干净了，不需要洗澡。"
         
         # 有些狗不喜欢洗澡
-        happiness_change = -10 if random.random() < 0.3 else 10
+        happiness_change = -10 if self.random() < 0.3 else 10
         
         # 更新属性
         self.cleanliness = 100
@@ -324,6 +681,7 @@ class Dog:
         else:
             return f"{self.name}洗完澡了，看起来很享受，现在非常干净！"
     
+    @tracks_changes
     def sleep(self, hours=8, is_day=False):
         """睡觉"""
         if self.is_sleeping:
@@ -343,6 +701,7 @@ class Dog:
         
         return f"{self.name}开始睡觉了，预计{hours}小时后醒来。"
     
+    @tracks_changes
     def train(self, skill):
         """训练技能"""
         if self.is_sleeping:
@@ -358,65 +717,48 @@ class Dog:
         if self.happiness < 30:
             return f"{self.name}心情不好，不想训练。"
         
-        # 允许训练的技能列表
-        allowed_skills = ["坐下", "握手", "打滚", "接飞盘", "捡球", "原地等待"]
-        
-        if skill not in allowed_skills:
+        # 允许训练的技能及各等级的成功率、效果来自技能模板
+        skills = EFFECTS.skills
+        if skill not in skills:
             return f"不能教{self.name}这个技能，请选择基本技能。"
         
+        # 品种的技能倾向影响训练成功率
+        affinity = self.breed_info.skill_affinity[skills.ids[skill]]
+        
         # 检查是否已有此技能
         if skill in self.skills:
             current_level = self.skills[skill]
-            if current_level >= 5:  # 技能等级上限
+            if current_level >= SKILL_MAX_LEVEL:  # 技能等级上限
                 return f"{self.name}的{skill}技能已经达到最高级了！"
             
-            # 训练成功率根据当前等级调整
-            success_rate = 0.8 - (current_level - 1) * 0.1  # 等级越高越难提升
+            # 训练成功率根据目标等级调整，等级越高越难提升
+            i = skills.index(skill, current_level + 1)
             
-            if random.random() < success_rate:
+            if self.random() < skills.success_rate[i] * affinity:
                 self.skills[skill] += 1
-                
-                # 更新属性
-                self.energy = max(0, self.energy - 20)
-                self.hunger = max(0, self.hunger - 10)
-                self.happiness = max(0, min(100, self.happiness + 10))
-                
-                # 增加经验
-                self.add_experience(25)
-                
+                self.apply_effect(skills.reward[i])
                 return f"{self.name}的{skill}技能提升到了{self.skills[skill]}级！"
             else:
                 # 训练失败也会消耗
-                self.energy = max(0, self.energy - 15)
-                self.hunger = max(0, self.hunger - 5)
-                
+                self.apply_effect(skills.failure[i])
                 return f"{self.name}尝试学习{skill}，但这次没有进步。"
         else:
             # 学习新技能
-            success_rate = 0.7  # 新技能基础学习成功率
+            i = skills.index(skill, 1)
             
             # 根据狗的等级提高成功率
-            success_rate += min(0.2, (self.level - 1) * 0.05)
+            success_rate = skills.success_rate[i] * affinity + min(0.2, (self.level - 1) * 0.05)
             
-            if random.random() < success_rate:
+            if self.random() < success_rate:
                 self.skills[skill] = 1
-                
-                # 更新属性
-                self.energy = max(0, self.energy - 25)
-                self.hunger = max(0, self.hunger - 15)
-                self.happiness = max(0, min(100, self.happiness + 15))
-                
-                # 增加经验
-                self.add_experience(50)
-                
+                self.apply_effect(skills.reward[i])
                 return f"{self.name}学会了新技能：{skill}！"
             else:
                 # 学习失败
-                self.energy = max(0, self.energy - 20)
-                self.hunger = max(0, self.hunger - 10)
-                
+                self.apply_effect(skills.failure[i])
                 return f"{self.name}还没有理解{skill}是什么，需要更多训练。"
     
+    @tracks_changes
     def pet(self):
         """抚摸"""
         if self.is_sleeping:
@@ -450,6 +792,7 @@ class Dog:
         else:
             return f"{self.name}开心地享受着你的抚摸，尾巴轻轻摇摆。亲密度增加了{affection_increase}点。"
     
+    @tracks_changes
     def update_growth_stage(self):
         """根据年龄更新成长阶段，返回是否有变化"""
         old_stage = self.growth_stage
@@ -0,0 +1,151 @@
+import os
+import json
+
+# 效果向量的各列：效果表中的每一行都按这个顺序保存各属性的变化量
+STATS = ("hunger", "happiness", "health", "cleanliness", "energy", "affection", "exp")
+STAT_INDEX = {stat: i for i, stat in enumerate(STATS)}
+HUNGER, HAPPINESS, HEALTH, CLEANLINESS, ENERGY, AFFECTION, EXP = range(len(STATS))
+
+TEMPLATE_DIR = os.path.join(os.path.dirname(__file__), "data", "templates")
+
+# 技能等级上限
+SKILL_MAX_LEVEL = 5
+
+
+def effect_row(effects, base=None):
+    """{属性: 变化量} -> 按 STATS 排列的元组，base 为未指定属性的默认值"""
+    row = list(base) if base is not None else [0] * len(STATS)
+    for stat, value in effects.items():
+        if stat in STAT_INDEX:
+            row[STAT_INDEX[stat]] = value
+    return tuple(row)
+
+
+class EffectTable:
+    """名称 -> 整数 id -> 效果向量的查找表
+
+    rows[id] 为该项的效果元组，matrix 为所有行组成的 NumPy 矩阵（用于向量化批量计算）。
+    """
+
+    def __init__(self, entries, default=None):
+        self.names = [name for name, _ in entries]
+        self.ids = {name: i for i, name in enumerate(self.names)}
+        self.rows = [row for _, row in entries]
+        # 未知名称时使用的默认项
+        self.default_id = self.ids.get(default, 0)
+        self._matrix = None
+
+    def __len__(self):
+        return len(self.rows)
+
+    def id(self, name):
+        return self.ids.get(name, self.default_id)
+
+    def name(self, effect_id):
+        return self.names[effect_id]
+
+    @property
+    def matrix(self):
+        if self._matrix is None:
+            import numpy as np
+            self._matrix = np.array(self.rows, dtype=np.float64).reshape(len(self.rows), len(STATS))
+        return self._matrix
+
+
+class SkillTable:
+    """技能训练表：按 (技能 id, 目标等级) 展平的成功率、成功效果和失败消耗
+
+    下标为 skill_id * (SKILL_MAX_LEVEL + 1) + 目标等级，目标等级 1 表示学习新技能。
+    tags[skill_id] 为模板中技能的 id 和类别，品种的技能倾向按它们匹配。
+    """
+
+    # 模板中完全没有定义等级的技能使用原有的训练曲线
+    LEARN_RATE = 0.7
+    LEARN_REWARD = effect_row({"happiness": 15, "exp": 50, "energy": -25, "hunger": -15})
+    LEARN_FAILURE = effect_row({"energy": -20, "hunger": -10})
+    UPGRADE_REWARD = effect_row({"happiness": 10, "exp": 25, "energy": -20, "hunger": -10})
+    UPGRADE_FAILURE = effect_row({"energy": -15, "hunger": -5})
+
+    def __init__(self, skills, tags=None):
+        self.names = [name for name, _ in skills]
+        self.tags = tags or [()] * len(self.names)
+        self.ids = {name: i for i, name in enumerate(self.names)}
+        self.stride = SKILL_MAX_LEVEL + 1
+        size = len(self.names) * self.stride
+        self.success_rate = [0.0] * size
+        self.reward = [effect_row({})] * size
+        self.failure = [effect_row({})] * size
+
+        for skill_id, (_, levels) in enumerate(skills):
+            for level in range(1, SKILL_MAX_LEVEL + 1):
+                i = skill_id * self.stride + level
+                self.success_rate[i], self.reward[i], self.failure[i] = self.level_spec(levels, level)
+
+    @classmethod
+    def level_spec(cls, levels, level):
+        """目标等级的 (成功率, 成功效果, 失败消耗)
+
+        模板中定义的等级完全由模板决定（没有写的属性不变化）；超过模板最高等级时沿用模板中最后一级，
+        模板没有定义任何等级时使用默认训练曲线。
+        """
+        defined = sorted(int(key) for key in levels if str(key).isdigit())
+        if not defined:
+            if level == 1:
+                return cls.LEARN_RATE, cls.LEARN_REWARD, cls.LEARN_FAILURE
+            # 等级越高越难提升
+            return 0.8 - (level - 2) * 0.1, cls.UPGRADE_REWARD, cls.UPGRADE_FAILURE
+        below = [key for key in defined if key <= level]
+        spec = levels[str(below[-1] if below else defined[0])]
+        return (spec.get("success_rate", cls.LEARN_RATE if level == 1 else 0.8 - (level - 2) * 0.1),
+                effect_row(spec.get("reward", {})),
+                effect_row(spec.get("failure", {})))
+
+    def __contains__(self, name):
+        return name in self.ids
+
+    def index(self, name, target_level):
+        return self.ids[name] * self.stride + target_level
+
+
+class EffectTables:
+    """启动时从 data/templates 加载一次的食物、玩耍和技能效果表"""
+
+    def __init__(self, template_dir=TEMPLATE_DIR):
+        foods = self._load(template_dir, "food", "foods")
+        games = self._load(template_dir, "play", "games")
+        skills = self._load(template_dir, "skills", "skills")
+
+        self.foods = EffectTable([(item["name"], effect_row(item.get("effects", {}))) for item in foods],
+                                 default="普通狗粮")
+        self.games = EffectTable([(item["name"], effect_row(item.get("effects", {}))) for item in games],
+                                 default="普通玩耍")
+        self.skills = SkillTable([(item["name"], item.get("levels", {})) for item in skills],
+                                 [(item.get("id"), item.get("category")) for item in skills])
+
+    @staticmethod
+    def _load(template_dir, directory, key):
+        """读取目录下所有模板文件中 key 对应的条目（按文件名排序，保持定义顺序）"""
+        items = []
+        path = os.path.join(template_dir, directory)
+        if not os.path.isdir(path):
+            return items
+        for file in sorted(os.listdir(path)):
+            if not file.endswith(".json"):
+                continue
+            try:
+                with open(os.path.join(path, file), "r", encoding="utf-8") as f:
+                    items.extend(json.load(f).get(key, {}).values())
+            except Exception as e:
+                print(f"加载模板失败: {file}, 错误: {e}")
+        return items
+
+
+_tables = None
+
+
+def get_tables():
+    """全局共享的效果表（首次使用时加载）"""
+    global _tables
+    if _tables is None:
+        _tables = EffectTables()
+    return _tables
@@ -0,0 +1,130 @@
+"""共享字体管理
+
+界面中的文字大多是中文，需要找到能显示中文的字体。查找系统字体（pygame.font.SysFont /
+match_font 会扫描系统中的所有字体）和逐个试渲染都比较慢，所以每种字体用途（role）只在第一次
+启动时查找一次，结果写入 data/cache/fonts.json，之后启动直接使用缓存的字体文件；
+字体文件被删除或候选列表修改后会重新查找。
+
+各模块通过 get_font(用途, 字号) 取得共享的 Font 对象，不要自己创建字体：
+同一个 (用途, 字号) 只创建一次，文字缓存（text_cache.py）也能在各模块间共享渲染结果。
+"""
+import os
+import sys
+import json
+
+import pygame
+
+CACHE_PATH = os.path.join(os.path.dirname(__file__), "data/cache/fonts.json")
+
+# 用途 -> 候选字体：先检查常见的字体文件路径（只需判断文件是否存在），再按名称查找系统字体
+FONT_ROLES = {
+    # 界面、迷你游戏和交互提示中的中文文字
+    "text": {
+        "paths": [
+            os.path.join(os.environ.get("WINDIR", "C:\\Windows"), "Fonts", "simhei.ttf"),
+            os.path.join(os.environ.get("WINDIR", "C:\\Windows"), "Fonts", "msyh.ttc"),
+            "/System/Library/Fonts/PingFang.ttc",
+            "/System/Library/Fonts/STHeiti Medium.ttc",
+            "/usr/share/fonts/truetype/droid/DroidSansFallbackFull.ttf",
+            "/usr/share/fonts/opentype/noto/NotoSansCJK-Regular.ttc",
+            "/usr/share/fonts/truetype/wqy/wqy-microhei.ttc",
+        ],
+        "names": ["simhei", "microsoftyahei", "pingfangsc", "notosanscjksc", "wenquanyimicrohei",
+                  "droidsansfallback", "arialunicodems"],
+        "sample": "测试",
+    },
+}
+
+
+def _renders(font, sample):
+    """字体能否显示 sample 中的字符：缺字时每个字符都渲染成相同的方框"""
+    glyphs = [pygame.image.tobytes(font.render(char, True, (0, 0, 0)), "RGBA") for char in sample]
+    return len(set(glyphs)) == len(glyphs)
+
+
+def _find(role):
+    """按候选顺序查找用途可用的字体文件，都不可用时返回 None（使用 pygame 默认字体）"""
+    spec = FONT_ROLES[role]
+    paths = [path for path in spec["paths"] if os.path.exists(path)]
+    for name in spec["names"]:
+        path = pygame.font.match_font(name)
+        if path:
+            paths.append(path)
+    for path in paths:
+        try:
+            if _renders(pygame.font.Font(path, 16), spec["sample"]):
+                return path
+        except (OSError, pygame.error):
+            continue
+    return None
+
+
+class FontManager:
+    def __init__(self, cache_path=CACHE_PATH):
+        self.cache_path = cache_path
+        self.paths = {}  # 用途 -> 字体文件路径（None 表示默认字体）
+        self.fonts = {}  # (用途, 字号) -> Font
+        self.lookups = 0  # 本次启动实际查找字体的次数（缓存命中时为 0）
+        self._load_cache()
+
+    def _load_cache(self):
+        try:
+            with open(self.cache_path, "r", encoding="utf-8") as f:
+                cached = json.load(f)
+        except (OSError, ValueError):
+            return
+        if cached.get("platform") != sys.platform:
+            return
+        for role, entry in cached.get("roles", {}).items():
+            spec = FONT_ROLES.get(role)
+            # 候选列表变化或字体文件已不存在时重新查找
+            if spec is None or entry.get("candidates") != spec["paths"] + spec["names"]:
+                continue
+            path = entry.get("path")
+            if path is None or os.path.exists(path):
+                self.paths[role] = path
+
+    def _save_cache(self):
+        roles = {role: {"path": path, "candidates": FONT_ROLES[role]["paths"] + FONT_ROLES[role]["names"]}
+                 for role, path in self.paths.items()}
+        try:
+            os.makedirs(os.path.dirname(self.cache_path), exist_ok=True)
+            with open(self.cache_path, "w", encoding="utf-8") as f:
+                json.dump({"platform": sys.platform, "roles": roles}, f, ensure_ascii=False, indent=4)
+        except OSError as e:
+            print(f"保存字体缓存失败: {e}")
+
+    def path(self, role):
+        """用途使用的字体文件（None 表示 pygame 默认字体）"""
+        if role not in self.paths:
+            self.lookups += 1
+            self.paths[role] = _find(role)
+            if self.paths[role] is None:
+                print(f"没有找到能显示中文的字体，使用默认字体（用途: {role}）")
+            self._save_cache()
+        return self.paths[role]
+
+    def get(self, role, size):
+        key = (role, size)
+        font = self.fonts.get(key)
+        if font is None:
+            if not pygame.font.get_init():
+                pygame.font.init()
+            font = self.fonts[key] = pygame.font.Font(self.path(role), size)
+        return font
+
+
+_manager = None
+
+
+def get_font_manager():
+    """全局共享的字体管理器"""
+    global _manager
+    if _manager is None:
+        _manager = FontManager()
+    return _manager
+
+
+def get_font(role, size):
+    """共享的 Font 对象：同一个 (用途, 字号) 在整个进程中只创建一次"""
+    return get_font_manager().get(role, size)
@@ -1,11 +1,15 @@
 import pygame
-import random
 import time
 import math
+from fonts import get_font
+from rng import RandomStream
+from text_cache import render_text
 
 class EmotionSystem:
-    def __init__(self, dog):
+    def __init__(self, dog, rng=None):
         self.dog = dog
+        # 随机数流（由游戏会话注入，便于重现）
+        self.rng = rng if rng is not None else RandomStream()
         
         # 情感状态
         self.current_emotion = "normal"  # 当前情感：normal, happy, sad, angry, tired, hungry, excited
@@ -15,6 +19,7 @@ class EmotionSystem:
         # 情感记忆
         self.last_interaction_time = time.time()
         self.interaction_history = []    # 记录最近的互动
+        self.font = get_font("text", 16)
         self.interaction_count = 0       # 互动次数
         
         # 情感表达
@@ -128,7 +133,7 @@ class EmotionSystem:
                 self.emotion_intensity = min(1.0, hours_without_interaction / 48)  # 最多2天达到最大强度
             else:
                 # 根据无互动时间逐渐变得无聊或想念
-                if random.random() < 0.7:  # 70%几率变得想念
+                if self.rng.random() < 0.7:  # 70%几率变得想念
                     self.current_emotion = "sad"
                 else:  # 30%几率变得生气
                     self.current_emotion = "angry"
@@ -149,13 +154,13 @@ class EmotionSystem:
             self.current_emotion = "tired"
             self.emotion_intensity = (20 - self.dog.energy) / 20
         elif self.dog.happiness < 30:
-            if random.random() < 0.7:  # 70%几率变得悲伤
+            if self.rng.random() < 0.7:  # 70%几率变得悲伤
                 self.current_emotion = "sad"
             else:  # 30%几率变得生气
                 self.current_emotion = "angry"
             self.emotion_intensity = (30 - self.dog.happiness) / 30
         elif self.dog.happiness > 80:
-            if random.random() < 0.6:  # 60%几率变得开心
+            if self.rng.random() < 0.6:  # 60%几率变得开心
                 self.current_emotion = "happy"
             else:  # 40%几率变得兴奋
                 self.current_emotion = "excited"
@@ -167,7 +172,7 @@ class EmotionSystem:
         # 性格影响情感表达
         if self.dog.personality == "活泼":
             # 活泼的狗更容易表现出兴奋和开心
-            if self.current_emotion == "normal" and random.random() < 0.3:
+            if self.current_emotion == "normal" and self.rng.random() < 0.3:
                 self.current_emotion = "happy"
         elif self.dog.personality == "温顺":
             # 温顺的狗很少表现出生气
@@ -175,15 +180,15 @@ class EmotionSystem:
                 self.current_emotion = "sad"
         elif self.dog.personality == "机警":
             # 机警的狗更容易表现出紧张或兴奋
-            if self.current_emotion == "normal" and random.random() < 0.3:
+            if self.current_emotion == "normal" and self.rng.random() < 0.3:
                 self.current_emotion = "excited"
         elif self.dog.personality == "顽皮":
             # 顽皮的狗更容易表现出兴奋
-            if self.current_emotion == "happy" and random.random() < 0.5:
+            if self.current_emotion == "happy" and self.rng.random() < 0.5:
                 self.current_emotion = "excited"
         elif self.dog.personality == "独立":
             # 独立的狗情感表达更加平静
-            if self.current_emotion in ["excited", "happy"] and random.random() < 0.3:
+            if self.current_emotion in ["excited", "happy"] and self.rng.random() < 0.3:
                 self.current_emotion = "normal"
     
     def record_interaction(self, interaction_type):
@@ -306,9 +311,9 @@ class EmotionSystem:
         }
         
         if self.current_emotion in messages:
-            return random.choice(messages[self.current_emotion])
+            return self.rng.choice(messages[self.current_emotion])
         else:
-            return random.choice(messages["normal"])
+            return self.rng.choice(messages["normal"])
     
     def render(self, screen, x, y):
         """渲染情感表达"""
@@ -326,6 +331,5 @@ class EmotionSystem:
         screen.blit(scaled_expression, (pos_x, pos_y))
         
         # 绘制情感描述（可选）
-        font = pygame.font.SysFont("Arial", 16)
-        emotion_text = font.render(self.get_emotion_description(), True, (50, 50, 50))
+        emotion_text = render_text(self.font, self.get_emotion_description(), (50, 50, 50))
         screen.blit(emotion_text, (x - emotion_text.get_width() // 2, y + scaled_size // 2 + 5))
\ No newline at end of file
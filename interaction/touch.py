@@ -1,7 +1,10 @@
 import pygame
 import math
 import time
-import random
+
+from dog import tracks_dog_changes
+from fonts import get_font
+from text_cache import render_text
 
 class TouchInteraction:
     def __init__(self, dog):
@@ -15,6 +18,8 @@ class TouchInteraction:
         # 手势识别
         self.gesture = None
         self.gesture_time = 0
+        self.font = get_font("text", 20)
+        self.font_small = get_font("text", 16)
         
         # 可识别的手势
         self.gestures = {
@@ -142,6 +147,7 @@ class TouchInteraction:
         # 执行手势对应的动作
         self.perform_gesture_action()
     
+    @tracks_dog_changes
     def perform_gesture_action(self):
         """执行手势对应的动作"""
         if self.gesture == "pat":  # 抚摸
@@ -153,7 +159,7 @@ class TouchInteraction:
             # 检查狗狗是否有"打滚"技能
             if "打滚" in self.dog.skills and self.dog.skills["打滚"] > 0:
                 success_rate = 0.5 + (self.dog.skills["打滚"] * 0.1)
-                if random.random() < success_rate:
+                if self.dog.random() < success_rate:
                     self.message = f"{self.dog.name}看到你画圈的手势，开心地打了个滚！"
                     self.dog.happiness = min(100, self.dog.happiness + 5)
                     self.dog.energy = max(0, self.dog.energy - 3)
@@ -204,17 +210,16 @@ class TouchInteraction:
         
         # 绘制消息
         if self.message:
-            font = pygame.font.SysFont("Arial", 20)
-            text_surface = font.render(self.message, True, (50, 50, 50))
+            text_surface = render_text(self.font, self.message, (50, 50, 50))
             screen.blit(text_surface, (x, y))
         
         # 如果有识别出的手势，显示手势名称
         if self.gesture:
-            font_small = pygame.font.SysFont("Arial", 16)
             gesture_name = self.gestures.get(self.gesture, self.gesture)
-            gesture_text = font_small.render(f"手势: {gesture_name}", True, (100, 100, 100))
+            gesture_text = render_text(self.font_small, f"手势: {gesture_name}", (100, 100, 100))
             screen.blit(gesture_text, (x, y + 30))
 
+    @tracks_dog_changes
     def handle_shake(self, shake_intensity):
         """处理设备摇晃"""
         # 注意：这个功能在实际应用中需要通过加速度传感器实现
@@ -1,19 +1,26 @@
 import pygame
 import os
 import time
-import random
+
+from dog import tracks_dog_changes
+from fonts import get_font
+from rng import RandomStream
+from text_cache import render_text
 
 # 注意：这是一个模拟的语音识别模块
 # 在实际应用中，可以使用如speech_recognition库进行真实的语音识别
 # 但为了简化实现，这里使用模拟的方式
 
 class VoiceRecognition:
-    def __init__(self, dog):
+    def __init__(self, dog, rng=None):
         self.dog = dog
+        # 随机数流（由游戏会话注入，便于重现）
+        self.rng = rng if rng is not None else RandomStream()
         self.is_listening = False
         self.recognized_command = None
         self.recognition_time = 0
         self.recognition_duration = 2  # 模拟识别需要2秒
+        self.font = get_font("text", 20)
         
         # 可识别的命令列表
         self.available_commands = {
@@ -48,8 +55,8 @@ class VoiceRecognition:
                 self.is_listening = False
                 
                 # 模拟识别结果（随机选择一个命令或无法识别）
-                if random.random() < 0.7:  # 70%的识别成功率
-                    self.recognized_command = random.choice(list(self.available_commands.keys()))
+                if self.rng.random() < 0.7:  # 70%的识别成功率
+                    self.recognized_command = self.rng.choice(list(self.available_commands.keys()))
                     self.status_message = f"识别到命令: {self.recognized_command}"
                     
                     # 执行命令
@@ -74,12 +81,13 @@ class VoiceRecognition:
         
         return False
     
+    @tracks_dog_changes
     def command_sit(self):
         """坐下命令"""
         skill_level = self.dog.skills.get("坐下", 0)
         success_rate = 0.5 + (skill_level * 0.1)  # 基础成功率50%，每级技能+10%
         
-        if random.random() < success_rate:
+        if self.dog.random() < success_rate:
             self.status_message = f"{self.dog.name}听到命令后乖乖坐下了"
             # 增加亲密度
             self.dog.affection = min(100, self.dog.affection + 2)
@@ -88,12 +96,13 @@ class VoiceRecognition:
             self.status_message = f"{self.dog.name}没有理解你的命令"
             return False
     
+    @tracks_dog_changes
     def command_handshake(self):
         """握手命令"""
         skill_level = self.dog.skills.get("握手", 0)
         success_rate = 0.5 + (skill_level * 0.1)
         
-        if random.random() < success_rate:
+        if self.dog.random() < success_rate:
             self.status_message = f"{self.dog.name}伸出爪子和你握手"
             self.dog.affection = min(100, self.dog.affection + 2)
             self.dog.happiness = min(100, self.dog.happiness + 3)
@@ -102,12 +111,13 @@ class VoiceRecognition:
             self.status_message = f"{self.dog.name}歪着头看着你"
             return False
     
+    @tracks_dog_changes
     def command_roll(self):
         """打滚命令"""
         skill_level = self.dog.skills.get("打滚", 0)
         success_rate = 0.4 + (skill_level * 0.12)  # 基础成功率40%，每级技能+12%
         
-        if random.random() < success_rate:
+        if self.dog.random() < success_rate:
             self.status_message = f"{self.dog.name}在地上开心地打了个滚"
             self.dog.affection = min(100, self.dog.affection + 3)
             self.dog.happiness = min(100, self.dog.happiness + 5)
@@ -118,12 +128,13 @@ class VoiceRecognition:
             self.status_message = f"{self.dog.name}似乎不想打滚"
             return False
     
+    @tracks_dog_changes
     def command_fetch(self):
         """接飞盘命令"""
         skill_level = self.dog.skills.get("接飞盘", 0)
         success_rate = 0.3 + (skill_level * 0.14)  # 基础成功率30%，每级技能+14%
         
-        if random.random() < success_rate:
+        if self.dog.random() < success_rate:
             self.status_message = f"{self.dog.name}准备好接飞盘了！"
             self.dog.happiness = min(100, self.dog.happiness + 4)
             return True
@@ -131,12 +142,13 @@ class VoiceRecognition:
             self.status_message = f"{self.dog.name}看起来对飞盘不感兴趣"
             return False
     
+    @tracks_dog_changes
     def command_ball(self):
         """捡球命令"""
         skill_level = self.dog.skills.get("捡球", 0)
         success_rate = 0.4 + (skill_level * 0.12)
         
-        if random.random() < success_rate:
+        if self.dog.random() < success_rate:
             self.status_message = f"{self.dog.name}跑去找球了"
             self.dog.happiness = min(100, self.dog.happiness + 4)
             # 消耗一点精力
@@ -146,12 +158,13 @@ class VoiceRecognition:
             self.status_message = f"{self.dog.name}没有理解你的命令"
             return False
     
+    @tracks_dog_changes
     def command_stay(self):
         """等待命令"""
         skill_level = self.dog.skills.get("原地等待", 0)
         success_rate = 0.3 + (skill_level * 0.14)
         
-        if random.random() < success_rate:
+        if self.dog.random() < success_rate:
             self.status_message = f"{self.dog.name}乖乖地原地等待"
             self.dog.affection = min(100, self.dog.affection + 3)
             return True
@@ -159,6 +172,7 @@ class VoiceRecognition:
             self.status_message = f"{self.dog.name}坐不住，到处走动"
             return False
     
+    @tracks_dog_changes
     def command_praise(self):
         """表扬命令"""
         # 表扬总是成功的
@@ -167,13 +181,26 @@ class VoiceRecognition:
         self.dog.affection = min(100, self.dog.affection + 3)
         return True
     
+    def render_state(self):
+        """决定显示内容的状态（用于局部重绘）：状态消息、监听动画帧和进度条长度"""
+        if not self.is_listening:
+            return self.status_message, None, None
+        elapsed_time = time.time() - self.recognition_time
+        progress = min(1.0, elapsed_time / self.recognition_duration)
+        return self.status_message, int((elapsed_time % 1) * 4), int(100 * progress)
+    
+    def bounds(self, x, y):
+        """在 (x, y) 处绘制时占据的矩形：状态消息、动画指示器（最大半径16）和进度条"""
+        rect = pygame.Rect(x - 36, y - 6, 136, 41)
+        if self.status_message:
+            rect.union_ip(render_text(self.font, self.status_message, (50, 50, 50)).get_rect(topleft=(x, y)))
+        return rect
+    
     def render(self, screen, x, y):
         """渲染语音识别状态"""
-        font = pygame.font.SysFont("Arial", 20)
-        
         # 绘制状态消息
         if self.status_message:
-            text_surface = font.render(self.status_message, True, (50, 50, 50))
+            text_surface = render_text(self.font, self.status_message, (50, 50, 50))
             screen.blit(text_surface, (x, y))
         
         # 如果正在监听，绘制动画指示器
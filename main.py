@@ -1,16 +1,23 @@
 import pygame
 import sys
 import os
-import random
-from dog import Dog
+from dog import Dog, track_changes
+from rng import RandomStream, derive_seed
 from ui import UI
+from text_cache import get_text_cache
 import json
 import time
 from minigames import FetchGame, MazeGame, RaceGame
 from interaction import VoiceRecognition, TouchInteraction, EmotionSystem
 
 class Game:
-    def __init__(self):
+    def __init__(self, seed=None, dirty_rects=None):
+        # 会话的随机数流：指定种子（参数或环境变量 PET_SEED）时整个会话的随机事件可以重现，
+        # 各子系统使用由它派生的独立子流
+        if seed is None and os.environ.get("PET_SEED"):
+            seed = int(os.environ["PET_SEED"])
+        self.rng = RandomStream(seed)
+        
         # 初始化Pygame
         pygame.init()
         pygame.display.set_caption("AI宠物狗狗")
@@ -24,9 +31,14 @@ class Game:
         
         # 加载或创建宠物
         self.dog = self.load_dog()
+        # 上次保存时宠物的版本号，没有变化时跳过定时保存
+        self.saved_version = None
+        
+        # 画面效果的画质（off/low/medium/high）：环境变量 PET_QUALITY 优先，其次是桌面版设置
+        self.quality = os.environ.get("PET_QUALITY") or self.load_settings().get("display", {}).get("effects_quality", "high")
         
         # 初始化UI
-        self.ui = UI(self.screen, self.dog)
+        self.ui = UI(self.screen, self.dog, self.rng.spawn("ui"), self.quality)
         
         # 游戏时钟
         self.clock = pygame.time.Clock()
@@ -43,16 +55,16 @@ class Game:
         
         # 迷你游戏系统
         self.mini_games = {
-            "fetch": FetchGame(self.screen, self.dog, self.ui),
-            "maze": MazeGame(self.screen, self.dog, self.ui),
-            "race": RaceGame(self.screen, self.dog, self.ui)
+            "fetch": FetchGame(self.screen, self.dog, self.ui, self.rng.spawn("fetch")),
+            "maze": MazeGame(self.screen, self.dog, self.ui, self.rng.spawn("maze")),
+            "race": RaceGame(self.screen, self.dog, self.ui, self.rng.spawn("race"))
         }
         self.current_game = None
         
         # 交互系统
-        self.voice_recognition = VoiceRecognition(self.dog)
+        self.voice_recognition = VoiceRecognition(self.dog, self.rng.spawn("voice"))
         self.touch_interaction = TouchInteraction(self.dog)
-        self.emotion_system = EmotionSystem(self.dog)
+        self.emotion_system = EmotionSystem(self.dog, self.rng.spawn("emotion"))
         
         # 是否激活语音识别
         self.voice_active = False
@@ -65,11 +77,29 @@ class Game:
         }
         
         # 天气变化计时器
-        self.weather_change_time = time.time() + random.uniform(300, 600)  # 5-10分钟后随机变化天气
+        self.weather_change_time = time.time() + self.rng.uniform(300, 600)  # 5-10分钟后随机变化天气
         
         # 季节持续时间（游戏内天数）
         self.season_duration = 30  # 30天一个季节
         
+        # 调试信息（F3 切换）：帧率和缓存统计
+        self.show_debug = False
+        
+        # 局部重绘模式（参数或环境变量 PET_DIRTY_RECTS=1）：主界面只重绘并推送有变化的区域，
+        # 适合长时间运行在低功耗设备上；迷你游戏仍然整屏重绘
+        if dirty_rects is None:
+            dirty_rects = os.environ.get("PET_DIRTY_RECTS", "") not in ("", "0")
+        self.dirty_rects = dirty_rects
+        # Game 自己绘制的覆盖层也登记为局部重绘的区域
+        self.ui.regions.add("voice",
+                            lambda: self.voice_recognition.bounds(*self.voice_position()) if self.voice_active else None,
+                            lambda: self.voice_recognition.render_state() if self.voice_active else None,
+                            lambda: self.voice_recognition.render(self.screen, *self.voice_position()))
+        self.ui.regions.add("debug",
+                            lambda: self.debug_overlay_rect() if self.show_debug else None,
+                            lambda: tuple(self.debug_overlay_lines()) if self.show_debug else None,
+                            self.render_debug_overlay)
+        
         # 游戏运行标志
         self.running = True
     
@@ -89,6 +119,16 @@ class Game:
         for directory in directories:
             os.makedirs(os.path.join(os.path.dirname(__file__), directory), exist_ok=True)
     
+    def load_settings(self):
+        """读取桌面版设置，读取失败时使用默认设置"""
+        settings_path = os.path.join(os.path.dirname(__file__), "data/saves/desktop/settings.json")
+        try:
+            with open(settings_path, "r", encoding="utf-8") as f:
+                return json.load(f)
+        except (OSError, ValueError) as e:
+            print(f"加载设置失败: {e}")
+            return {}
+    
     def load_dog(self):
         """加载宠物数据或创建新宠物"""
         save_path = os.path.join(os.path.dirname(__file__), "data/saves/dog.json")
@@ -100,17 +140,19 @@ class Game:
                 return Dog.from_dict(dog_data)
             except Exception as e:
                 print(f"加载宠物数据失败: {e}")
-                return Dog("小狗", "未知品种", "友好")  # 提供所有必需的参数
-        else:
-            return Dog("小狗", "未知品种", "友好")  # 提供所有必需的参数
+        # 新宠物的种子由会话种子派生（提供所有必需的参数）
+        return Dog("小狗", "未知品种", "友好", seed=derive_seed(self.rng.seed, "dog"))
     
-    def save_dog(self):
-        """保存宠物数据"""
+    def save_dog(self, force=False):
+        """保存宠物数据（宠物自上次保存以来没有变化时跳过，force 为 True 时总是保存）"""
+        if not force and self.dog.version == self.saved_version:
+            return
         save_path = os.path.join(os.path.dirname(__file__), "data/saves/dog.json")
         os.makedirs(os.path.dirname(save_path), exist_ok=True)
         
         with open(save_path, "w") as f:
             json.dump(self.dog.to_dict(), f, indent=4)
+        self.saved_version = self.dog.version
     
     def add_toy_to_environment(self, toy_type, position):
         """向环境中添加玩具"""
@@ -139,7 +181,7 @@ class Game:
         if weather_type is None:
             current_weather = self.environment["weather"]
             available_weathers = [w for w in weather_types if w != current_weather]
-            weather_type = random.choice(available_weathers)
+            weather_type = self.rng.choice(available_weathers)
         
         # 确保天气类型有效
         if weather_type in weather_types:
@@ -177,7 +219,7 @@ class Game:
                 self.ui.display_message(f"天气变为{weather_name}！{', '.join(effect_desc)}")
                 
                 # 设置下一次天气变化时间
-                self.weather_change_time = time.time() + random.uniform(300, 600)
+                self.weather_change_time = time.time() + self.rng.uniform(300, 600)
                 
                 # 更新UI中的环境信息
                 self.ui.update_environment(self.environment)
@@ -299,14 +341,15 @@ class Game:
                 # 游戏结束，处理奖励
                 game_result = self.mini_games[self.current_game].get_result()
                 if game_result and "score" in game_result:
-                    # 根据分数给予奖励
-                    happiness_gain = min(20, game_result["score"] / 5)
-                    self.dog.happiness = min(100, self.dog.happiness + happiness_gain)
-                    
-                    # 提升相关技能
-                    if self.current_game == "fetch" and "接飞盘" in self.dog.skills:
-                        skill_exp = min(5, game_result["score"] / 10)
-                        self.dog.skills["接飞盘"] = min(5, self.dog.skills["接飞盘"] + skill_exp * 0.1)
+                    with track_changes(self.dog):
+                        # 根据分数给予奖励
+                        happiness_gain = min(20, game_result["score"] / 5)
+                        self.dog.happiness = min(100, self.dog.happiness + happiness_gain)
+                        
+                        # 提升相关技能
+                        if self.current_game == "fetch" and "接飞盘" in self.dog.skills:
+                            skill_exp = min(5, game_result["score"] / 10)
+                            self.dog.skills["接飞盘"] = min(5, self.dog.skills["接飞盘"] + skill_exp * 0.1)
                     
                     # 显示游戏结果
                     self.ui.display_message(f"游戏结束！得分: {game_result['score']}，快乐度+{int(happiness_gain)}")
@@ -329,6 +372,9 @@ class Game:
         for event in pygame.event.get():
             if event.type == pygame.QUIT:
                 self.running = False
+            elif event.type == pygame.KEYDOWN and event.key == pygame.K_F3:
+                self.show_debug = not self.show_debug
+                continue
             
             # 如果正在进行迷你游戏，将事件传递给迷你游戏
             if self.current_game:
@@ -368,13 +414,48 @@ class Game:
                     elif action.startswith("place_toy_"):
                         toy_type = action.replace("place_toy_", "")
                         # 放置玩具在随机位置
-                        position = (random.randint(100, self.width - 100), 
-                                    random.randint(300, self.height - 100))
+                        position = (self.rng.randint(100, self.width - 100), 
+                                    self.rng.randint(300, self.height - 100))
                         self.add_toy_to_environment(toy_type, position)
                     elif action.startswith("change_weather_"):
                         weather_type = action.replace("change_weather_", "")
                         self.change_weather(weather_type)
     
+    def voice_position(self):
+        return 20, self.height - 60
+    
+    def debug_overlay_lines(self):
+        """调试信息的各行文字（显示的是上一帧的数据）"""
+        text_stats = get_text_cache().stats()
+        lines = [
+            f"FPS: {self.clock.get_fps():.1f}",
+            f"文字缓存: {text_stats['entries']}/{text_stats['max_entries']}  命中率 {text_stats['hit_rate']:.1%}",
+            f"本帧文字: 命中 {text_stats['frame_hits']} 未命中 {text_stats['frame_misses']}  {text_stats['frame_ms']:.2f} ms",
+            f"背景缓存: {len(self.ui.background_cache)}/{self.ui.background_cache_size}",
+        ]
+        if self.dirty_rects:
+            region_stats = self.ui.regions.stats()
+            lines.append(f"局部重绘: 本帧 {region_stats['last_fraction']:.1%}  平均 {region_stats['average_fraction']:.1%}")
+        return lines
+    
+    def debug_overlay_rect(self):
+        line_height = self.ui.font_small.get_linesize()
+        count = len(self.debug_overlay_lines())
+        return pygame.Rect(10, self.height - 15 - line_height * count, 330, line_height * count + 10)
+    
+    def render_debug_overlay(self):
+        """在左下角显示帧率、文字缓存、背景缓存和局部重绘的统计"""
+        lines = self.debug_overlay_lines()
+        # 调试文字每帧都在变化，直接渲染，不进入文字缓存也不计入统计
+        font = self.ui.font_small
+        line_height = font.get_linesize()
+        rect = self.debug_overlay_rect()
+        panel = pygame.Surface(rect.size, pygame.SRCALPHA)
+        panel.fill((0, 0, 0, 160))
+        self.screen.blit(panel, rect)
+        for i, line in enumerate(lines):
+            self.screen.blit(font.render(line, True, (255, 255, 255)), (15, rect.top + 5 + i * line_height))
+    
     def run(self):
         """运行游戏主循环"""
         while self.running:
@@ -387,23 +468,39 @@ class Game:
             # 渲染界面
             if self.current_game:
                 self.mini_games[self.current_game].render()
+                if self.show_debug:
+                    self.render_debug_overlay()
+                # 回到主界面时整屏重绘
+                self.ui.regions.invalidate()
+                dirty = None
             else:
                 # 更新UI中的环境信息
                 self.ui.update_environment(self.environment)
-                self.ui.render()
-                
-                # 如果语音识别开启，显示语音识别状态
-                if self.voice_active:
-                    self.voice_recognition.render(self.screen, 20, self.height - 60)
+                if self.dirty_rects:
+                    # 只重绘有变化的区域（包括语音识别状态和调试信息）
+                    dirty = self.ui.render_dirty()
+                else:
+                    self.ui.render()
+                    
+                    # 如果语音识别开启，显示语音识别状态
+                    if self.voice_active:
+                        self.voice_recognition.render(self.screen, *self.voice_position())
+                    if self.show_debug:
+                        self.render_debug_overlay()
+                    dirty = None
+            get_text_cache().end_frame()
             
-            # 更新显示
-            pygame.display.flip()
+            # 更新显示：局部重绘时只推送重绘过的矩形
+            if dirty is None:
+                pygame.display.flip()
+            else:
+                pygame.display.update(dirty)
             
             # 控制帧率
             self.clock.tick(self.fps)
         
         # 退出前保存数据
-        self.save_dog()
+        self.save_dog(force=True)
         pygame.quit()
         sys.exit()
 
@@ -1,11 +1,17 @@
 import pygame
-import random
 import math
 
+from dog import tracks_dog_changes
+from fonts import get_font
+from rng import RandomStream
+from text_cache import render_text
+
 class FetchGame:
-    def __init__(self, screen, dog, ui):
+    def __init__(self, screen, dog, ui, rng=None):
         self.screen = screen
         self.dog = dog
+        # 随机数流（由游戏会话注入，便于重现）
+        self.rng = rng if rng is not None else RandomStream()
         self.ui = ui
         self.width, self.height = screen.get_size()
         
@@ -38,8 +44,8 @@ class FetchGame:
         }
         
         # 字体
-        self.font = pygame.font.SysFont("Arial", 24)
-        self.font_large = pygame.font.SysFont("Arial", 36)
+        self.font = get_font("text", 24)
+        self.font_large = get_font("text", 36)
         
         # 加载资源
         self.load_resources()
@@ -143,8 +149,8 @@ class FetchGame:
                 self.dog_game_pos[0] += self.dog_speed if dx > 0 else -self.dog_speed
         else:
             # 没有飞盘时随机移动
-            if random.random() < 0.01:  # 1%的几率改变目标
-                self.dog_target[0] = random.randint(50, self.width - 50)
+            if self.rng.random() < 0.01:  # 1%的几率改变目标
+                self.dog_target[0] = self.rng.randint(50, self.width - 50)
             
             dx = self.dog_target[0] - self.dog_game_pos[0]
             distance = abs(dx)
@@ -166,7 +172,7 @@ class FetchGame:
             pygame.draw.rect(self.screen, button_color, button_rect)
             pygame.draw.rect(self.screen, (50, 50, 50), button_rect, 2)  # 边框
             
-            text = self.font_large.render("开始游戏", True, self.colors["button_text"])
+            text = render_text(self.font_large, "开始游戏", self.colors["button_text"])
             text_rect = text.get_rect(center=button_rect.center)
             self.screen.blit(text, text_rect)
             
@@ -179,7 +185,7 @@ class FetchGame:
             ]
             
             for i, line in enumerate(instructions):
-                text = self.font.render(line, True, self.colors["text"])
+                text = render_text(self.font, line, self.colors["text"])
                 self.screen.blit(text, (self.width//2 - text.get_width()//2, self.height//2 - 150 + i*40))
             
             return
@@ -192,15 +198,15 @@ class FetchGame:
             self.screen.blit(self.frisbee_img, (self.frisbee_pos[0] - 15, self.frisbee_pos[1] - 15))
         
         # 绘制分数和时间
-        score_text = self.font.render(f"得分: {self.score}", True, self.colors["text"])
+        score_text = render_text(self.font, f"得分: {self.score}", self.colors["text"])
         self.screen.blit(score_text, (20, 20))
         
-        time_text = self.font.render(f"时间: {int(self.time_left)}秒", True, self.colors["text"])
+        time_text = render_text(self.font, f"时间: {int(self.time_left)}秒", self.colors["text"])
         self.screen.blit(time_text, (self.width - 150, 20))
         
         # 如果没有投掷飞盘，显示提示
         if not self.frisbee_thrown:
-            hint_text = self.font.render("点击并拖动鼠标来投掷飞盘", True, self.colors["text"])
+            hint_text = render_text(self.font, "点击并拖动鼠标来投掷飞盘", self.colors["text"])
             self.screen.blit(hint_text, (self.width//2 - hint_text.get_width()//2, 60))
     
     def handle_event(self, event):
@@ -220,6 +226,7 @@ class FetchGame:
             if hasattr(self, 'start_pos') and not self.frisbee_thrown:
                 self.throw_frisbee(self.start_pos, event.pos)
     
+    @tracks_dog_changes
     def end_game(self):
         """结束游戏"""
         self.active = False
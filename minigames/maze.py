@@ -1,11 +1,17 @@
 import pygame
-import random
 import time
 
+from dog import tracks_dog_changes
+from fonts import get_font
+from rng import RandomStream
+from text_cache import render_text
+
 class MazeGame:
-    def __init__(self, screen, dog, ui):
+    def __init__(self, screen, dog, ui, rng=None):
         self.screen = screen
         self.dog = dog
+        # 随机数流（由游戏会话注入，便于重现）
+        self.rng = rng if rng is not None else RandomStream()
         self.ui = ui
         self.width, self.height = screen.get_size()
         
@@ -43,8 +49,8 @@ class MazeGame:
         }
         
         # 字体
-        self.font = pygame.font.SysFont("Arial", 24)
-        self.font_large = pygame.font.SysFont("Arial", 36)
+        self.font = get_font("text", 24)
+        self.font_large = get_font("text", 36)
     
     def generate_maze(self):
         """生成随机迷宫"""
@@ -54,7 +60,7 @@ class MazeGame:
         # 使用深度优先搜索生成迷宫
         def carve_passages(x, y):
             directions = [(0, 1), (1, 0), (0, -1), (-1, 0)]
-            random.shuffle(directions)
+            self.rng.shuffle(directions)
             
             for dx, dy in directions:
                 nx, ny = x + dx*2, y + dy*2
@@ -65,8 +71,8 @@ class MazeGame:
                     carve_passages(nx, ny)
         
         # 从随机位置开始生成
-        start_x = random.randrange(0, self.maze_width, 2)
-        start_y = random.randrange(0, self.maze_height, 2)
+        start_x = self.rng.randrange(0, self.maze_width, 2)
+        start_y = self.rng.randrange(0, self.maze_height, 2)
         if start_x == self.maze_width - 1:
             start_x -= 1
         if start_y == self.maze_height - 1:
@@ -87,8 +93,8 @@ class MazeGame:
         self.treats_pos = []
         for _ in range(5):  # 添加5个奖励
             while True:
-                x = random.randint(0, self.maze_width-1)
-                y = random.randint(0, self.maze_height-1)
+                x = self.rng.randint(0, self.maze_width-1)
+                y = self.rng.randint(0, self.maze_height-1)
                 if self.maze[y][x] == 0 and [x, y] != self.player_pos and [x, y] != self.target_pos and [x, y] not in self.treats_pos:
                     self.treats_pos.append([x, y])
                     break
@@ -158,7 +164,7 @@ class MazeGame:
             pygame.draw.rect(self.screen, button_color, button_rect)
             pygame.draw.rect(self.screen, (50, 50, 50), button_rect, 2)  # 边框
             
-            text = self.font_large.render("开始游戏", True, self.colors["button_text"])
+            text = render_text(self.font_large, "开始游戏", self.colors["button_text"])
             text_rect = text.get_rect(center=button_rect.center)
             self.screen.blit(text, text_rect)
             
@@ -171,7 +177,7 @@ class MazeGame:
             ]
             
             for i, line in enumerate(instructions):
-                text = self.font.render(line, True, self.colors["text"])
+                text = render_text(self.font, line, self.colors["text"])
                 self.screen.blit(text, (self.width//2 - text.get_width()//2, self.height//2 - 150 + i*40))
             
             return
@@ -213,10 +219,10 @@ class MazeGame:
                           (player_x, player_y), self.cell_size // 3)
         
         # 绘制分数和时间
-        score_text = self.font.render(f"得分: {self.score}", True, self.colors["text"])
+        score_text = render_text(self.font, f"得分: {self.score}", self.colors["text"])
         self.screen.blit(score_text, (20, 20))
         
-        time_text = self.font.render(f"时间: {int(self.time_left)}秒", True, self.colors["text"])
+        time_text = render_text(self.font, f"时间: {int(self.time_left)}秒", self.colors["text"])
         self.screen.blit(time_text, (self.width - 150, 20))
     
     def handle_event(self, event):
@@ -239,6 +245,7 @@ class MazeGame:
             elif event.key == pygame.K_RIGHT:
                 self.move_player(1, 0)
     
+    @tracks_dog_changes
     def end_game(self):
         """结束游戏"""
         self.active = False
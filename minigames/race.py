@@ -1,13 +1,19 @@
 import pygame
-import random
 import time
 import os
 import json
 
+from dog import tracks_dog_changes
+from fonts import get_font
+from rng import RandomStream
+from text_cache import render_text
+
 class RaceGame:
-    def __init__(self, screen, dog, ui):
+    def __init__(self, screen, dog, ui, rng=None):
         self.screen = screen
         self.dog = dog
+        # 随机数流（由游戏会话注入，便于重现）
+        self.rng = rng if rng is not None else RandomStream()
         self.ui = ui
         self.width, self.height = screen.get_size()
         
@@ -99,8 +105,8 @@ class RaceGame:
         }
         
         # 字体
-        self.font = pygame.font.SysFont("Arial", 24)
-        self.font_large = pygame.font.SysFont("Arial", 36)
+        self.font = get_font("text", 24)
+        self.font_large = get_font("text", 36)
         
         # 加载资源
         self.load_resources()
@@ -273,10 +279,10 @@ class RaceGame:
         self.obstacle_timer -= 1
         if self.obstacle_timer <= 0:
             # 随机障碍物间隔
-            self.obstacle_timer = random.randint(60, 120)
+            self.obstacle_timer = self.rng.randint(60, 120)
             
             # 随机选择障碍物类型
-            obstacle_type = random.choice(self.available_obstacles)
+            obstacle_type = self.rng.choice(self.available_obstacles)
             obstacle_info = self.obstacle_types[obstacle_type]
             
             # 创建新障碍物
@@ -358,7 +364,7 @@ class RaceGame:
             return
             
         # 绘制季节信息
-        season_text = self.font.render(f"季节: {self.current_season}", True, self.colors["text"])
+        season_text = render_text(self.font, f"季节: {self.current_season}", self.colors["text"])
         self.screen.blit(season_text, (20, 80))
         
         # 多人对战模式下绘制所有玩家
@@ -372,7 +378,7 @@ class RaceGame:
                 self.screen.blit(player_surface, (player["x"], player["y"] - 20))
                 
                 # 绘制玩家分数
-                score_text = self.font.render(f"玩家{i+1}: {player['score']}", True, self.colors["text"])
+                score_text = render_text(self.font, f"玩家{i+1}: {player['score']}", self.colors["text"])
                 self.screen.blit(score_text, (self.width - 200, 20 + i * 30))
         
         # 绘制地面
@@ -404,11 +410,11 @@ class RaceGame:
     def render_start_menu(self):
         """渲染开始菜单"""
         # 绘制游戏标题
-        title = self.font_large.render("障碍赛跑游戏", True, self.colors["text"])
+        title = render_text(self.font_large, "障碍赛跑游戏", self.colors["text"])
         self.screen.blit(title, (self.width//2 - title.get_width()//2, self.height//4))
         
         # 绘制难度选择
-        difficulty_text = self.font.render(f"难度: {self.difficulty_names[self.difficulty]}", True, self.colors["text"])
+        difficulty_text = render_text(self.font, f"难度: {self.difficulty_names[self.difficulty]}", self.colors["text"])
         self.screen.blit(difficulty_text, (self.width//2 - difficulty_text.get_width()//2, self.height//2 - 80))
         
         # 难度调整按钮
@@ -418,8 +424,8 @@ class RaceGame:
         pygame.draw.rect(self.screen, self.colors["button"], left_rect)
         pygame.draw.rect(self.screen, self.colors["button"], right_rect)
         
-        left_text = self.font.render("<", True, self.colors["button_text"])
-        right_text = self.font.render(">", True, self.colors["button_text"])
+        left_text = render_text(self.font, "<", self.colors["button_text"])
+        right_text = render_text(self.font, ">", self.colors["button_text"])
         
         self.screen.blit(left_text, (left_rect.centerx - left_text.get_width()//2, left_rect.centery - left_text.get_height()//2))
         self.screen.blit(right_text, (right_rect.centerx - right_text.get_width()//2, right_rect.centery - right_text.get_height()//2))
@@ -432,7 +438,7 @@ class RaceGame:
         pygame.draw.rect(self.screen, button_color, button_rect)
         pygame.draw.rect(self.screen, (50, 50, 50), button_rect, 2)  # 边框
         
-        text = self.font_large.render("开始游戏", True, self.colors["button_text"])
+        text = render_text(self.font_large, "开始游戏", self.colors["button_text"])
         text_rect = text.get_rect(center=button_rect.center)
         self.screen.blit(text, text_rect)
         
@@ -444,29 +450,29 @@ class RaceGame:
         ]
         
         for i, line in enumerate(instructions):
-            text = self.font.render(line, True, self.colors["text"])
+            text = render_text(self.font, line, self.colors["text"])
             self.screen.blit(text, (self.width//2 - text.get_width()//2, self.height//2 + 80 + i*30))
         
         # 绘制成就信息
         unlocked_count = sum(1 for ach in self.achievements.values() if ach["unlocked"])
-        ach_text = self.font.render(f"已解锁成就: {unlocked_count}/{len(self.achievements)}", True, self.colors["achievement"])
+        ach_text = render_text(self.font, f"已解锁成就: {unlocked_count}/{len(self.achievements)}", self.colors["achievement"])
         self.screen.blit(ach_text, (self.width//2 - ach_text.get_width()//2, self.height//2 + 180))
     
     def render_game_info(self):
         """渲染游戏信息"""
         # 绘制分数和时间
-        score_text = self.font.render(f"得分: {self.score}", True, self.colors["text"])
+        score_text = render_text(self.font, f"得分: {self.score}", self.colors["text"])
         self.screen.blit(score_text, (20, 20))
         
-        time_text = self.font.render(f"时间: {int(self.time_left)}秒", True, self.colors["text"])
+        time_text = render_text(self.font, f"时间: {int(self.time_left)}秒", self.colors["text"])
         self.screen.blit(time_text, (self.width - 150, 20))
         
         # 绘制难度
-        diff_text = self.font.render(f"难度: {self.difficulty_names[self.difficulty]}", True, self.colors["text"])
+        diff_text = render_text(self.font, f"难度: {self.difficulty_names[self.difficulty]}", self.colors["text"])
         self.screen.blit(diff_text, (20, 50))
         
         # 绘制完美跳跃和触碰次数
-        perfect_text = self.font.render(f"完美跳跃: {self.perfect_jumps}", True, self.colors["player_perfect"])
+        perfect_text = render_text(self.font, f"完美跳跃: {self.perfect_jumps}", self.colors["player_perfect"])
         self.screen.blit(perfect_text, (self.width - 150, 50))
     
     def handle_event(self, event):
@@ -494,6 +500,7 @@ class RaceGame:
                 self.player_jump = True
                 self.player_jump_height = 12  # 跳跃初始速度
     
+    @tracks_dog_changes
     def end_game(self):
         """结束游戏"""
         self.active = False
@@ -0,0 +1,161 @@
+"""天气粒子（雨、雪、云）
+
+粒子的位置和速度保存在预先分配的 NumPy 数组中，每帧用向量运算一起推进，移出画面的粒子从另一侧
+重新进入，所以画面是连续的而不是每帧随机闪烁。粒子图像只在创建时绘制一次，绘制时用
+Surface.blits 一次批量提交。粒子数量按画质设置缩放。
+"""
+import math
+
+import numpy as np
+import pygame
+
+# 画质 -> 粒子数量比例
+QUALITY_SCALE = {"off": 0.0, "low": 0.3, "medium": 0.6, "high": 1.0}
+
+# 天气 -> 粒子效果
+#   count: 高画质下的粒子数
+#   speed: 速度范围（像素/秒），direction: 运动方向
+#   area: 生成范围 (x最小, x最大, y最小, y最大)，None 表示整个画面
+#   sway: 左右飘动的幅度（像素/秒）
+WEATHER_EFFECTS = {
+    "rainy": {"count": 100, "speed": (500, 700), "direction": (-5, 15), "area": None, "sway": 0},
+    "snowy": {"count": 50, "speed": (40, 80), "direction": (0, 1), "area": None, "sway": 25},
+    "cloudy": {"count": 5, "speed": (8, 20), "direction": (1, 0), "area": (50, -100, 50, 150), "sway": 0},
+}
+
+# 两帧之间最多推进的时间（秒），窗口被拖动或切回主界面后不会一下跳很远
+MAX_STEP = 0.1
+
+
+def _rain_sprite():
+    sprite = pygame.Surface((6, 16), pygame.SRCALPHA)
+    pygame.draw.line(sprite, (200, 200, 255), (5, 0), (0, 15), 1)
+    return sprite
+
+
+def _snow_sprite():
+    sprite = pygame.Surface((5, 5), pygame.SRCALPHA)
+    pygame.draw.circle(sprite, (255, 255, 255), (2, 2), 2)
+    return sprite
+
+
+def _cloud_sprite():
+    sprite = pygame.Surface((100, 60), pygame.SRCALPHA)
+    cloud_color = (220, 220, 220)
+    pygame.draw.circle(sprite, cloud_color, (30, 30), 30)
+    pygame.draw.circle(sprite, cloud_color, (50, 20), 25)
+    pygame.draw.circle(sprite, cloud_color, (70, 30), 35)
+    return sprite
+
+
+SPRITES = {"rainy": _rain_sprite, "snowy": _snow_sprite, "cloudy": _cloud_sprite}
+# 整体透明度（没有列出的不透明）
+SPRITE_ALPHA = {"cloudy": 180}
+
+
+class ParticleSystem:
+    def __init__(self, width, height, rng=None, quality="high"):
+        self.width = width
+        self.height = height
+        # 粒子的随机数由会话的随机数流派生，指定种子时可以重现
+        self.random = np.random.default_rng(rng.seed if rng is not None else None)
+        self.scale = QUALITY_SCALE.get(quality, 1.0)
+
+        # 粒子池：按最多的粒子数一次分配，切换天气和画质时只重置前 count 个
+        capacity = max(effect["count"] for effect in WEATHER_EFFECTS.values())
+        self.position = np.zeros((capacity, 2), dtype=np.float32)
+        self.velocity = np.zeros((capacity, 2), dtype=np.float32)
+        self.phase = np.zeros(capacity, dtype=np.float32)
+        self.count = 0
+        self.weather = None
+        self.time = None
+        # 每次粒子移动或天气变化时加一（用于局部重绘判断画面是否变化）
+        self.version = 0
+        self.sprites = {}
+
+    def set_quality(self, quality):
+        self.scale = QUALITY_SCALE.get(quality, 1.0)
+        self.start(self.weather)
+
+    def sprite(self, weather):
+        """天气对应的粒子图像（首次使用时绘制）"""
+        sprite = self.sprites.get(weather)
+        if sprite is None:
+            sprite = SPRITES[weather]()
+            if pygame.display.get_surface() is not None:
+                sprite = sprite.convert_alpha()
+            if weather in SPRITE_ALPHA:
+                # 把整体透明度直接乘进每个像素的透明度，效果与 set_alpha 相同，但绘制时少一次混合
+                sprite.fill((255, 255, 255, SPRITE_ALPHA[weather]), special_flags=pygame.BLEND_RGBA_MULT)
+            self.sprites[weather] = sprite
+        return sprite
+
+    def start(self, weather):
+        """切换天气：在生成范围内随机放置粒子（画面中一开始就有雨雪，而不是从顶端开始落下）"""
+        self.weather = weather
+        self.version += 1
+        effect = WEATHER_EFFECTS.get(weather)
+        self.count = int(round(effect["count"] * self.scale)) if effect else 0
+        n = self.count
+        if not n:
+            return
+        x_min, x_max, y_min, y_max = self.spawn_area(effect)
+        self.position[:n, 0] = self.random.uniform(x_min, x_max, n)
+        self.position[:n, 1] = self.random.uniform(y_min, y_max, n)
+        dx, dy = effect["direction"]
+        length = math.hypot(dx, dy)
+        speed = self.random.uniform(*effect["speed"], n)
+        self.velocity[:n, 0] = speed * (dx / length)
+        self.velocity[:n, 1] = speed * (dy / length)
+        self.phase[:n] = self.random.uniform(0, 2 * math.pi, n)
+
+    def spawn_area(self, effect):
+        area = effect["area"]
+        if area is None:
+            return 0, self.width, 0, self.height
+        # 负数表示相对于画面右侧（下侧）的距离
+        x_min, x_max, y_min, y_max = area
+        return (x_min, x_max if x_max > 0 else self.width + x_max,
+                y_min, y_max if y_max > 0 else self.height + y_max)
+
+    def update(self, weather, now):
+        """推进到时刻 now（秒）；天气变化时重新生成粒子"""
+        if weather != self.weather:
+            self.start(weather)
+            self.time = now
+            return
+        dt = min(max(now - self.time, 0.0), MAX_STEP) if self.time is not None else 0.0
+        self.time = now
+        n = self.count
+        if not n or not dt:
+            return
+        effect = WEATHER_EFFECTS[weather]
+        position = self.position[:n]
+        position += self.velocity[:n] * dt
+        if effect["sway"]:
+            position[:, 0] += effect["sway"] * dt * np.sin(now * 2.0 + self.phase[:n])
+
+        # 完全移出画面的粒子从另一侧重新进入（留出一个粒子图像的边距）
+        sprite_width, sprite_height = self.sprite(weather).get_size()
+        position[:, 0] = np.mod(position[:, 0] + sprite_width, self.width + sprite_width) - sprite_width
+        if effect["direction"][1]:
+            position[:, 1] = np.mod(position[:, 1] + sprite_height, self.height + sprite_height) - sprite_height
+        self.version += 1
+
+    def bounds(self):
+        """所有粒子占据的矩形（没有粒子时为 None）"""
+        n = self.count
+        if not n:
+            return None
+        sprite_width, sprite_height = self.sprite(self.weather).get_size()
+        position = self.position[:n]
+        left, top = np.floor(position.min(axis=0))
+        right, bottom = np.ceil(position.max(axis=0))
+        return pygame.Rect(int(left), int(top), int(right - left) + sprite_width + 1, int(bottom - top) + sprite_height + 1)
+
+    def render(self, screen):
+        n = self.count
+        if not n:
+            return
+        sprite = self.sprite(self.weather)
+        screen.blits([(sprite, xy) for xy in self.position[:n].astype(np.int32).tolist()], doreturn=False)
@@ -0,0 +1,154 @@
+import os
+import copy
+import json
+import time
+import tempfile
+import threading
+
+
+def write_json_atomic(path, data, indent=4):
+    """先写临时文件再重命名，保证存档文件不会因中途崩溃而损坏"""
+    write_atomic(path, lambda f: json.dump(data, f, indent=indent), mode="w")
+
+
+def write_bytes_atomic(path, blob):
+    """以同样的方式原子地写入二进制数据"""
+    write_atomic(path, lambda f: f.write(blob), mode="wb")
+
+
+def write_atomic(path, write, mode="w"):
+    """用 write(文件对象) 写临时文件，刷新到磁盘后重命名为 path"""
+    directory = os.path.dirname(path) or "."
+    fd, temp_path = tempfile.mkstemp(dir=directory, prefix=".", suffix=".tmp")
+    try:
+        with os.fdopen(fd, mode) as f:
+            write(f)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(temp_path, path)
+    except Exception:
+        if os.path.exists(temp_path):
+            os.remove(temp_path)
+        raise
+
+
+class WriteBehindSaver:
+    """后写式存档：保存请求只把对象标记为脏，由后台线程在时间窗口内合并后统一写盘
+
+    写盘由 writer 完成：writer 接收 [(key, data), ...]，同一个 writer 的
+    脏对象会在一次调用中批量写出（例如一个数据库事务）。
+    保存请求时就复制一份数据，后台线程只写这份副本，不会与请求线程同时读写同一个对象。
+    """
+
+    def __init__(self, window=2.0):
+        self.window = window  # 同一对象在该时间窗口（秒）内的多次保存只写一次
+        self.pending = {}  # key -> (writer, data, 首次标记为脏的时间)
+        self.in_flight = {}  # 已从队列取出、正在写盘的 key -> 写完时触发的 Event
+        self.lock = threading.Lock()
+        self.wakeup = threading.Event()
+        self.thread = None
+        self.running = False
+
+        # 统计数据
+        self.writes_requested = 0
+        self.writes_performed = 0
+        self.write_errors = 0
+
+    def mark_dirty(self, key, writer, data):
+        """请求保存 data（深拷贝一份，之后对原对象的修改不影响这次保存）"""
+        data = copy.deepcopy(data)
+        with self.lock:
+            self.writes_requested += 1
+            first_dirty_time = self.pending[key][2] if key in self.pending else time.time()
+            self.pending[key] = (writer, data, first_dirty_time)
+        self.start()
+
+    def is_pending(self, key):
+        """是否有尚未写盘（或正在写盘）的修改"""
+        with self.lock:
+            return key in self.pending or key in self.in_flight
+
+    def start(self):
+        """启动后台写盘线程"""
+        if self.thread is None:
+            self.running = True
+            self.thread = threading.Thread(target=self._run, name="write-behind-saver", daemon=True)
+            self.thread.start()
+
+    def stop(self):
+        """停止后台线程并写出所有未保存的数据（关闭服务时调用）"""
+        if self.thread is not None:
+            self.running = False
+            self.wakeup.set()
+            self.thread.join()
+            self.thread = None
+        self.flush()
+
+    def _run(self):
+        while self.running:
+            self.flush(min_age=self.window)
+            self.wakeup.wait(max(0.05, self.window / 2))
+            self.wakeup.clear()
+
+    def flush(self, key=None, min_age=None):
+        """写出待保存的数据，返回写盘次数
+
+        key 指定时只写该对象（该对象正在被另一个线程写盘时先等它写完）；min_age 指定时只写
+        标记为脏超过该秒数的对象。同一个对象同时只有一个线程在写，正在写盘的对象留给写它的线程。
+        """
+        now = time.time()
+        with self.lock:
+            if key is not None:
+                done = self.in_flight.get(key)
+                keys = [key] if done is None and key in self.pending else []
+            else:
+                done = None
+                keys = [k for k, item in self.pending.items()
+                        if k not in self.in_flight and (min_age is None or now - item[2] >= min_age)]
+            items = [(k, self.pending.pop(k)) for k in keys]
+            for k in keys:
+                self.in_flight[k] = threading.Event()
+
+        if done is not None:
+            done.wait()
+            # 等待期间可能有新的修改，或者写盘失败后数据被放回了队列
+            return self.flush(key)
+
+        # 按 writer 分组，每组一次批量写出
+        groups = {}
+        for k, item in items:
+            groups.setdefault(item[0], []).append((k, item))
+
+        written = 0
+        for writer, group in groups.items():
+            try:
+                writer([(k, data) for k, (_, data, _) in group])
+                written += len(group)
+            except Exception as e:
+                print(f"保存数据失败: {[k for k, _ in group]}, 错误: {e}")
+                self.write_errors += 1
+                # 写盘失败时重新放回队列，等待下次重试（期间若有新的修改则以新的为准）
+                with self.lock:
+                    for k, item in group:
+                        self.pending.setdefault(k, item)
+            finally:
+                with self.lock:
+                    for k, _ in group:
+                        self.in_flight.pop(k).set()
+
+        with self.lock:
+            self.writes_performed += written
+        return written
+
+    def stats(self):
+        """写盘统计：请求次数、实际写盘次数、因合并而省去的次数"""
+        with self.lock:
+            pending = len(self.pending)
+            return {
+                "writes_requested": self.writes_requested,
+                "writes_performed": self.writes_performed,
+                "writes_avoided": self.writes_requested - self.writes_performed - pending,
+                "pending": pending,
+                "write_errors": self.write_errors,
+                "window": self.window
+            }
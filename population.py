@@ -0,0 +1,325 @@
+import time
+import numpy as np
+
+from breeds import get_breeds
+from dog import track_changes
+from rng import draw_array
+from effects import HUNGER, HAPPINESS, HEALTH, CLEANLINESS, ENERGY, EXP
+
+
+class PetPopulation:
+    """以列存储（struct-of-arrays）方式保存所有在线宠物的数值属性，
+    把 Dog.update_status 的衰减、健康惩罚、恢复和升级规则一次性作用到整个种群上"""
+
+    # 浮点属性列
+    FLOAT_FIELDS = ["hunger", "happiness", "health", "cleanliness", "energy", "age",
+                    "happiness_decay", "energy_decay", "sleep_until", "last_update_time"]
+    # 模拟过程中不会改变的列，不需要写回 Dog（衰减系数列保存的是乘上品种倍率后的值）
+    CONSTANT_FIELDS = ["happiness_decay", "energy_decay"]
+    # 整数属性列
+    INT_FIELDS = ["level", "experience"]
+    # 新宠物的默认属性（与 Dog.__init__ 一致）
+    DEFAULTS = {"hunger": 100, "happiness": 100, "health": 100, "cleanliness": 100, "energy": 100,
+                "happiness_decay": 1.0, "energy_decay": 1.0, "level": 1}
+
+    def __init__(self, capacity=1024):
+        self.capacity = max(1, capacity)
+        self.size = 0
+        self.ids = []  # 下标 -> pet_id
+        self.index = {}  # pet_id -> 下标
+
+        self.columns = {}
+        for field in self.FLOAT_FIELDS:
+            self.columns[field] = np.zeros(self.capacity, dtype=np.float64)
+        for field in self.INT_FIELDS:
+            self.columns[field] = np.zeros(self.capacity, dtype=np.int64)
+        self.columns["growth_stage"] = np.zeros(self.capacity, dtype=np.int8)
+        self.columns["breed_index"] = np.zeros(self.capacity, dtype=np.int16)
+        self.columns["is_sleeping"] = np.zeros(self.capacity, dtype=bool)
+        # 自上次保存以来数组中的属性是否有变化（由 take_dirty 取出）
+        self.columns["dirty"] = np.zeros(self.capacity, dtype=bool)
+        # 每只宠物的随机数流（种子和计数器），批量抽取与 Dog.random 逐个抽取的结果相同
+        self.columns["rng_seed"] = np.zeros(self.capacity, dtype=np.uint64)
+        self.columns["rng_counter"] = np.zeros(self.capacity, dtype=np.uint64)
+
+    @classmethod
+    def from_columns(cls, ids, columns):
+        """直接由各列数组构建种群（用于批量模拟，不经过 Dog 对象）"""
+        population = cls(capacity=len(ids))
+        population.ids = list(ids)
+        population.index = {pet_id: i for i, pet_id in enumerate(population.ids)}
+        population.size = len(population.ids)
+        for field, value in cls.DEFAULTS.items():
+            population.columns[field][:population.size] = value
+        for field, values in columns.items():
+            population.columns[field][:population.size] = values
+        return population
+
+    def __len__(self):
+        return self.size
+
+    def __contains__(self, pet_id):
+        return pet_id in self.index
+
+    def _grow(self):
+        """容量不足时按两倍扩容"""
+        self.capacity *= 2
+        for field, column in self.columns.items():
+            new_column = np.zeros(self.capacity, dtype=column.dtype)
+            new_column[:self.size] = column[:self.size]
+            self.columns[field] = new_column
+
+    def add(self, pet_id, dog):
+        """加入一只宠物（已存在则覆盖其属性），返回它在数组中的下标"""
+        if pet_id not in self.index:
+            if self.size >= self.capacity:
+                self._grow()
+            self.index[pet_id] = self.size
+            self.ids.append(pet_id)
+            self.size += 1
+        self.load_from_dog(pet_id, dog)
+        return self.index[pet_id]
+
+    def remove(self, pet_id):
+        """移除一只宠物，用最后一行填补空位"""
+        if pet_id not in self.index:
+            return False
+        i = self.index.pop(pet_id)
+        last = self.size - 1
+        if i != last:
+            for column in self.columns.values():
+                column[i] = column[last]
+            moved_id = self.ids[last]
+            self.ids[i] = moved_id
+            self.index[moved_id] = i
+        self.ids.pop()
+        self.size -= 1
+        return True
+
+    def load_from_dog(self, pet_id, dog):
+        """把 Dog 对象的属性写入数组"""
+        i = self.index[pet_id]
+        for field in self.FLOAT_FIELDS + self.INT_FIELDS:
+            self.columns[field][i] = getattr(dog, field)
+        breed = dog.breed_info
+        self.columns["happiness_decay"][i] *= breed.happiness_decay
+        self.columns["energy_decay"][i] *= breed.energy_decay
+        self.columns["breed_index"][i] = breed.index
+        self.columns["growth_stage"][i] = dog.growth_stage
+        self.columns["is_sleeping"][i] = dog.is_sleeping
+        self.columns["rng_seed"][i] = dog.rng_seed
+        self.columns["rng_counter"][i] = dog.rng_counter
+
+    def store_to_dog(self, pet_id, dog):
+        """把数组中的属性写回 Dog 对象（有变化的属性会被标记为脏）"""
+        i = self.index[pet_id]
+        with track_changes(dog):
+            for field in self.FLOAT_FIELDS:
+                if field not in self.CONSTANT_FIELDS:
+                    setattr(dog, field, float(self.columns[field][i]))
+            for field in self.INT_FIELDS:
+                setattr(dog, field, int(self.columns[field][i]))
+            dog.growth_stage = int(self.columns["growth_stage"][i])
+            dog.is_sleeping = bool(self.columns["is_sleeping"][i])
+            dog.rng_counter = int(self.columns["rng_counter"][i])
+
+    def take_dirty(self):
+        """返回自上次保存以来有变化的宠物 id，并清除它们的标记"""
+        dirty = self.columns["dirty"][:self.size]
+        indices = np.flatnonzero(dirty)
+        dirty[indices] = False
+        return [self.ids[i] for i in indices]
+
+    def mark_clean(self, pet_id):
+        """宠物已按 Dog 对象的当前状态保存"""
+        if pet_id in self.index:
+            self.columns["dirty"][self.index[pet_id]] = False
+
+    def view(self, field):
+        """返回某一列有效部分的视图"""
+        return self.columns[field][:self.size]
+
+    def tick(self, seconds_passed, is_day=False, now=None):
+        """对所有宠物执行一次 update_status，返回本次属性发生变化的宠物掩码"""
+        if now is None:
+            now = time.time()
+        n = self.size
+        c = self.columns
+        hunger = c["hunger"][:n]
+        happiness = c["happiness"][:n]
+        health = c["health"][:n]
+        cleanliness = c["cleanliness"][:n]
+        energy = c["energy"][:n]
+        is_sleeping = c["is_sleeping"][:n]
+
+        # 睡眠中的宠物：白天或睡够了就醒来，否则本次不消耗属性
+        if is_day:
+            woke = is_sleeping.copy()
+            energy[woke] = np.minimum(100, energy[woke] + 50)
+        else:
+            woke = is_sleeping & (now >= c["sleep_until"][:n])
+            energy[woke] = np.minimum(100, energy[woke] + 80)
+        awake = ~is_sleeping
+        is_sleeping[woke] = False
+
+        # 5分钟现实时间 = 1天游戏时间
+        days_passed = seconds_passed / 60 / 5
+
+        hunger[awake] = np.maximum(0, hunger[awake] - 1.0 * days_passed)
+        happiness[awake] = np.maximum(0, happiness[awake] - 1.5 * days_passed * c["happiness_decay"][:n][awake])
+        cleanliness[awake] = np.maximum(0, cleanliness[awake] - 0.75 * days_passed)
+        energy[awake] = np.maximum(0, energy[awake] - 0.5 * days_passed * c["energy_decay"][:n][awake])
+        # 年龄按品种在当前成长阶段的成长速度增长
+        growth = get_breeds().growth_matrix[c["breed_index"][:n], c["growth_stage"][:n]]
+        c["age"][:n][awake] += days_passed * growth[awake]
+
+        # 饥饿、清洁度低、快乐度低依次影响健康
+        mask = awake & (hunger < 20)
+        health[mask] = np.maximum(0, health[mask] - (20 - hunger[mask]) * 0.25 * days_passed)
+        mask = awake & (cleanliness < 30)
+        health[mask] = np.maximum(0, health[mask] - (30 - cleanliness[mask]) * 0.15 * days_passed)
+        mask = awake & (happiness < 20)
+        health[mask] = np.maximum(0, health[mask] - (20 - happiness[mask]) * 0.1 * days_passed)
+
+        # 健康恢复
+        mask = awake & (health < 100) & (hunger > 50) & (happiness > 50)
+        health[mask] = np.minimum(100, health[mask] + 0.5 * days_passed)
+
+        self.check_level_up(awake)
+        c["last_update_time"][:n][awake] = now
+
+        changed = awake | woke
+        c["dirty"][:n] |= changed
+        return changed
+
+    def check_level_up(self, mask=None):
+        """对掩码内的宠物执行 check_level_up（一次连升多级），返回升级了的宠物掩码"""
+        n = self.size
+        c = self.columns
+        level = c["level"][:n]
+        experience = c["experience"][:n]
+
+        # 经验达到当前等级的升级要求（level*100）才会升级，只对这些宠物求解
+        leveled = experience >= level * 100
+        if mask is not None:
+            leveled &= mask
+        if not leveled.any():
+            return leveled
+        rows = np.flatnonzero(leveled)
+        current = level[rows]
+        exp = experience[rows]
+
+        # 与 Dog.levels_gained 相同：解 50*k*(2*level+k-1) <= experience，再按整数修正
+        b = 2 * current - 1
+        levels = ((np.sqrt(b * b + exp / 12.5) - b) // 2).astype(np.int64)
+        levels -= 50 * levels * (b + levels) > exp
+        levels += 50 * (levels + 1) * (b + levels + 1) <= exp
+        experience[rows] = exp - 50 * levels * (b + levels)
+        level[rows] = current + levels
+
+        # 升级奖励（每升一级各项 +20）
+        bonus = 20 * levels
+        for field in ("hunger", "happiness", "health", "cleanliness", "energy"):
+            column = c[field][:n]
+            column[rows] = np.minimum(100, column[rows] + bonus)
+        return leveled
+
+    def apply_effects(self, table, effect_ids, mask=None):
+        """按效果表批量应用效果（与 Dog.apply_effect 相同），返回升级了的宠物掩码
+
+        effect_ids 为每只宠物使用的效果 id 数组（长度等于宠物数量），mask 指定哪些宠物生效。
+        效果表中的亲密度不在数组中，这里不处理。
+        """
+        n = self.size
+        c = self.columns
+        if mask is None:
+            mask = np.ones(n, dtype=bool)
+        rows = table.matrix[np.asarray(effect_ids)[mask]]
+        for field, column_index in (("hunger", HUNGER), ("happiness", HAPPINESS), ("health", HEALTH),
+                                    ("cleanliness", CLEANLINESS), ("energy", ENERGY)):
+            column = c[field][:n]
+            column[mask] = np.clip(column[mask] + rows[:, column_index], 0, 100)
+        c["experience"][:n][mask] += rows[:, EXP].astype(np.int64)
+        return self.check_level_up(mask)
+
+    def feed(self, table, food_ids, mask=None):
+        """批量喂食，条件与 Dog.feed 相同（醒着、能量不低于10、没吃饱），返回实际喂食的宠物掩码"""
+        n = self.size
+        c = self.columns
+        fed = ~c["is_sleeping"][:n] & (c["energy"][:n] >= 10) & (c["hunger"][:n] < 95)
+        if mask is not None:
+            fed &= mask
+        self.apply_effects(table, food_ids, fed)
+        return fed
+
+    def play(self, table, game_ids, mask=None):
+        """批量玩耍，条件与 Dog.play 相同（醒着、能量和饥饿度不低于20），返回实际玩耍的宠物掩码
+
+        玩耍带来的技能熟练度提升需要逐个处理，这里不包含。
+        """
+        n = self.size
+        c = self.columns
+        played = ~c["is_sleeping"][:n] & (c["energy"][:n] >= 20) & (c["hunger"][:n] >= 20)
+        if mask is not None:
+            played &= mask
+        self.apply_effects(table, game_ids, played)
+        return played
+
+    def random(self, mask):
+        """掩码内的每只宠物从各自的随机数流中取一个数（与逐只调用 Dog.random 相同），
+        返回长度为宠物数量的数组，掩码外为 0"""
+        n = self.size
+        values = np.zeros(n, dtype=np.float64)
+        rows = np.flatnonzero(mask)
+        if len(rows):
+            counter = self.columns["rng_counter"]
+            counters = counter[rows]
+            values[rows] = draw_array(self.columns["rng_seed"][rows], counters)
+            counter[rows] = counters + np.uint64(1)
+        return values
+
+    def bath(self, mask=None):
+        """批量洗澡，条件和结果与 Dog.bath 相同（醒着、能量不低于10、清洁度低于90，
+        各自的随机数流决定是否喜欢洗澡），返回实际洗澡的宠物掩码"""
+        n = self.size
+        c = self.columns
+        bathed = ~c["is_sleeping"][:n] & (c["energy"][:n] >= 10) & (c["cleanliness"][:n] < 90)
+        if mask is not None:
+            bathed &= mask
+        # 有些狗不喜欢洗澡
+        happiness_change = np.where(self.random(bathed) < 0.3, -10, 10)[bathed]
+
+        happiness = c["happiness"][:n]
+        energy = c["energy"][:n]
+        c["cleanliness"][:n][bathed] = 100
+        happiness[bathed] = np.clip(happiness[bathed] + happiness_change, 0, 100)
+        energy[bathed] = np.maximum(0, energy[bathed] - 10)
+        c["experience"][:n][bathed] += 10
+        self.check_level_up(bathed)
+        return bathed
+
+    def update_growth_stages(self):
+        """对所有宠物执行 update_growth_stage，返回成长阶段发生变化的宠物掩码"""
+        n = self.size
+        c = self.columns
+        growth_stage = c["growth_stage"][:n]
+        energy = c["energy"][:n]
+        health = c["health"][:n]
+        happiness = c["happiness"][:n]
+
+        # 30天内为幼犬，6个月内为青年期，3年内为成年期，之后为老年期
+        new_stage = np.searchsorted(np.array([30, 180, 1095]), c["age"][:n], side="right").astype(np.int8)
+        changed = new_stage != growth_stage
+        growth_stage[changed] = new_stage[changed]
+
+        mask = changed & (new_stage == 1)  # 进入青年期
+        energy[mask] = np.minimum(100, energy[mask] + 10)
+        health[mask] = np.minimum(100, health[mask] + 5)
+        mask = changed & (new_stage == 2)  # 进入成年期
+        energy[mask] = np.minimum(100, energy[mask] + 5)
+        health[mask] = np.minimum(100, health[mask] + 10)
+        mask = changed & (new_stage == 3)  # 进入老年期
+        energy[mask] = np.maximum(30, energy[mask] - 20)
+        happiness[mask] = np.minimum(100, happiness[mask] + 10)
+
+        return changed
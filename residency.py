@@ -0,0 +1,158 @@
+import sys
+import time
+import threading
+from collections import OrderedDict
+
+
+def estimate_pet_size(dog):
+    """粗略估计一只宠物在内存中占用的字节数"""
+    size = sys.getsizeof(dog)
+    attributes = getattr(dog, "__dict__", None)
+    if attributes is not None:
+        size += sys.getsizeof(attributes)
+        values = attributes.values()
+    else:
+        shared = getattr(dog, "SHARED_SLOTS", ())
+        values = [getattr(dog, name, None) for name in getattr(dog, "__slots__", ()) if name not in shared]
+    for value in values:
+        size += sys.getsizeof(value)
+        if isinstance(value, dict):
+            for key, item in value.items():
+                size += sys.getsizeof(key) + sys.getsizeof(item)
+    return size
+
+
+class ResidentPetCache:
+    """常驻内存的宠物缓存：按最近使用顺序（LRU）和空闲时间淘汰
+
+    被淘汰的宠物交给 on_evict 保存，之后再访问时由 loader 从存档重新加载。
+    """
+
+    def __init__(self, loader, on_evict, max_count=10000, max_memory=256 * 1024 * 1024, idle_timeout=1800):
+        self.loader = loader  # pet_id -> Dog 或 None
+        self.on_evict = on_evict  # (pet_id, dog) -> None
+        self.max_count = max_count
+        self.max_memory = max_memory  # 字节
+        self.idle_timeout = idle_timeout  # 秒
+        self.entries = OrderedDict()  # pet_id -> [dog, 估计大小, 最后访问时间]
+        self.memory = 0
+        self.lock = threading.RLock()
+
+        # 统计数据
+        self.hits = 0
+        self.misses = 0
+        self.loads = 0
+        self.evictions = 0
+        self.idle_evictions = 0
+
+    def __contains__(self, pet_id):
+        return pet_id in self.entries
+
+    def __len__(self):
+        return len(self.entries)
+
+    def __iter__(self):
+        return iter(list(self.entries))
+
+    def items(self):
+        with self.lock:
+            return [(pet_id, entry[0]) for pet_id, entry in self.entries.items()]
+
+    def get(self, pet_id):
+        """取出宠物，不在内存中时从存档加载，都没有则返回 None"""
+        with self.lock:
+            entry = self.entries.get(pet_id)
+            if entry is not None:
+                self.hits += 1
+                entry[2] = time.time()
+                self.entries.move_to_end(pet_id)
+                return entry[0]
+            self.misses += 1
+
+        dog = self.loader(pet_id)
+        if dog is not None:
+            self.loads += 1
+            self.put(pet_id, dog)
+        return dog
+
+    def peek(self, pet_id):
+        """取出内存中的宠物，不算作一次访问（不影响淘汰顺序），不在内存中时返回 None"""
+        with self.lock:
+            entry = self.entries.get(pet_id)
+            return entry[0] if entry is not None else None
+
+    def put(self, pet_id, dog):
+        """放入（或替换）一只宠物，超出限制时淘汰最久未使用的宠物"""
+        with self.lock:
+            old = self.entries.pop(pet_id, None)
+            if old is not None:
+                self.memory -= old[1]
+            size = estimate_pet_size(dog)
+            self.entries[pet_id] = [dog, size, time.time()]
+            self.memory += size
+            self._enforce_limits(keep=pet_id)
+
+    def resize(self, pet_id):
+        """宠物数据变化后（如学会新技能）重新估计其大小"""
+        with self.lock:
+            entry = self.entries.get(pet_id)
+            if entry is not None:
+                size = estimate_pet_size(entry[0])
+                self.memory += size - entry[1]
+                entry[1] = size
+
+    def _enforce_limits(self, keep=None):
+        while self.entries and (len(self.entries) > self.max_count or self.memory > self.max_memory):
+            pet_id = next(iter(self.entries))
+            if pet_id == keep:
+                break
+            self.evict(pet_id)
+
+    def evict(self, pet_id):
+        """把宠物移出内存并交给 on_evict 保存"""
+        with self.lock:
+            entry = self.entries.pop(pet_id, None)
+            if entry is None:
+                return False
+            self.memory -= entry[1]
+            self.evictions += 1
+        self.on_evict(pet_id, entry[0])
+        return True
+
+    def evict_idle(self, now=None):
+        """淘汰超过空闲时间未被访问的宠物，返回淘汰数量"""
+        if now is None:
+            now = time.time()
+        with self.lock:
+            # 按最近使用排序，最久未访问的在前面
+            idle = []
+            for pet_id, entry in self.entries.items():
+                if now - entry[2] < self.idle_timeout:
+                    break
+                idle.append(pet_id)
+        for pet_id in idle:
+            if self.evict(pet_id):
+                self.idle_evictions += 1
+        return len(idle)
+
+    def evict_all(self):
+        """淘汰全部宠物（关闭服务时保存所有数据）"""
+        for pet_id in list(self.entries):
+            self.evict(pet_id)
+
+    def stats(self):
+        with self.lock:
+            lookups = self.hits + self.misses
+            return {
+                "resident": len(self.entries),
+                "memory_bytes": self.memory,
+                "max_count": self.max_count,
+                "max_memory_bytes": self.max_memory,
+                "idle_timeout": self.idle_timeout,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": round(self.hits / lookups, 4) if lookups else 0,
+                "loads": self.loads,
+                "evictions": self.evictions,
+                "idle_evictions": self.idle_evictions
+            }
@@ -1,5 +1,7 @@
-from app import app, socketio
+from app import app, socketio, start_simulation
 
 if __name__ == "__main__":
     print("启动AI宠物狗应用...")
-    socketio.run(app, host='0.0.0.0', port=5000, debug=True) 
\ No newline at end of file
+    app.debug = True
+    start_simulation()
+    socketio.run(app, host='0.0.0.0', port=5000, debug=True)
\ No newline at end of file
@@ -0,0 +1,157 @@
+import time
+import threading
+
+
+class Job:
+    """定时任务及其运行统计"""
+
+    def __init__(self, name, func, interval, order):
+        self.name = name
+        self.func = func
+        self.interval = interval  # 运行间隔（秒）
+        self.order = order  # 同一时刻到期时按注册顺序执行
+        self.rounds = 0  # 时间轮还需转几圈才到期
+
+        # 运行统计
+        self.runs = 0
+        self.errors = 0
+        self.total_time = 0.0
+        self.max_time = 0.0
+        self.last_time = 0.0
+        self.last_run = 0
+
+    def stats(self):
+        return {
+            "interval": self.interval,
+            "runs": self.runs,
+            "errors": self.errors,
+            "last_ms": round(self.last_time * 1000, 3),
+            "avg_ms": round(self.total_time / self.runs * 1000, 3) if self.runs else 0,
+            "max_ms": round(self.max_time * 1000, 3),
+            "last_run": self.last_run
+        }
+
+
+class TimerWheel:
+    """哈希时间轮：把任务按到期的 tick 放入对应的槽中，每次只处理当前槽"""
+
+    def __init__(self, slots=64):
+        self.slots = [[] for _ in range(slots)]
+        self.current = 0  # 下一个要处理的 tick
+
+    def schedule(self, job, delay_ticks):
+        """在 delay_ticks 个 tick 之后触发任务（至少1个 tick）"""
+        delay_ticks = max(1, int(delay_ticks))
+        target = self.current + delay_ticks - 1
+        job.rounds = (delay_ticks - 1) // len(self.slots)
+        self.slots[target % len(self.slots)].append(job)
+
+    def advance(self):
+        """处理当前 tick，返回到期的任务"""
+        slot = self.slots[self.current % len(self.slots)]
+        due = [job for job in slot if job.rounds == 0]
+        remaining = []
+        for job in slot:
+            if job.rounds > 0:
+                job.rounds -= 1
+                remaining.append(job)
+        slot[:] = remaining
+        self.current += 1
+        return sorted(due, key=lambda job: job.order)
+
+
+class SimulationScheduler:
+    """模拟调度器：每个进程只运行一个 tick 循环，驱动所有周期性任务"""
+
+    def __init__(self, resolution=1.0, slots=64):
+        self.resolution = resolution  # 每个 tick 的时长（秒）
+        self.wheel = TimerWheel(slots)
+        self.jobs = {}
+        self.lock = threading.Lock()
+        self.running = False
+        self.sleep = time.sleep
+
+        # 调度延迟统计：tick 实际开始时间比计划时间晚了多少
+        self.ticks = 0
+        self.last_lag = 0.0
+        self.max_lag = 0.0
+        self.total_lag = 0.0
+
+    def add_job(self, name, func, interval, delay=None):
+        """注册周期任务，delay 为首次运行前的等待秒数（默认等于间隔）"""
+        job = Job(name, func, interval, len(self.jobs))
+        self.jobs[name] = job
+        self.wheel.schedule(job, self._ticks(interval if delay is None else delay))
+        return job
+
+    def _ticks(self, seconds):
+        return max(1, round(seconds / self.resolution))
+
+    def start(self, spawn=None, sleep=None):
+        """启动 tick 循环，重复调用不会启动第二个循环，返回是否本次启动"""
+        with self.lock:
+            if self.running:
+                return False
+            self.running = True
+        if sleep is not None:
+            self.sleep = sleep
+        if spawn is None:
+            threading.Thread(target=self.run, name="simulation-scheduler", daemon=True).start()
+        else:
+            spawn(self.run)
+        return True
+
+    def stop(self):
+        self.running = False
+
+    def run(self):
+        """tick 主循环"""
+        next_tick = time.time() + self.resolution
+        while self.running:
+            delay = next_tick - time.time()
+            if delay > 0:
+                self.sleep(delay)
+
+            lag = max(0.0, time.time() - next_tick)
+            self.ticks += 1
+            self.last_lag = lag
+            self.max_lag = max(self.max_lag, lag)
+            self.total_lag += lag
+
+            for job in self.wheel.advance():
+                self.run_job(job)
+                self.wheel.schedule(job, self._ticks(job.interval))
+
+            next_tick += self.resolution
+            # 落后太多时不再追赶，避免连续快速补跑
+            if time.time() - next_tick > self.resolution * 10:
+                next_tick = time.time() + self.resolution
+
+    def run_job(self, job):
+        """运行单个任务并记录耗时"""
+        start = time.perf_counter()
+        try:
+            job.func()
+        except Exception as e:
+            job.errors += 1
+            print(f"定时任务 {job.name} 运行失败: {e}")
+        elapsed = time.perf_counter() - start
+        job.runs += 1
+        job.last_time = elapsed
+        job.total_time += elapsed
+        job.max_time = max(job.max_time, elapsed)
+        job.last_run = time.time()
+
+    def stats(self):
+        """调度延迟和各任务耗时"""
+        return {
+            "running": self.running,
+            "ticks": self.ticks,
+            "resolution": self.resolution,
+            "lag_ms": {
+                "last": round(self.last_lag * 1000, 3),
+                "avg": round(self.total_lag / self.ticks * 1000, 3) if self.ticks else 0,
+                "max": round(self.max_lag * 1000, 3)
+            },
+            "jobs": {name: job.stats() for name, job in self.jobs.items()}
+        }
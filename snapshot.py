@@ -0,0 +1,232 @@
+"""宠物存档的二进制快照格式
+
+格式：b"DOG" + 1 字节格式版本，之后是该版本的数据。版本 1 的数据为：
+    定长部分（struct 打包的数值属性）
+    名字、品种、性格、身体颜色、耳朵颜色（varint 长度 + UTF-8）
+    技能表（varint 技能数，每个技能为 varint 长度 + UTF-8 名称 + varint 等级）
+
+读取时按版本号选择解码函数得到字典，再依次执行 MIGRATIONS 中登记的迁移升级到当前版本，
+最后检查当前版本的所有属性都存在（不会像 Dog.from_dict 那样悄悄使用默认值）。
+JSON 存档（原有格式，没有 schema_version 的视为版本 0）同样可以读取，也可以用 to_json 或
+python snapshot.py 存档文件 把二进制快照转成 JSON 查看。
+"""
+import sys
+import json
+import time
+import struct
+
+from dog import Dog
+from rng import derive_seed
+
+MAGIC = b"DOG"
+SCHEMA_VERSION = 1
+
+_HEADER = struct.Struct("<3sB")
+
+# 版本 1 的定长部分
+_FIXED_FIELDS_V1 = (
+    "hunger", "happiness", "health", "cleanliness", "energy", "age",
+    "level", "experience", "happiness_decay", "energy_decay",
+    "is_sleeping", "sleep_until", "last_update_time", "growth_stage", "affection",
+    "rng_seed", "rng_counter", "size_percent"
+)
+_FIXED_V1 = struct.Struct("<6d2q2d?2dBdQQH")
+_STRING_FIELDS_V1 = ("name", "breed", "personality")
+
+# 当前版本存档必须包含的属性（与 Dog.to_dict 相同）
+REQUIRED_FIELDS = (
+    "name", "breed", "personality", "hunger", "happiness", "health", "cleanliness", "energy",
+    "age", "level", "experience", "happiness_decay", "energy_decay", "skills", "is_sleeping",
+    "sleep_until", "appearance", "last_update_time", "growth_stage", "affection",
+    "rng_seed", "rng_counter"
+)
+
+
+class SnapshotError(ValueError):
+    """存档无法解码或无法升级到当前版本"""
+
+
+# ---------- varint 和字符串 ----------
+
+def _write_varint(out, value):
+    while value >= 0x80:
+        out.append((value & 0x7F) | 0x80)
+        value >>= 7
+    out.append(value)
+
+
+def _read_varint(blob, offset):
+    value = 0
+    shift = 0
+    while True:
+        byte = blob[offset]
+        offset += 1
+        value |= (byte & 0x7F) << shift
+        if byte < 0x80:
+            return value, offset
+        shift += 7
+
+
+def _write_str(out, text):
+    raw = text.encode("utf-8")
+    _write_varint(out, len(raw))
+    out += raw
+
+
+def _read_str(blob, offset):
+    # 绝大多数字符串短于 128 字节，长度只占一个字节
+    length = blob[offset]
+    if length < 0x80:
+        offset += 1
+    else:
+        length, offset = _read_varint(blob, offset)
+    end = offset + length
+    return blob[offset:end].decode("utf-8"), end
+
+
+# ---------- 各版本的编码和解码 ----------
+
+def _encode_v1(data):
+    appearance = data["appearance"]
+    out = bytearray(_HEADER.pack(MAGIC, 1))
+    out += _FIXED_V1.pack(
+        data["hunger"], data["happiness"], data["health"], data["cleanliness"], data["energy"], data["age"],
+        int(data["level"]), int(data["experience"]), data["happiness_decay"], data["energy_decay"],
+        bool(data["is_sleeping"]), data["sleep_until"], data["last_update_time"], int(data["growth_stage"]),
+        data["affection"], data["rng_seed"], data["rng_counter"], int(round(appearance["size"] * 100))
+    )
+    for field in _STRING_FIELDS_V1:
+        _write_str(out, data[field])
+    _write_str(out, appearance["body_color"])
+    _write_str(out, appearance["ear_color"])
+    skills = data["skills"]
+    _write_varint(out, len(skills))
+    for name, level in skills.items():
+        _write_str(out, name)
+        _write_varint(out, int(level))
+    return bytes(out)
+
+
+def _decode_v1(blob, offset):
+    data = dict(zip(_FIXED_FIELDS_V1, _FIXED_V1.unpack_from(blob, offset)))
+    offset += _FIXED_V1.size
+    for field in _STRING_FIELDS_V1:
+        data[field], offset = _read_str(blob, offset)
+    body_color, offset = _read_str(blob, offset)
+    ear_color, offset = _read_str(blob, offset)
+    data["appearance"] = {"body_color": body_color, "ear_color": ear_color,
+                          "size": data.pop("size_percent") / 100}
+    count, offset = _read_varint(blob, offset)
+    skills = {}
+    for _ in range(count):
+        name, offset = _read_str(blob, offset)
+        skills[name], offset = _read_varint(blob, offset)
+    data["skills"] = skills
+    return data
+
+
+# 格式版本 -> 解码函数（旧版本的解码函数需要一直保留）
+DECODERS = {1: _decode_v1}
+
+
+# ---------- 迁移 ----------
+
+# 起始版本 -> 把该版本的字典升级到下一版本的函数
+MIGRATIONS = {}
+
+
+def migration(from_version):
+    """登记从 from_version 升级到 from_version + 1 的迁移函数"""
+    def register(func):
+        MIGRATIONS[from_version] = func
+        return func
+    return register
+
+
+@migration(0)
+def _migrate_0_to_1(data):
+    """原有 JSON 存档：缺少的属性补上 Dog.from_dict 使用的默认值，没有种子的按名字派生；
+    外观和随机数计数器取自用同一种子新建的宠物，与 Dog.from_dict 读取同一个存档的结果一致"""
+    if data.get("rng_seed") is None:
+        data["rng_seed"] = derive_seed("dog", data["name"])
+    born = Dog(data["name"], data["breed"], data["personality"], seed=data["rng_seed"])
+    defaults = {
+        "hunger": 100, "happiness": 100, "health": 100, "cleanliness": 100, "energy": 100,
+        "age": 0, "level": 1, "experience": 0, "happiness_decay": 1.0, "energy_decay": 1.0,
+        "skills": {}, "is_sleeping": False, "sleep_until": 0, "growth_stage": 0, "affection": 50,
+        "appearance": born.appearance, "last_update_time": time.time(), "rng_counter": born.rng_counter,
+    }
+    for field, value in defaults.items():
+        data.setdefault(field, value)
+    return data
+
+
+def upgrade(data, version):
+    """把 version 版本的存档字典依次迁移到当前版本"""
+    if version > SCHEMA_VERSION:
+        raise SnapshotError(f"存档版本 {version} 比当前程序支持的版本 {SCHEMA_VERSION} 新")
+    while version < SCHEMA_VERSION:
+        step = MIGRATIONS.get(version)
+        if step is None:
+            raise SnapshotError(f"没有从版本 {version} 升级的迁移")
+        data = step(data)
+        version += 1
+    missing = [field for field in REQUIRED_FIELDS if field not in data]
+    if missing:
+        raise SnapshotError(f"存档缺少属性: {', '.join(missing)}")
+    return data
+
+
+# ---------- 接口 ----------
+
+def pack(data):
+    """存档字典（Dog.to_dict 的结果）-> 二进制快照；缺少属性的旧存档先迁移到当前版本"""
+    for field in REQUIRED_FIELDS:
+        if field not in data:
+            data = dict(data)
+            data = upgrade(data, data.pop("schema_version", 0))
+            break
+    return _encode_v1(data)
+
+
+def unpack(blob):
+    """二进制快照或 JSON 存档 -> 升级到当前版本的存档字典"""
+    if blob[:3] == MAGIC:
+        _, version = _HEADER.unpack_from(blob)
+        decoder = DECODERS.get(version)
+        if decoder is None:
+            raise SnapshotError(f"不支持的快照格式版本: {version}")
+        try:
+            data = decoder(blob, _HEADER.size)
+        except (struct.error, IndexError, UnicodeDecodeError) as e:
+            raise SnapshotError(f"快照数据损坏: {e}") from e
+        # 二进制快照的各版本解码函数总是给出该版本的全部属性，当前版本不需要迁移和检查
+        if version == SCHEMA_VERSION:
+            return data
+        return upgrade(data, version)
+    try:
+        data = json.loads(blob)
+    except ValueError as e:
+        raise SnapshotError(f"既不是二进制快照也不是 JSON 存档: {e}") from e
+    return upgrade(data, data.pop("schema_version", 0))
+
+
+def to_json(data, indent=4):
+    """存档字典 -> 带版本号的 JSON 文本（用于调试和人工修改，unpack 可以直接读取）"""
+    return json.dumps({"schema_version": SCHEMA_VERSION, **data}, ensure_ascii=False, indent=indent)
+
+
+def dumps(dog):
+    return pack(dog.to_dict())
+
+
+def loads(blob):
+    """二进制快照或 JSON 存档 -> Dog"""
+    return Dog.from_dict(unpack(blob))
+
+
+if __name__ == "__main__":
+    # 把二进制快照转成 JSON 输出：python snapshot.py 存档文件
+    for path in sys.argv[1:]:
+        with open(path, "rb") as f:
+            print(to_json(unpack(f.read())))
@@ -0,0 +1,490 @@
+import os
+import gzip
+import json
+import time
+import shutil
+import sqlite3
+import threading
+from collections import OrderedDict
+
+from persistence import write_json_atomic, write_bytes_atomic
+import snapshot
+
+
+# 与宠物存档放在同一目录下的其他 JSON 文件
+NON_PET_FILES = ("environment", "global_settings")
+
+
+class JsonDirStorage:
+    """每只宠物一个 JSON 文件的存储方式（原有格式）"""
+
+    EXT = ".json"
+
+    def __init__(self, save_dir, exclude=NON_PET_FILES):
+        self.save_dir = save_dir
+        self.exclude = set(exclude)  # 同一目录下不属于宠物的文件
+        os.makedirs(save_dir, exist_ok=True)
+
+    def path(self, pet_id):
+        return os.path.join(self.save_dir, f"{pet_id}{self.EXT}")
+
+    def load(self, pet_id):
+        """读取宠物数据，不存在时返回 None"""
+        save_path = self.path(pet_id)
+        if not os.path.exists(save_path):
+            return None
+        with open(save_path, "r") as f:
+            return json.load(f)
+
+    def save(self, pet_id, data):
+        write_json_atomic(self.path(pet_id), data)
+
+    def save_many(self, items):
+        """批量保存 [(pet_id, data), ...]"""
+        for pet_id, data in items:
+            self.save(pet_id, data)
+
+    def delete(self, pet_id):
+        save_path = self.path(pet_id)
+        if os.path.exists(save_path):
+            os.remove(save_path)
+
+    def ids(self):
+        """所有已保存宠物的 ID"""
+        for file in sorted(os.listdir(self.save_dir)):
+            pet_id, ext = os.path.splitext(file)
+            if ext == self.EXT and not file.startswith(".") and pet_id not in self.exclude:
+                yield pet_id
+
+    def count(self):
+        return sum(1 for _ in self.ids())
+
+    def close(self):
+        pass
+
+
+class BinaryDirStorage(JsonDirStorage):
+    """每只宠物一个二进制快照文件（snapshot.py 的格式，扩展名 .dog）
+
+    读取时旧版本的快照会自动迁移到当前版本；用 python snapshot.py 文件名 可以查看内容。
+    """
+
+    EXT = ".dog"
+
+    def load(self, pet_id):
+        save_path = self.path(pet_id)
+        if not os.path.exists(save_path):
+            return None
+        with open(save_path, "rb") as f:
+            return snapshot.unpack(f.read())
+
+    def save(self, pet_id, data):
+        write_bytes_atomic(self.path(pet_id), snapshot.pack(data))
+
+
+class SqliteStorage:
+    """SQLite（WAL 模式）存储：所有宠物保存在一个数据库文件中"""
+
+    SCHEMA = """
+        CREATE TABLE IF NOT EXISTS pets (
+            pet_id TEXT PRIMARY KEY,
+            name TEXT,
+            breed TEXT,
+            personality TEXT,
+            level INTEGER,
+            updated_at REAL,
+            data TEXT NOT NULL
+        );
+        CREATE INDEX IF NOT EXISTS idx_pets_breed ON pets (breed);
+        CREATE INDEX IF NOT EXISTS idx_pets_updated_at ON pets (updated_at);
+    """
+
+    UPSERT = """
+        INSERT INTO pets (pet_id, name, breed, personality, level, updated_at, data)
+        VALUES (?, ?, ?, ?, ?, ?, ?)
+        ON CONFLICT (pet_id) DO UPDATE SET
+            name = excluded.name,
+            breed = excluded.breed,
+            personality = excluded.personality,
+            level = excluded.level,
+            updated_at = excluded.updated_at,
+            data = excluded.data
+    """
+
+    # 按主键读取（sqlite3 按 SQL 文本缓存每个连接上编译好的语句，固定文本即可重复使用）
+    SELECT = "SELECT data FROM pets WHERE pet_id = ?"
+
+    def __init__(self, db_path):
+        self.db_path = db_path
+        os.makedirs(os.path.dirname(db_path) or ".", exist_ok=True)
+        # 每个线程使用自己的连接：WAL 模式下读取互不阻塞，也不会被后台写盘线程的事务挡住；
+        # 写事务之间由锁保证串行
+        self.local = threading.local()
+        self.connections = []  # 所有线程打开的连接（关闭时一起关闭）
+        self.lock = threading.Lock()
+        self.write_lock = threading.Lock()
+        conn = self._connection()
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.executescript(self.SCHEMA)
+
+    def _connection(self):
+        """当前线程的连接（首次使用时打开）"""
+        conn = getattr(self.local, "conn", None)
+        if conn is None:
+            # check_same_thread=False 只是为了 close 时能从其他线程关闭，平时每个连接只在一个线程中使用
+            conn = sqlite3.connect(self.db_path, check_same_thread=False, isolation_level=None)
+            conn.execute("PRAGMA synchronous=NORMAL")
+            with self.lock:
+                self.connections.append(conn)
+            self.local.conn = conn
+        return conn
+
+    def _row(self, pet_id, data):
+        return (pet_id, data.get("name"), data.get("breed"), data.get("personality"),
+                data.get("level"), time.time(), json.dumps(data, separators=(",", ":")))
+
+    def load(self, pet_id):
+        """读取宠物数据（主键索引查找），不存在时返回 None"""
+        row = self._connection().execute(self.SELECT, (pet_id,)).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def save(self, pet_id, data):
+        self.save_many([(pet_id, data)])
+
+    def save_many(self, items):
+        """在一个事务中批量写入 [(pet_id, data), ...]"""
+        rows = [self._row(pet_id, data) for pet_id, data in items]
+        conn = self._connection()
+        with self.write_lock:
+            conn.execute("BEGIN")
+            try:
+                conn.executemany(self.UPSERT, rows)
+                conn.execute("COMMIT")
+            except Exception:
+                conn.execute("ROLLBACK")
+                raise
+
+    def delete(self, pet_id):
+        with self.write_lock:
+            self._connection().execute("DELETE FROM pets WHERE pet_id = ?", (pet_id,))
+
+    def ids(self):
+        rows = self._connection().execute("SELECT pet_id FROM pets ORDER BY pet_id").fetchall()
+        for row in rows:
+            yield row[0]
+
+    def count(self):
+        return self._connection().execute("SELECT COUNT(*) FROM pets").fetchone()[0]
+
+    def close(self):
+        with self.lock:
+            for conn in self.connections:
+                conn.close()
+            self.connections.clear()
+        self.local = threading.local()
+
+
+class EventLogStorage:
+    """事件溯源存储：每只宠物一个只追加的事件日志，定期生成快照并在后台压缩
+
+    每只宠物一个子目录：
+        snapshot.json       最近的快照 {"seq": 快照包含的最后一个事件序号, "state": Dog.to_dict()}
+        events.log          当前日志，每行一个事件 {"seq", "time", "cmd", "args", "set"}
+        segment-<seq>.log   生成快照时封存的日志段，<seq> 为段内最后一个事件的序号
+        history.jsonl.gz    已被快照覆盖的日志段压缩后移到这里，作为审计记录
+    事件的 set 是命令执行后变化了的属性的新值，加载时从快照开始按序号依次应用，
+    重建出的状态与写入时完全相同（不需要重新执行带随机性的命令）。
+    """
+
+    SNAPSHOT = "snapshot.json"
+    ACTIVE_LOG = "events.log"
+    HISTORY = "history.jsonl.gz"
+
+    def __init__(self, log_dir, snapshot_every=100, keep_history=True, max_open_files=256):
+        self.log_dir = log_dir
+        self.snapshot_every = snapshot_every  # 每追加这么多事件生成一次快照
+        self.keep_history = keep_history  # 压缩时保留历史事件，否则直接删除
+        self.max_open_files = max_open_files
+        os.makedirs(log_dir, exist_ok=True)
+        self.lock = threading.RLock()
+        self.seqs = {}  # pet_id -> 最后一个事件的序号
+        self.since_snapshot = {}  # pet_id -> 上次快照之后追加的事件数
+        self.files = OrderedDict()  # pet_id -> 打开的当前日志（按最近使用排序）
+        self.pending_snapshots = {}  # pet_id -> (seq, 状态的 JSON 文本)，等待后台写出
+
+        # 统计数据
+        self.events_appended = 0
+        self.bytes_appended = 0
+        self.snapshots_written = 0
+        self.segments_compacted = 0
+
+    @staticmethod
+    def valid_id(pet_id):
+        """宠物 ID 用作目录名，不允许包含路径分隔符或指向上级目录"""
+        return bool(pet_id) and pet_id not in (".", "..") and os.sep not in pet_id \
+            and not (os.altsep and os.altsep in pet_id)
+
+    def path(self, pet_id, name=None):
+        if not self.valid_id(pet_id):
+            raise ValueError(f"不合法的宠物 ID: {pet_id!r}")
+        directory = os.path.join(self.log_dir, pet_id)
+        return directory if name is None else os.path.join(directory, name)
+
+    @staticmethod
+    def _read_events(path):
+        """读取日志文件中的事件（崩溃时可能留下不完整的最后一行，忽略它）"""
+        if not os.path.exists(path):
+            return
+        with open(path, "r", encoding="utf-8") as f:
+            for line in f:
+                if not line.strip():
+                    continue
+                try:
+                    yield json.loads(line)
+                except ValueError:
+                    return
+
+    def _segments(self, pet_id):
+        """封存的日志段 [(最后一个事件的序号, 路径), ...]，按序号排序"""
+        directory = self.path(pet_id)
+        segments = []
+        for file in os.listdir(directory):
+            if file.startswith("segment-") and file.endswith(".log"):
+                segments.append((int(file[len("segment-"):-len(".log")]), os.path.join(directory, file)))
+        return sorted(segments)
+
+    def _log_files(self, pet_id):
+        return [path for _, path in self._segments(pet_id)] + [self.path(pet_id, self.ACTIVE_LOG)]
+
+    def load(self, pet_id):
+        """从最近的快照重放之后的事件，返回宠物数据，不存在时返回 None"""
+        with self.lock:
+            if not self.valid_id(pet_id) or not os.path.isdir(self.path(pet_id)):
+                return None
+            self._close_file(pet_id)
+            if pet_id in self.pending_snapshots:
+                seq, text = self.pending_snapshots[pet_id]
+                snapshot = {"seq": seq, "state": json.loads(text)}
+            elif os.path.exists(self.path(pet_id, self.SNAPSHOT)):
+                with open(self.path(pet_id, self.SNAPSHOT), "r", encoding="utf-8") as f:
+                    snapshot = json.load(f)
+            else:
+                return None
+
+            state = snapshot["state"]
+            last_seq = snapshot["seq"]
+            replayed = 0
+            for path in self._log_files(pet_id):
+                for event in self._read_events(path):
+                    if event["seq"] > snapshot["seq"]:
+                        state.update(event["set"])
+                        replayed += 1
+                    last_seq = max(last_seq, event["seq"])
+            self.seqs[pet_id] = last_seq
+            self.since_snapshot[pet_id] = replayed
+            return state
+
+    def _open_file(self, pet_id):
+        """取得宠物当前日志的追加句柄（打开的文件数有上限，超出时关闭最久未用的）"""
+        f = self.files.get(pet_id)
+        if f is not None:
+            self.files.move_to_end(pet_id)
+            return f
+        while len(self.files) >= self.max_open_files:
+            _, old = self.files.popitem(last=False)
+            old.close()
+        os.makedirs(self.path(pet_id), exist_ok=True)
+        f = self.files[pet_id] = open(self.path(pet_id, self.ACTIVE_LOG), "a", encoding="utf-8")
+        return f
+
+    def _close_file(self, pet_id):
+        f = self.files.pop(pet_id, None)
+        if f is not None:
+            f.close()
+
+    def append(self, pet_id, events):
+        """按顺序编号并追加事件，返回是否到了生成快照的时候"""
+        with self.lock:
+            if pet_id not in self.seqs:
+                self.load(pet_id)
+            seq = self.seqs.get(pet_id, 0)
+            lines = []
+            for event in events:
+                seq += 1
+                lines.append(json.dumps(dict(event, seq=seq), ensure_ascii=False, separators=(",", ":")))
+            data = "\n".join(lines) + "\n"
+            f = self._open_file(pet_id)
+            f.write(data)
+            f.flush()
+            self.seqs[pet_id] = seq
+            self.since_snapshot[pet_id] = self.since_snapshot.get(pet_id, 0) + len(events)
+            self.events_appended += len(events)
+            self.bytes_appended += len(data.encode("utf-8"))
+            return self.since_snapshot[pet_id] >= self.snapshot_every
+
+    def snapshot(self, pet_id, state):
+        """记录包含至今所有事件的快照：封存当前日志，快照文件由 compact 在后台写出"""
+        with self.lock:
+            seq = self.seqs.get(pet_id, 0)
+            self._seal(pet_id, seq)
+            self.pending_snapshots[pet_id] = (seq, json.dumps(state, ensure_ascii=False))
+            self.since_snapshot[pet_id] = 0
+
+    def _seal(self, pet_id, seq):
+        """把当前日志改名为日志段，之后的事件写入新的当前日志"""
+        self._close_file(pet_id)
+        active = self.path(pet_id, self.ACTIVE_LOG)
+        if os.path.exists(active):
+            if os.path.getsize(active):
+                os.replace(active, self.path(pet_id, f"segment-{seq:012d}.log"))
+            else:
+                os.remove(active)
+
+    def save(self, pet_id, data):
+        """直接保存完整状态（新宠物、迁移），立即写出快照"""
+        with self.lock:
+            if pet_id not in self.seqs:
+                self.load(pet_id)
+            os.makedirs(self.path(pet_id), exist_ok=True)
+            self.snapshot(pet_id, data)
+            self._compact_pet(pet_id)
+
+    def save_many(self, items):
+        """批量保存 [(pet_id, data), ...]"""
+        for pet_id, data in items:
+            self.save(pet_id, data)
+
+    def _compact_pet(self, pet_id):
+        """写出等待中的快照，把它覆盖的日志段压缩进历史记录"""
+        pending = self.pending_snapshots.get(pet_id)
+        if pending is None:
+            return
+        seq, text = pending
+        temp_path = self.path(pet_id, self.SNAPSHOT + ".tmp")
+        with open(temp_path, "w", encoding="utf-8") as f:
+            f.write(f'{{"seq": {seq}, "state": {text}}}')
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(temp_path, self.path(pet_id, self.SNAPSHOT))
+        del self.pending_snapshots[pet_id]
+        self.snapshots_written += 1
+
+        for segment_seq, path in self._segments(pet_id):
+            if segment_seq > seq:
+                break
+            if self.keep_history:
+                # gzip 文件可以由多个成员拼接而成，追加一个成员即可
+                with open(path, "rb") as src, gzip.open(self.path(pet_id, self.HISTORY), "ab") as dst:
+                    shutil.copyfileobj(src, dst)
+            os.remove(path)
+            self.segments_compacted += 1
+
+    def compact(self):
+        """后台定期调用：写出等待中的快照并压缩日志，返回处理的宠物数量"""
+        with self.lock:
+            pet_ids = list(self.pending_snapshots)
+        for pet_id in pet_ids:
+            # 每只宠物单独加锁，压缩期间请求线程仍可追加其他宠物的事件
+            with self.lock:
+                try:
+                    self._compact_pet(pet_id)
+                except Exception as e:
+                    print(f"压缩事件日志失败: {pet_id}, 错误: {e}")
+        return len(pet_ids)
+
+    def history(self, pet_id, limit=None):
+        """宠物的事件记录（审计用），按时间顺序返回最近 limit 条"""
+        with self.lock:
+            f = self.files.get(pet_id)
+            if f is not None:
+                f.flush()
+            if not self.valid_id(pet_id) or not os.path.isdir(self.path(pet_id)):
+                return []
+            events = []
+            history_path = self.path(pet_id, self.HISTORY)
+            if os.path.exists(history_path):
+                with gzip.open(history_path, "rt", encoding="utf-8") as archive:
+                    events.extend(json.loads(line) for line in archive if line.strip())
+            for path in self._log_files(pet_id):
+                events.extend(self._read_events(path))
+        return events[-limit:] if limit else events
+
+    def delete(self, pet_id):
+        with self.lock:
+            self._close_file(pet_id)
+            self.seqs.pop(pet_id, None)
+            self.since_snapshot.pop(pet_id, None)
+            self.pending_snapshots.pop(pet_id, None)
+            if os.path.isdir(self.path(pet_id)):
+                shutil.rmtree(self.path(pet_id))
+
+    def ids(self):
+        for pet_id in sorted(os.listdir(self.log_dir)):
+            if not self.valid_id(pet_id):
+                continue
+            if os.path.exists(self.path(pet_id, self.SNAPSHOT)) or pet_id in self.pending_snapshots:
+                yield pet_id
+
+    def count(self):
+        return sum(1 for _ in self.ids())
+
+    def stats(self):
+        with self.lock:
+            return {
+                "events_appended": self.events_appended,
+                "bytes_appended": self.bytes_appended,
+                "snapshots_written": self.snapshots_written,
+                "pending_snapshots": len(self.pending_snapshots),
+                "segments_compacted": self.segments_compacted,
+                "open_files": len(self.files)
+            }
+
+    def close(self):
+        self.compact()
+        with self.lock:
+            for pet_id in list(self.files):
+                self._close_file(pet_id)
+
+
+def open_storage(backend, save_dir, **options):
+    """按名称创建存储后端：json、binary（二进制快照）、sqlite 或 events（事件日志）"""
+    if backend == "json":
+        return JsonDirStorage(save_dir)
+    if backend == "binary":
+        return BinaryDirStorage(save_dir)
+    if backend == "sqlite":
+        return SqliteStorage(os.path.join(save_dir, "pets.db"))
+    if backend == "events":
+        return EventLogStorage(os.path.join(save_dir, "events"), **options)
+    raise ValueError(f"不支持的存储后端: {backend}")
+
+
+def migrate(source, target, batch_size=1000, overwrite=False):
+    """把 source 中的宠物逐批导入 target，返回 (导入数量, 跳过数量)"""
+    existing = set() if overwrite else set(target.ids())
+    imported = 0
+    skipped = 0
+    batch = []
+    for pet_id in source.ids():
+        if pet_id in existing:
+            skipped += 1
+            continue
+        try:
+            data = source.load(pet_id)
+        except Exception as e:
+            print(f"读取存档失败: {pet_id}, 错误: {e}")
+            skipped += 1
+            continue
+        # 只导入宠物存档，忽略其他格式的 JSON 文件
+        if not isinstance(data, dict) or not all(key in data for key in ("name", "breed", "personality")):
+            skipped += 1
+            continue
+        batch.append((pet_id, data))
+        if len(batch) >= batch_size:
+            target.save_many(batch)
+            imported += len(batch)
+            batch = []
+    if batch:
+        target.save_many(batch)
+        imported += len(batch)
+    return imported, skipped
@@ -0,0 +1,71 @@
+"""批量互动：同一宠物的动作全部成功才生效，失败时回滚到批量开始前的状态"""
+import pytest
+
+import app
+from actions import Action, ActionError
+from dog import Dog
+
+
+def fail_with(error):
+    def handler(dog):
+        raise error
+    return handler
+
+
+@pytest.fixture
+def pet(monkeypatch):
+    saved = []
+    monkeypatch.setattr(app, "save_pet_data", lambda pet_id, dog: saved.append(pet_id))
+    monkeypatch.setitem(app.pet_actions.actions, "refuse", Action("refuse", fail_with(ActionError("不想动")), {}))
+    monkeypatch.setitem(app.pet_actions.actions, "crash", Action("crash", fail_with(KeyError("bug")), {}))
+    dog = Dog("豆豆", "柯基", "活泼", seed=1)
+    dog.hunger = 30
+    app.register_pet("batch_dog", dog)
+    yield dog, saved
+    app.population.remove("batch_dog")
+    app.pets.entries.pop("batch_dog", None)
+
+
+def assert_untouched(restored, before):
+    """除了批量开始时推进到当前时刻带来的微小衰减，宠物没有任何变化"""
+    for field in ("level", "experience", "affection", "skills", "rng_counter", "is_sleeping"):
+        assert getattr(restored, field) == before[field], field
+    for field in ("hunger", "happiness", "energy", "cleanliness", "health"):
+        assert getattr(restored, field) == pytest.approx(before[field], abs=0.01), field
+
+
+def run_batch(actions):
+    items = list(enumerate({"pet_id": "batch_dog", "action": action} for action in actions))
+    results = [None] * len(items)
+    return app.apply_pet_batch("batch_dog", items, results), results
+
+
+def test_success_commits_once(pet):
+    dog, saved = pet
+    status, results = run_batch(["feed", "pet"])
+    assert status == "success" and [r["status"] for r in results] == ["success", "success"]
+    assert saved == ["batch_dog"]
+    assert app.pets.get("batch_dog").hunger > 30
+
+
+def test_action_error_rolls_back(pet):
+    dog, saved = pet
+    before = dog.to_dict()
+    status, results = run_batch(["feed", "refuse"])
+    assert status == "error"
+    assert results[1]["message"] == "不想动"
+    assert results[0]["message"] == "同一宠物的其他动作失败，未执行"
+    restored = app.pets.get("batch_dog")
+    assert_untouched(restored, before)
+    assert saved == []
+    # 恢复的宠物仍然共用品种注册表中的对象
+    assert restored.breed_info is dog.breed_info and restored.decay is dog.decay
+
+
+def test_unexpected_error_rolls_back_and_propagates(pet):
+    dog, saved = pet
+    before = dog.to_dict()
+    with pytest.raises(KeyError):
+        run_batch(["feed", "crash"])
+    assert_untouched(app.pets.get("batch_dog"), before)
+    assert saved == []
@@ -0,0 +1,102 @@
+"""Dog.catch_up 的闭式解与逐步推进的结果一致"""
+import pytest
+
+from dog import Dog
+
+T0 = 1_700_000_000.0
+FIELDS = ("hunger", "happiness", "health", "cleanliness", "energy", "age", "level", "experience", "growth_stage")
+
+
+def make_dog(**stats):
+    dog = Dog("测试", "柯基", "活泼", seed=1)
+    dog.last_update_time = T0
+    for field, value in stats.items():
+        setattr(dog, field, value)
+    return dog
+
+
+def assert_same(a, b, abs_tol=1e-9):
+    for field in FIELDS:
+        assert getattr(a, field) == pytest.approx(getattr(b, field), abs=abs_tol), field
+
+
+@pytest.mark.parametrize("stats", [
+    {},
+    # 推进过程中饥饿、清洁度越过健康惩罚的阈值
+    {"hunger": 25, "cleanliness": 35, "happiness": 60},
+    # 快乐度和饥饿都很低，健康持续下降并触底
+    {"hunger": 5, "happiness": 10, "cleanliness": 5, "health": 20},
+])
+def test_one_long_step_equals_many_short_steps(stats):
+    once = make_dog(**stats)
+    once.catch_up(now=T0 + 3 * 3600)
+
+    stepped = make_dog(**stats)
+    for k in range(1, 1081):
+        stepped.catch_up(now=T0 + 10 * k)
+
+    assert_same(once, stepped)
+    assert once.last_update_time == stepped.last_update_time == T0 + 3 * 3600
+
+
+def test_matches_update_status_in_small_steps():
+    """update_status 按固定步长推进（离散近似），步长足够小时收敛到闭式解"""
+    closed = make_dog(hunger=25, cleanliness=35, happiness=60)
+    closed.catch_up(now=T0 + 3600)
+
+    stepped = make_dog(hunger=25, cleanliness=35, happiness=60)
+    for _ in range(3600):
+        stepped.update_status(1)
+
+    assert_same(closed, stepped, abs_tol=0.01)
+
+
+def test_sleep_is_skipped_until_wake_time():
+    """睡眠期间不消耗属性，醒来后只推进醒着的时间"""
+    sleeper = make_dog(energy=40)
+    sleeper.is_sleeping = True
+    sleeper.sleep_until = T0 + 600
+    sleeper.catch_up(now=T0 + 1800)
+
+    awake = make_dog(energy=min(100, 40 + 80))
+    awake.last_update_time = T0 + 600
+    awake.catch_up(now=T0 + 1800)
+
+    assert not sleeper.is_sleeping
+    assert_same(sleeper, awake)
+
+    # 分两次推进，中间一次还在睡觉
+    split = make_dog(energy=40)
+    split.is_sleeping = True
+    split.sleep_until = T0 + 600
+    split.catch_up(now=T0 + 300)
+    assert split.is_sleeping
+    split.catch_up(now=T0 + 1800)
+    assert_same(sleeper, split)
+
+
+def test_daybreak_wake_skips_the_sleep():
+    """天亮时叫醒：醒来前的睡眠时间不消耗属性，之后从醒来的时刻开始推进"""
+    sleeper = make_dog(energy=40)
+    sleeper.is_sleeping = True
+    sleeper.sleep_until = T0 + 3600
+    sleeper.catch_up(now=T0 + 1200, is_day=True)
+    assert not sleeper.is_sleeping
+    assert sleeper.energy == 90 and sleeper.hunger == 100
+    sleeper.catch_up(now=T0 + 1800)
+
+    awake = make_dog(energy=90)
+    awake.last_update_time = T0 + 1200
+    awake.catch_up(now=T0 + 1800)
+    assert_same(sleeper, awake)
+
+    # 已经睡够了的宠物按原来的醒来时刻计算，与是否天亮无关
+    rested = make_dog(energy=40)
+    rested.is_sleeping = True
+    rested.sleep_until = T0 + 600
+    rested.catch_up(now=T0 + 1800, is_day=True)
+    natural = make_dog(energy=40)
+    natural.is_sleeping = True
+    natural.sleep_until = T0 + 600
+    natural.catch_up(now=T0 + 1800)
+    assert_same(rested, natural)
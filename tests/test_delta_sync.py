@@ -0,0 +1,134 @@
+"""按确认版本发送增量、历史不足时的全量同步和客户端请求的重新同步"""
+from delta_sync import DeltaSync, VersionedState
+
+
+def apply(state, message):
+    """客户端应用一条增量消息"""
+    if message["full"]:
+        return dict(message["changes"])
+    state = dict(state)
+    state.update(message["changes"])
+    for key in message["removed"]:
+        state.pop(key, None)
+    return state
+
+
+def test_versions_and_deltas():
+    versioned = VersionedState()
+    assert versioned.commit({"a": 1, "b": 2}) == {"a", "b"}
+    assert versioned.commit({"a": 1, "b": 2}) == set()
+    assert versioned.version == 1
+    versioned.commit({"a": 1, "b": 3})
+    versioned.commit({"a": 1, "b": 3, "c": 4})
+    versioned.commit({"b": 3, "c": 4})
+    assert versioned.version == 4
+
+    delta = versioned.delta(1)
+    assert delta == {"version": 4, "base": 1, "full": False, "changes": {"b": 3, "c": 4}, "removed": ["a"]}
+    assert apply({"a": 1, "b": 2}, delta) == versioned.state
+    assert versioned.delta(4)["changes"] == {}
+    # 未知的基准版本（没有确认过、比当前版本新）发送全量
+    assert versioned.delta(None)["full"]
+    assert versioned.delta(5)["full"]
+
+
+def test_falls_back_to_full_when_history_is_gone():
+    versioned = VersionedState(max_history=3)
+    for i in range(10):
+        versioned.commit({"n": i})
+    # 只保留了版本 8、9、10 的变化记录
+    assert versioned.delta(7) == {"version": 10, "base": 7, "full": False, "changes": {"n": 9}, "removed": []}
+    assert versioned.delta(6)["full"] is True
+
+
+def make_sync():
+    sent = []
+
+    def emit(event, data, to, callback, skip_sid):
+        sent.append((event, data, to, callback))
+
+    return DeltaSync(emit), sent
+
+
+def test_ack_and_resync():
+    sync, sent = make_sync()
+    sync.connect("c1", deltas=True)
+    sync.subscribe("c1", "env")
+    sync.commit("env", {"hour": 8, "weather": "sunny"})
+
+    assert sync.publish("env", "environment_update") == 1
+    event, first, _, callback = sent[-1]
+    assert first["full"] and first["version"] == 1
+    client = apply({}, first)
+    callback()
+    assert sync.is_current("c1", "env")
+    # 已经是最新版本时不再发送
+    assert sync.publish("env", "environment_update") == 0
+
+    sync.commit("env", {"hour": 9, "weather": "sunny"})
+    sync.publish("env", "environment_update")
+    _, second, _, callback = sent[-1]
+    assert second == {"version": 2, "base": 1, "full": False, "changes": {"hour": 9}, "removed": []}
+    client = apply(client, second)
+    callback()
+    assert client == {"hour": 9, "weather": "sunny"}
+
+    # 客户端丢失本地状态后请求重新同步，下一条消息为全量
+    sync.resync("c1", "env")
+    assert not sync.is_current("c1", "env")
+    sync.publish("env", "environment_update")
+    assert sent[-1][1] == {"version": 2, "full": True, "changes": {"hour": 9, "weather": "sunny"}}
+
+
+def test_unacked_client_keeps_getting_full_state():
+    sync, sent = make_sync()
+    sync.connect("c1", deltas=True)
+    sync.subscribe("c1", "env")
+    for hour in (8, 9):
+        sync.commit("env", {"hour": hour})
+        sync.publish("env", "environment_update")
+        assert sent[-1][1]["full"]
+
+
+def test_ack_ignores_unknown_versions():
+    sync, _ = make_sync()
+    sync.subscribe("c1", "env")
+    sync.commit("env", {"hour": 8})
+    sync.ack("c1", "env", 5)
+    assert not sync.is_current("c1", "env")
+    sync.ack("c1", "env", 1)
+    assert sync.is_current("c1", "env")
+    # 旧的确认不会让版本倒退
+    sync.commit("env", {"hour": 9})
+    sync.ack("c1", "env", 2)
+    sync.ack("c1", "env", 1)
+    assert sync.is_current("c1", "env")
+
+
+def test_legacy_clients_get_plain_state():
+    """没有声明增量协议的客户端收到完整状态本身"""
+    sync, sent = make_sync()
+    sync.subscribe("old", "env")
+    sync.commit("env", {"hour": 8})
+    sync.publish("env", "environment_update")
+    assert sent[-1][1] == {"hour": 8}
+    sync.commit("env", {"hour": 9})
+    sync.publish("env", "environment_update", wrap=lambda view: {"environment": view})
+    assert sent[-1][1] == {"environment": {"hour": 9}}
+    assert sync.stats()["legacy_clients"] == 1
+
+
+def test_quantized_channels_keep_exact_state_for_legacy_clients():
+    """量化只用于比较和增量消息，旧客户端收到未量化的原值"""
+    sync, sent = make_sync()
+    sync.connect("new", deltas=True)
+    for sid in ("new", "old"):
+        sync.subscribe(sid, "pet")
+    assert sync.commit("pet", {"hunger": 50.123456}, digits=2) == {"hunger"}
+    sync.publish("pet", "pet_update")
+    messages = {to: data for _, data, to, _ in sent}
+    assert messages["new"]["changes"] == {"hunger": 50.12}
+    assert messages["old"] == {"hunger": 50.123456}
+    # 小于精度的变化不产生新版本
+    assert sync.commit("pet", {"hunger": 50.121}, digits=2) == set()
+    assert sync.channels["pet"].version == 1
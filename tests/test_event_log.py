@@ -0,0 +1,76 @@
+"""事件日志重放：从快照按序号应用事件，重建出与写入时完全相同的状态"""
+import json
+
+import pytest
+
+from dog import Dog, capture_state, changed_fields
+from storage import EventLogStorage
+
+
+def run(dog, cmd):
+    """执行一个命令，返回记录到日志的事件（与 app.pet_event 相同的格式）"""
+    captured = capture_state(dog)
+    getattr(dog, cmd)()
+    changes = changed_fields(dog, captured)
+    changes["last_update_time"] = dog.last_update_time
+    return {"time": dog.last_update_time, "cmd": cmd, "args": {}, "set": changes}
+
+
+def saved(dog):
+    """存档中的状态（经过 JSON 编码，和从日志读回的一样）"""
+    return json.loads(json.dumps(dog.to_dict()))
+
+
+@pytest.fixture
+def dog():
+    dog = Dog("豆豆", "金毛", "活泼", seed=7)
+    dog.hunger = 40
+    dog.energy = 60
+    return dog
+
+
+def play_session(dog, log, count):
+    """执行 count 个命令并追加到日志，到了生成快照的时候就生成快照"""
+    commands = ["feed", "play", "pet", "bath"]
+    for i in range(count):
+        event = run(dog, commands[i % len(commands)])
+        if log.append("dog", [event]):
+            log.snapshot("dog", dog.to_dict())
+
+
+def test_replay_from_initial_snapshot(tmp_path, dog):
+    log = EventLogStorage(str(tmp_path), snapshot_every=1000)
+    log.save("dog", dog.to_dict())
+    play_session(dog, log, 12)
+    # 换一个实例读取，相当于重启后加载
+    assert EventLogStorage(str(tmp_path)).load("dog") == saved(dog)
+
+
+def test_replay_across_snapshots_and_compaction(tmp_path, dog):
+    log = EventLogStorage(str(tmp_path), snapshot_every=5)
+    log.save("dog", dog.to_dict())
+    play_session(dog, log, 23)
+    # 快照还没写出时从内存中的快照重放
+    assert log.load("dog") == saved(dog)
+    log.compact()
+    assert EventLogStorage(str(tmp_path)).load("dog") == saved(dog)
+    # 压缩后历史记录仍包含全部事件，序号连续
+    seqs = [event["seq"] for event in log.history("dog")]
+    assert seqs == list(range(1, 24))
+
+
+def test_appends_continue_after_reload(tmp_path, dog):
+    log = EventLogStorage(str(tmp_path), snapshot_every=4)
+    log.save("dog", dog.to_dict())
+    play_session(dog, log, 6)
+    log.close()
+
+    reopened = EventLogStorage(str(tmp_path), snapshot_every=4)
+    restored = Dog.from_dict(reopened.load("dog"))
+    assert restored.to_dict() == saved(dog)
+    # 恢复后的宠物继续产生相同的随机结果，新事件接在原来的序号后面
+    play_session(dog, reopened, 5)
+    play_session(restored, EventLogStorage(str(tmp_path / "copy"), snapshot_every=4), 5)
+    assert restored.to_dict() == dog.to_dict()
+    assert EventLogStorage(str(tmp_path)).load("dog") == saved(dog)
+    assert [event["seq"] for event in reopened.history("dog")][-1] == 11
@@ -0,0 +1,106 @@
+"""种群的向量化 tick 与逐只 update_status 一致；tick 模式下种群数组是宠物状态的来源"""
+import random
+
+import numpy as np
+import pytest
+
+import app
+from dog import Dog
+from population import PetPopulation
+
+FIELDS = ("hunger", "happiness", "health", "cleanliness", "energy", "age", "level", "experience")
+BREEDS = ["柯基", "哈士奇", "金毛", "拉布拉多", "柴犬"]
+PERSONALITIES = ["活泼", "温顺", "机警", "粘人", "独立"]
+
+
+def random_dogs(count, seed=0):
+    rng = random.Random(seed)
+    dogs = []
+    for i in range(count):
+        dog = Dog(f"dog_{i}", rng.choice(BREEDS), rng.choice(PERSONALITIES), seed=i)
+        for field in ("hunger", "happiness", "health", "cleanliness", "energy"):
+            setattr(dog, field, rng.uniform(0, 100))
+        dog.age = rng.uniform(0, 400)
+        dog.experience = rng.randint(0, 300)
+        dogs.append(dog)
+    return dogs
+
+
+def test_tick_matches_update_status():
+    dogs = random_dogs(200)
+    population = PetPopulation(capacity=16)
+    for dog in dogs:
+        population.add(dog.name, Dog.from_dict(dog.to_dict()))
+
+    for _ in range(30):
+        changed = population.tick(60, now=dogs[0].last_update_time)
+        assert changed.all()
+        for dog in dogs:
+            dog.update_status(60)
+
+    for dog in dogs:
+        i = population.index[dog.name]
+        for field in FIELDS:
+            assert population.view(field)[i] == pytest.approx(getattr(dog, field), abs=1e-9), (dog.name, field)
+
+
+def test_sleeping_pets_are_not_marked_changed():
+    awake, asleep = random_dogs(2)
+    asleep.is_sleeping = True
+    asleep.sleep_until = asleep.last_update_time + 3600
+    population = PetPopulation()
+    population.add("awake", awake)
+    population.add("asleep", asleep)
+
+    changed = population.tick(60, now=asleep.last_update_time)
+    assert changed.tolist() == [True, False]
+    assert population.take_dirty() == ["awake"]
+    # 取出后标记被清除
+    assert population.take_dirty() == []
+
+
+@pytest.fixture
+def tick_mode(monkeypatch):
+    """tick 模式下的几只在线宠物，保存请求只记录不写盘"""
+    monkeypatch.setitem(app.app.config, "PET_UPDATE_MODE", "tick")
+    saved = []
+    monkeypatch.setattr(app, "save_pet_data", lambda pet_id, dog: saved.append(pet_id))
+    dogs = {dog.name: dog for dog in random_dogs(3, seed=1)}
+    for pet_id, dog in dogs.items():
+        app.register_pet(pet_id, dog)
+    yield dogs, saved
+    for pet_id in dogs:
+        app.population.remove(pet_id)
+        app.pets.entries.pop(pet_id, None)
+
+
+def test_decay_only_updates_the_population(tick_mode):
+    dogs, saved = tick_mode
+    before = {pet_id: dog.to_dict() for pet_id, dog in dogs.items()}
+    app.decay_pets()
+    # Dog 对象和存档都没有被碰过，变化只在种群数组中
+    assert {pet_id: dog.to_dict() for pet_id, dog in dogs.items()} == before
+    assert saved == []
+    i = app.population.index["dog_0"]
+    assert app.population.view("age")[i] > before["dog_0"]["age"]
+
+
+def test_access_writes_back_and_save_pass_saves_changed_pets(tick_mode):
+    dogs, saved = tick_mode
+    app.decay_pets()
+
+    # 被访问的宠物立即写回
+    dog = app.refresh_pet("dog_1")
+    i = app.population.index["dog_1"]
+    assert dog.hunger == app.population.view("hunger")[i]
+
+    # 修改后提交的宠物已经保存，不会在定期保存中再保存一次
+    app.commit_pet("dog_2", app.refresh_pet("dog_2"))
+    assert saved == ["dog_2"]
+
+    app.save_population()
+    assert sorted(saved) == ["dog_0", "dog_1", "dog_2"]
+    assert dogs["dog_0"].hunger == app.population.view("hunger")[app.population.index["dog_0"]]
+    # 没有新的变化时定期保存什么都不做
+    app.save_population()
+    assert len(saved) == 3
@@ -0,0 +1,95 @@
+"""二进制快照的往返编解码和旧存档迁移"""
+import json
+
+import pytest
+
+import snapshot
+from dog import Dog
+from rng import derive_seed
+
+
+def sample_dog():
+    dog = Dog("豆豆", "柴犬", "机警", seed=42)
+    dog.hunger = 63.25
+    dog.level = 7
+    dog.experience = 1234
+    dog.skills = {"坐下": 3, "握手": 1}
+    dog.is_sleeping = True
+    dog.sleep_until = 1_700_000_123.5
+    dog.rng_counter = 17
+    return dog
+
+
+def test_round_trip():
+    dog = sample_dog()
+    blob = snapshot.dumps(dog)
+    assert blob[:3] == snapshot.MAGIC and blob[3] == snapshot.SCHEMA_VERSION
+    assert snapshot.unpack(blob) == dog.to_dict()
+    assert snapshot.loads(blob).to_dict() == dog.to_dict()
+
+
+def test_json_with_schema_version_round_trip():
+    dog = sample_dog()
+    text = snapshot.to_json(dog.to_dict())
+    assert json.loads(text)["schema_version"] == snapshot.SCHEMA_VERSION
+    assert snapshot.unpack(text.encode("utf-8")) == dog.to_dict()
+
+
+def test_migrates_legacy_json():
+    """没有 schema_version 的原有 JSON 存档补上默认值，种子按名字派生"""
+    legacy = {"name": "旺财", "breed": "柯基", "personality": "活泼", "hunger": 80, "skills": {"坐下": 2}}
+    data = snapshot.unpack(json.dumps(legacy).encode("utf-8"))
+    assert set(snapshot.REQUIRED_FIELDS) <= set(data)
+    assert data["hunger"] == 80 and data["skills"] == {"坐下": 2}
+    assert data["affection"] == 50 and data["level"] == 1
+    assert data["rng_seed"] == derive_seed("dog", "旺财")
+    # 迁移后可以写成二进制快照并原样读回
+    assert snapshot.unpack(snapshot.pack(data)) == data
+
+
+def test_migrated_defaults_match_from_dict():
+    """迁移补上的外观和随机数计数器与 Dog.from_dict 直接读取旧存档得到的相同"""
+    legacy = {"name": "旺财", "breed": "柯基", "personality": "活泼"}
+    migrated = Dog.from_dict(snapshot.unpack(json.dumps(legacy).encode("utf-8")))
+    direct = Dog.from_dict(dict(legacy))
+    assert migrated.appearance == direct.appearance
+    assert migrated.rng_counter == direct.rng_counter
+    assert migrated.random() == direct.random()
+
+
+def test_registered_migration_runs(monkeypatch):
+    """从旧版本读取时依次执行登记的迁移"""
+    calls = []
+    original = snapshot.MIGRATIONS[0]
+
+    def migrate(data):
+        calls.append(data["name"])
+        return original(data)
+
+    monkeypatch.setitem(snapshot.MIGRATIONS, 0, migrate)
+    snapshot.unpack(json.dumps({"name": "小白", "breed": "哈士奇", "personality": "温顺"}).encode("utf-8"))
+    assert calls == ["小白"]
+
+
+def test_rejects_newer_version():
+    with pytest.raises(snapshot.SnapshotError):
+        snapshot.upgrade(sample_dog().to_dict(), snapshot.SCHEMA_VERSION + 1)
+    blob = bytearray(snapshot.dumps(sample_dog()))
+    blob[3] = snapshot.SCHEMA_VERSION + 1
+    with pytest.raises(snapshot.SnapshotError):
+        snapshot.unpack(bytes(blob))
+
+
+def test_rejects_missing_fields_and_corrupt_data():
+    data = sample_dog().to_dict()
+    del data["affection"]
+    with pytest.raises(snapshot.SnapshotError):
+        snapshot.upgrade(data, snapshot.SCHEMA_VERSION)
+
+    blob = snapshot.dumps(sample_dog())
+    with pytest.raises(snapshot.SnapshotError):
+        snapshot.unpack(blob[:20])
+    with pytest.raises(snapshot.SnapshotError):
+        snapshot.loads(blob[:20])
+    with pytest.raises(snapshot.SnapshotError):
+        snapshot.unpack(b"not a snapshot")
@@ -0,0 +1,88 @@
+"""文字渲染缓存
+
+界面每帧都会用相同的参数渲染按钮文字、属性名、技能列表、天气标签等，这里按
+(字体, 文字, 颜色, 抗锯齿) 缓存 font.render 的结果，容量有上限，按最近使用（LRU）淘汰。
+缓存的 Surface 是共享的，使用者只能 blit，不能在上面绘制或修改透明度。
+同时统计命中率和每帧渲染文字花费的时间，在桌面版的调试信息（F3）中显示。
+"""
+import time
+from collections import OrderedDict
+
+
+class TextCache:
+    def __init__(self, max_entries=512):
+        self.max_entries = max_entries
+        # (字体, 文字, 颜色, 抗锯齿) -> Surface；键中保存字体对象本身，字体在缓存中时不会被回收
+        self.entries = OrderedDict()
+
+        # 统计数据
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        # 当前帧的统计，end_frame 时转存到 last_frame
+        self.frame_hits = 0
+        self.frame_misses = 0
+        self.frame_time = 0.0
+        self.last_frame = {"hits": 0, "misses": 0, "ms": 0.0}
+
+    def __len__(self):
+        return len(self.entries)
+
+    def render(self, font, text, color, antialias=True):
+        """与 font.render(text, antialias, color) 相同，结果相同时直接返回缓存的 Surface"""
+        start = time.perf_counter()
+        key = (font, text, tuple(color), antialias)
+        surface = self.entries.get(key)
+        if surface is None:
+            surface = self.entries[key] = font.render(text, antialias, color)
+            self.misses += 1
+            self.frame_misses += 1
+            if len(self.entries) > self.max_entries:
+                self.entries.popitem(last=False)
+                self.evictions += 1
+        else:
+            self.entries.move_to_end(key)
+            self.hits += 1
+            self.frame_hits += 1
+        self.frame_time += time.perf_counter() - start
+        return surface
+
+    def end_frame(self):
+        """一帧结束时调用，记录这一帧的命中数和渲染时间"""
+        self.last_frame = {"hits": self.frame_hits, "misses": self.frame_misses,
+                           "ms": self.frame_time * 1000}
+        self.frame_hits = self.frame_misses = 0
+        self.frame_time = 0.0
+
+    def clear(self):
+        self.entries.clear()
+
+    def stats(self):
+        lookups = self.hits + self.misses
+        return {
+            "entries": len(self.entries),
+            "max_entries": self.max_entries,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / lookups, 4) if lookups else 0,
+            "evictions": self.evictions,
+            "frame_hits": self.last_frame["hits"],
+            "frame_misses": self.last_frame["misses"],
+            "frame_ms": round(self.last_frame["ms"], 3)
+        }
+
+
+_cache = None
+
+
+def get_text_cache():
+    """全局共享的文字缓存（界面、迷你游戏和交互系统共用）"""
+    global _cache
+    if _cache is None:
+        _cache = TextCache()
+    return _cache
+
+
+def render_text(font, text, color, antialias=True):
+    """用共享缓存渲染文字"""
+    return get_text_cache().render(font, text, color, antialias)
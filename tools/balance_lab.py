@@ -0,0 +1,232 @@
+"""数值平衡实验：在固定的照顾计划下批量模拟大量宠物的一生
+
+对每个 照顾计划 x 品种 x 性格 组合模拟若干只宠物，按游戏时间逐步推进。每一步先按
+Dog.update_status 的规则衰减，然后按计划执行喂食、玩耍、洗澡。计划有按宠物错开的执行时刻，
+每次照顾还有一定概率被漏掉。最后统计各属性的分布、首次生病（健康度低于30）的时间和等级曲线。
+
+模拟使用 PetPopulation 的向量化规则（与 Dog 的规则逐项对应）和 data/templates 中的效果表，
+规则或模板修改后结果随之变化。--verify N 会让每个组合的前 N 只宠物同时用真正的 Dog 对象
+逐只模拟，并逐项核对两者的结果。各组合分配到多个进程并行计算。
+
+用法：python tools/balance_lab.py [--pets 每组宠物数] [--days 游戏天数] [--policy 计划 ...] [--output 结果.json]
+"""
+import os
+import sys
+import json
+import time
+import argparse
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from dog import Dog, EFFECTS
+from breeds import get_breeds
+from population import PetPopulation
+from rng import derive_seed
+
+# 5分钟现实时间 = 1天游戏时间
+SECONDS_PER_DAY = 5 * 60
+# 健康度低于这个值时界面显示生病状态（与 UI.get_dog_state 相同）
+SICK_HEALTH = 30
+# 统计分布的属性和分位数
+STAT_FIELDS = ("hunger", "happiness", "health", "cleanliness", "energy", "age", "level")
+PERCENTILES = (10, 50, 90)
+# 与逐只模拟核对的属性（亲密度不在 PetPopulation 中）
+VERIFY_FIELDS = ("hunger", "happiness", "health", "cleanliness", "energy", "age",
+                 "level", "experience", "growth_stage", "rng_counter")
+
+# 预设的照顾计划：动作 -> 间隔（游戏小时）
+POLICIES = {
+    "neglect": {},
+    "minimal": {"feed": 24},
+    "standard": {"feed": 8, "play": 24, "bath": 72},
+    "devoted": {"feed": 4, "play": 8, "bath": 48},
+}
+# 计划中的动作使用的物品
+FOOD = "普通狗粮"
+GAME = "普通玩耍"
+
+
+def parse_policy(text):
+    """'名称:feed=8,play=24' -> (名称, {动作: 间隔小时})；只有名称时使用预设计划"""
+    name, _, spec = text.partition(":")
+    if not spec:
+        if name not in POLICIES:
+            raise argparse.ArgumentTypeError(f"未知的照顾计划: {name}（预设: {', '.join(POLICIES)}）")
+        return name, POLICIES[name]
+    schedule = {}
+    for item in spec.split(","):
+        action, _, hours = item.partition("=")
+        if action not in ("feed", "play", "bath"):
+            raise argparse.ArgumentTypeError(f"未知的动作: {action}")
+        schedule[action] = float(hours)
+    return name, schedule
+
+
+def apply_population(population, action, mask):
+    """对掩码内的宠物批量执行一个照顾动作"""
+    if action == "feed":
+        population.feed(EFFECTS.foods, np.full(population.size, EFFECTS.foods.id(FOOD)), mask)
+    elif action == "play":
+        population.play(EFFECTS.games, np.full(population.size, EFFECTS.games.id(GAME)), mask)
+    else:
+        population.bath(mask)
+
+
+def apply_dog(dog, action):
+    """对一只 Dog 执行同一个照顾动作"""
+    if action == "feed":
+        dog.feed(FOOD)
+    elif action == "play":
+        dog.play(GAME)
+    else:
+        dog.bath()
+
+
+def summarize(values):
+    percentiles = np.percentile(values, PERCENTILES)
+    return {f"p{p}": round(float(v), 3) for p, v in zip(PERCENTILES, percentiles)}
+
+
+def simulate(policy, schedule, breed, personalities, pets, days, step_hours, compliance, seed,
+             report_every, verify=0):
+    """模拟一个品种在一个照顾计划下的所有性格组合，返回 ([各组合的结果], 核对不一致的数量)"""
+    population = PetPopulation(capacity=len(personalities) * pets)
+    reference = []  # 逐只模拟的 (下标, Dog)
+    for group, personality in enumerate(personalities):
+        for i in range(pets):
+            pet_id = group * pets + i
+            dog = Dog(f"{breed}-{personality}-{i}", breed, personality,
+                      seed=derive_seed(seed, policy, breed, personality, i))
+            population.add(pet_id, dog)
+            if i < verify:
+                reference.append((pet_id, dog))
+    n = population.size
+    everyone = np.ones(n, dtype=bool)
+
+    step_seconds = step_hours / 24 * SECONDS_PER_DAY
+    steps = int(round(days * 24 / step_hours))
+    report_steps = max(1, int(round(report_every * 24 / step_hours)))
+
+    # 每个动作的执行间隔（步数）和每只宠物错开的起始时刻，由各自的随机数流决定
+    plan = []
+    for action, hours in sorted(schedule.items()):
+        interval = max(1, int(round(hours / step_hours)))
+        offsets = (population.random(everyone) * interval).astype(np.int64)
+        plan.append((action, interval, offsets))
+    reference_offsets = [[int(dog.random() * interval) for _, interval, _ in plan] for _, dog in reference]
+
+    sick_day = np.full(n, np.nan)
+    level_curve = []
+    for step in range(1, steps + 1):
+        population.tick(step_seconds, now=step * step_seconds)
+        population.update_growth_stages()
+        for action, interval, offsets in plan:
+            due = (step + offsets) % interval == 0
+            done = due & (population.random(due) < compliance)
+            apply_population(population, action, done)
+
+        for (pet_id, dog), dog_offsets in zip(reference, reference_offsets):
+            dog.update_status(step_seconds)
+            dog.update_growth_stage()
+            for (action, interval, _), offset in zip(plan, dog_offsets):
+                if (step + offset) % interval == 0 and dog.random() < compliance:
+                    apply_dog(dog, action)
+
+        health = population.view("health")
+        newly_sick = np.isnan(sick_day) & (health < SICK_HEALTH)
+        sick_day[newly_sick] = step * step_hours / 24
+        if step % report_steps == 0:
+            level_curve.append(population.view("level").copy())
+
+    mismatches = 0
+    for pet_id, dog in reference:
+        simulated = Dog(dog.name, dog.breed, dog.personality, seed=dog.rng_seed)
+        population.store_to_dog(pet_id, simulated)
+        mismatches += sum(getattr(simulated, field) != getattr(dog, field) for field in VERIFY_FIELDS)
+
+    results = []
+    for group, personality in enumerate(personalities):
+        rows = slice(group * pets, (group + 1) * pets)
+        sick = sick_day[rows][~np.isnan(sick_day[rows])]
+        results.append({
+            "policy": policy,
+            "breed": breed,
+            "personality": personality,
+            "pets": pets,
+            "stats": {field: summarize(population.view(field)[rows]) for field in STAT_FIELDS},
+            "sick_fraction": round(len(sick) / pets, 4),
+            "days_to_sick": summarize(sick) if len(sick) else None,
+            "level_curve": [{"day": (i + 1) * report_steps * step_hours / 24,
+                             "mean_level": round(float(levels[rows].mean()), 3)}
+                            for i, levels in enumerate(level_curve)],
+        })
+    return results, mismatches
+
+
+def run_task(task):
+    return simulate(**task)
+
+
+def print_results(results):
+    print(f"{'计划':>10} {'品种':>8} {'性格':>4} {'生病比例':>8} {'生病天数p50':>11} "
+          f"{'健康p50':>8} {'快乐p50':>8} {'等级p50':>8}")
+    for r in results:
+        days_to_sick = f"{r['days_to_sick']['p50']:.1f}" if r["days_to_sick"] else "-"
+        print(f"{r['policy']:>10} {r['breed']:>8} {r['personality']:>4} {r['sick_fraction']:>8.1%} "
+              f"{days_to_sick:>11} {r['stats']['health']['p50']:>8.1f} "
+              f"{r['stats']['happiness']['p50']:>8.1f} {r['stats']['level']['p50']:>8.0f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="按照顾计划批量模拟宠物的一生，统计数值平衡")
+    parser.add_argument("--policy", action="append", type=parse_policy,
+                        help="照顾计划：预设名称（neglect/minimal/standard/devoted）或 '名称:feed=8,play=24,bath=72'"
+                             "（间隔为游戏小时），可指定多个，默认为所有预设")
+    parser.add_argument("--breeds", nargs="*", default=None, help="品种（默认为所有品种模板）")
+    parser.add_argument("--personalities", nargs="*", default=None, help="性格（默认为所有性格）")
+    parser.add_argument("--pets", type=int, default=200, help="每个组合模拟的宠物数")
+    parser.add_argument("--days", type=float, default=180, help="模拟的游戏天数")
+    parser.add_argument("--step-hours", type=float, default=1, help="每步推进的游戏小时数")
+    parser.add_argument("--compliance", type=float, default=0.9, help="每次照顾实际执行的概率")
+    parser.add_argument("--report-every", type=float, default=30, help="等级曲线的采样间隔（游戏天）")
+    parser.add_argument("--seed", type=int, default=0, help="随机数种子（相同参数和种子的结果完全相同）")
+    parser.add_argument("--verify", type=int, default=0, help="每个组合中同时用 Dog 对象逐只模拟并核对的宠物数")
+    parser.add_argument("--workers", type=int, default=None, help="进程数（默认为 CPU 核数）")
+    parser.add_argument("--output", default=None, help="把完整结果（分布、生病时间、等级曲线）写入 JSON 文件")
+    args = parser.parse_args()
+
+    policies = args.policy or list(POLICIES.items())
+    breeds = args.breeds or get_breeds().names()
+    personalities = args.personalities or list(Dog.PERSONALITY_DECAY)
+    # 每个任务是一个计划下的一个品种（包含所有性格），在进程内向量化
+    tasks = [dict(policy=policy, schedule=schedule, breed=breed, personalities=personalities, pets=args.pets,
+                  days=args.days, step_hours=args.step_hours, compliance=args.compliance, seed=args.seed,
+                  report_every=args.report_every, verify=args.verify)
+             for policy, schedule in policies for breed in breeds]
+
+    start = time.perf_counter()
+    results = []
+    mismatches = 0
+    with ProcessPoolExecutor(max_workers=args.workers) as pool:
+        for task_results, task_mismatches in pool.map(run_task, tasks):
+            results.extend(task_results)
+            mismatches += task_mismatches
+    elapsed = time.perf_counter() - start
+
+    lifetimes = len(tasks) * len(personalities) * args.pets
+    print(f"模拟 {lifetimes} 只宠物 x {args.days:g} 天，耗时 {elapsed:.1f} 秒")
+    print_results(results)
+    if args.verify:
+        print(f"与 Dog 逐只模拟核对: {'完全一致' if mismatches == 0 else f'{mismatches} 处不一致'}")
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump({"args": {key: value for key, value in vars(args).items() if key != "policy"},
+                       "policies": dict(policies), "results": results}, f, ensure_ascii=False, indent=2)
+        print(f"结果已写入 {os.path.abspath(args.output)}")
+
+
+if __name__ == "__main__":
+    main()
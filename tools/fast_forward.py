@@ -0,0 +1,279 @@
+"""离线快进：把存档目录中的所有宠物推进一段时间，输出推进后的状态和分组统计
+
+通过 storage.py 的存储后端列出存档目录中的宠物，分块交给进程池，每只宠物用 Dog.catch_up 的闭式解
+一次推进到目标时刻，再按品种、性格和成长阶段汇总统计。子进程自己打开存储后端读取宠物，主进程只保存
+宠物 ID 和统计结果，不会把所有宠物同时载入内存。用于数值平衡和容量规划，不会修改原存档。
+
+用法：python tools/fast_forward.py [存档目录 ...] [--backend json|binary|sqlite|events] [--days 游戏天数]
+                                  [--workers 进程数] [--output 输出目录]
+"""
+import os
+import sys
+import json
+import time
+import argparse
+from datetime import datetime
+from operator import add, attrgetter
+from concurrent.futures import ProcessPoolExecutor, wait, FIRST_COMPLETED
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from dog import Dog
+from effects import get_tables
+from storage import open_storage
+
+ROOT = os.path.join(os.path.dirname(__file__), "..")
+DEFAULT_SOURCES = [os.path.join(ROOT, "data/saves/web"), os.path.join(ROOT, "data/saves/desktop/dogs")]
+
+# 5分钟现实时间 = 1天游戏时间
+SECONDS_PER_DAY = 5 * 60
+# 统计的属性和分组方式
+STAT_FIELDS = ("hunger", "happiness", "health", "cleanliness", "energy", "age", "level", "affection")
+GROUP_BY = ("breed", "personality", "growth_stage")
+_stat_values = attrgetter(*STAT_FIELDS)
+# 进入下一成长阶段的年龄（与 Dog.update_growth_stage 相同）
+STAGE_AGES = (30, 180, 1095)
+
+
+# 存储后端在存档目录中的位置（与 open_storage 一致），不存在时跳过，避免打开后端时创建空的存档
+BACKEND_PATHS = {"json": "", "binary": "", "sqlite": "pets.db", "events": "events"}
+# 子进程中已打开的存储后端 (目录, 后端) -> 存储（只读，不关闭：事件日志关闭时会压缩日志）
+_storages = {}
+
+
+def source_storage(directory, backend):
+    storage = _storages.get((directory, backend))
+    if storage is None:
+        storage = _storages[(directory, backend)] = open_storage(backend, directory)
+    return storage
+
+
+def iter_pets(directories, backend):
+    """逐个产生各存档目录中的 (目录, 宠物 ID)"""
+    for directory in directories:
+        if not os.path.exists(os.path.join(directory, BACKEND_PATHS[backend])):
+            print(f"跳过没有 {backend} 存档的目录: {directory}")
+            continue
+        for pet_id in source_storage(directory, backend).ids():
+            yield directory, pet_id
+
+
+def chunked(iterable, size):
+    chunk = []
+    for item in iterable:
+        chunk.append(item)
+        if len(chunk) >= size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+def desktop_save_to_dict(data):
+    """桌面版多宠物存档（属性在 stats 下）-> Dog.to_dict 的格式"""
+    stats = data.get("stats", {})
+    skills = get_tables().skills
+    # 技能按模板 id 保存，换成技能名；未知的技能保留原 id
+    names = {tags[0]: name for name, tags in zip(skills.names, skills.tags) if tags and tags[0]}
+    created_at = data.get("created_at")
+    try:
+        last_update_time = datetime.fromisoformat(created_at.replace("Z", "+00:00")).timestamp()
+    except (AttributeError, ValueError):
+        last_update_time = time.time()
+    return {
+        "name": data.get("name", data.get("id", "小狗")),
+        "breed": data.get("breed", "未知品种"),
+        "personality": data.get("personality", "温顺"),
+        "hunger": stats.get("hunger", 100),
+        "happiness": stats.get("mood", stats.get("happiness", 100)),
+        "health": stats.get("health", 100),
+        "cleanliness": stats.get("cleanliness", 100),
+        "energy": stats.get("energy", 100),
+        "level": stats.get("level", 1),
+        "experience": stats.get("exp", 0),
+        "skills": {names.get(skill_id, skill_id): skill.get("level", 1) if isinstance(skill, dict) else skill
+                   for skill_id, skill in data.get("skills", {}).items()},
+        "last_update_time": last_update_time,
+    }
+
+
+def load_dog(storage, pet_id):
+    """通过存储后端读取一只宠物（Web 版或桌面版格式）"""
+    data = storage.load(pet_id)
+    if data is None:
+        raise KeyError(pet_id)
+    if "stats" in data and "hunger" not in data:
+        data = desktop_save_to_dict(data)
+    return Dog.from_dict(data)
+
+
+class GroupStats:
+    """按分组累计各属性的数量、总和、平方和、最小值和最大值（可合并，用于汇总各进程的结果）"""
+
+    def __init__(self):
+        # (分组方式, 分组值) -> [数量, 总和列表, 平方和列表, 最小值列表, 最大值列表]，列表按 STAT_FIELDS 排列
+        self.groups = {}
+
+    def add(self, keys, dog):
+        """把一只宠物计入 keys 中的每个分组"""
+        values = _stat_values(dog)
+        squares = [value * value for value in values]
+        for key in keys:
+            group = self.groups.get(key)
+            if group is None:
+                self.groups[key] = [1, list(values), squares[:], list(values), list(values)]
+                continue
+            group[0] += 1
+            group[1] = list(map(add, group[1], values))
+            group[2] = list(map(add, group[2], squares))
+            group[3] = list(map(min, group[3], values))
+            group[4] = list(map(max, group[4], values))
+
+    def merge(self, other):
+        for key, group in other.groups.items():
+            mine = self.groups.get(key)
+            if mine is None:
+                self.groups[key] = group
+                continue
+            mine[0] += group[0]
+            mine[1] = list(map(add, mine[1], group[1]))
+            mine[2] = list(map(add, mine[2], group[2]))
+            mine[3] = list(map(min, mine[3], group[3]))
+            mine[4] = list(map(max, mine[4], group[4]))
+
+    def summary(self):
+        """{分组方式: {分组值: {count, 各属性的 mean/std/min/max}}}"""
+        result = {}
+        for (dimension, value), group in sorted(self.groups.items(), key=lambda item: (item[0][0], str(item[0][1]))):
+            count, totals, squares, lows, highs = group
+            fields = {}
+            for field, total, square, low, high in zip(STAT_FIELDS, totals, squares, lows, highs):
+                mean = total / count
+                fields[field] = {"mean": round(mean, 3),
+                                 "std": round(max(0.0, square / count - mean * mean) ** 0.5, 3),
+                                 "min": round(low, 3), "max": round(high, 3)}
+            result.setdefault(dimension, {})[str(value)] = {"count": count, **fields}
+        return result
+
+
+def advance(dog, now):
+    """把宠物推进到 now：各成长阶段的年龄增长速度不同，所以在年龄跨过阶段界限的时刻先更新成长阶段，
+    每段内用 catch_up 的闭式解一次推进（与游戏中定期调用 update_growth_stage 的结果一致）"""
+    dog.update_growth_stage()
+    # 每次进入新阶段最多切分一次，睡眠会推迟年龄到达界限的时刻，留几次余量
+    for _ in range(2 * len(STAGE_AGES)):
+        stage = dog.growth_stage
+        rate = dog.breed_info.growth[stage]
+        if stage >= len(STAGE_AGES) or rate <= 0:
+            break
+        # 多推进 1 毫秒，保证年龄确实跨过界限
+        hit = dog.last_update_time + (STAGE_AGES[stage] - dog.age) / rate * SECONDS_PER_DAY + 0.001
+        if hit >= now:
+            break
+        dog.catch_up(now=hit)
+        dog.update_growth_stage()
+    dog.catch_up(now=now)
+    dog.update_growth_stage()
+
+
+def fast_forward_chunk(chunk_id, pets, backend, seconds, output_dir):
+    """子进程：推进一批存档，返回 (处理数, 跳过数, 统计)；指定输出目录时把结果写成一个 JSONL 分片"""
+    stats = GroupStats()
+    processed = skipped = 0
+    out = None
+    if output_dir:
+        out = open(os.path.join(output_dir, f"part-{chunk_id:06d}.jsonl"), "w", encoding="utf-8")
+    try:
+        for directory, pet_id in pets:
+            try:
+                dog = load_dog(source_storage(directory, backend), pet_id)
+            except (OSError, ValueError, KeyError, TypeError, AttributeError):
+                skipped += 1
+                continue
+            advance(dog, dog.last_update_time + seconds)
+            processed += 1
+
+            stats.add([("all", "all")] + [(dimension, getattr(dog, dimension)) for dimension in GROUP_BY], dog)
+            if out is not None:
+                out.write(json.dumps({"pet_id": pet_id, "source": directory, "state": dog.to_dict()},
+                                     ensure_ascii=False) + "\n")
+    finally:
+        if out is not None:
+            out.close()
+    return processed, skipped, stats
+
+
+def run(directories, seconds, workers=None, chunk_size=2000, output_dir=None, progress=True, backend="json"):
+    """把所有存档推进 seconds 秒，返回 (处理数, 跳过数, 合并后的统计)"""
+    if output_dir:
+        os.makedirs(output_dir, exist_ok=True)
+    workers = workers or os.cpu_count() or 1
+    total = GroupStats()
+    processed = skipped = 0
+    start = time.perf_counter()
+
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        pending = set()
+        # 同时提交的分块数有上限，避免一次把所有宠物 ID 交给进程池
+        for chunk_id, pets in enumerate(chunked(iter_pets(directories, backend), chunk_size)):
+            if len(pending) >= workers * 2:
+                done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                for future in done:
+                    count, bad, stats = future.result()
+                    processed += count
+                    skipped += bad
+                    total.merge(stats)
+                if progress:
+                    elapsed = time.perf_counter() - start
+                    print(f"\r已处理 {processed} 只宠物，{processed / max(elapsed, 1e-9):.0f} 只/秒", end="", flush=True)
+            pending.add(pool.submit(fast_forward_chunk, chunk_id, pets, backend, seconds, output_dir))
+        for future in pending:
+            count, bad, stats = future.result()
+            processed += count
+            skipped += bad
+            total.merge(stats)
+    if progress and processed:
+        print()
+    return processed, skipped, total
+
+
+def print_summary(summary):
+    fields = ("hunger", "happiness", "health", "energy", "level")
+    print(f"{'分组':>16} {'数量':>8} " + " ".join(f"{field:>10}" for field in fields))
+    for dimension in ("all",) + GROUP_BY:
+        for value, group in summary.get(dimension, {}).items():
+            label = value if dimension == "all" else f"{dimension}={value}"
+            print(f"{label:>16} {group['count']:>8} " + " ".join(f"{group[field]['mean']:>10.2f}" for field in fields))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="把存档中的所有宠物离线推进一段时间并统计结果")
+    parser.add_argument("sources", nargs="*", default=DEFAULT_SOURCES,
+                        help="存档目录（默认为 data/saves/web 和 data/saves/desktop/dogs）")
+    parser.add_argument("--backend", choices=sorted(BACKEND_PATHS), default="json",
+                        help="存档的存储后端（与 Web 版的 STORAGE_BACKEND 相同），所有目录使用同一种")
+    parser.add_argument("--days", type=float, default=30, help="推进的游戏天数（1天 = 5分钟现实时间）")
+    parser.add_argument("--workers", type=int, default=None, help="进程数（默认为 CPU 核数）")
+    parser.add_argument("--chunk-size", type=int, default=2000, help="每个任务处理的存档数")
+    parser.add_argument("--output", default=None,
+                        help="输出目录：推进后的宠物写成 part-*.jsonl 分片，统计写入 summary.json")
+    args = parser.parse_args()
+
+    seconds = args.days * SECONDS_PER_DAY
+    start = time.perf_counter()
+    processed, skipped, stats = run(args.sources, seconds, args.workers, args.chunk_size, args.output,
+                                    backend=args.backend)
+    elapsed = time.perf_counter() - start
+
+    summary = stats.summary()
+    print(f"推进 {args.days:g} 天：处理 {processed} 只宠物，跳过 {skipped} 个存档，耗时 {elapsed:.2f} 秒")
+    print_summary(summary)
+    if args.output:
+        with open(os.path.join(args.output, "summary.json"), "w", encoding="utf-8") as f:
+            json.dump({"days": args.days, "processed": processed, "skipped": skipped, "groups": summary},
+                      f, ensure_ascii=False, indent=2)
+        print(f"结果已写入 {os.path.abspath(args.output)}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,49 @@
+"""把 Web 版的 JSON 存档目录导入 SQLite 数据库、事件日志或二进制快照
+
+用法：python tools/migrate_saves.py [--source 存档目录] [--backend sqlite|events|binary] [--db 数据库文件] [--overwrite]
+"""
+import os
+import sys
+import time
+import argparse
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from storage import JsonDirStorage, BinaryDirStorage, SqliteStorage, EventLogStorage, migrate
+
+DEFAULT_SAVE_DIR = os.path.join(os.path.dirname(__file__), "..", "data/saves/web")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="把 JSON 宠物存档导入 SQLite 数据库、事件日志或二进制快照")
+    parser.add_argument("--source", default=DEFAULT_SAVE_DIR, help="JSON 存档目录")
+    parser.add_argument("--backend", choices=["sqlite", "events", "binary"], default="sqlite",
+                        help="目标存储后端（events 为每只宠物一个事件日志，导入的存档作为初始快照；"
+                             "binary 为存档目录下每只宠物一个 .dog 快照文件）")
+    parser.add_argument("--db", default=None, help="SQLite 数据库文件（默认为存档目录下的 pets.db）")
+    parser.add_argument("--batch-size", type=int, default=1000, help="每个事务写入的宠物数量")
+    parser.add_argument("--overwrite", action="store_true", help="覆盖数据库中已存在的宠物")
+    args = parser.parse_args()
+
+    if args.backend == "binary":
+        db_path = args.source
+        target = BinaryDirStorage(db_path)
+    elif args.backend == "events":
+        db_path = os.path.join(args.source, "events")
+        target = EventLogStorage(db_path)
+    else:
+        db_path = args.db or os.path.join(args.source, "pets.db")
+        target = SqliteStorage(db_path)
+    source = JsonDirStorage(args.source)
+
+    start = time.perf_counter()
+    imported, skipped = migrate(source, target, batch_size=args.batch_size, overwrite=args.overwrite)
+    elapsed = time.perf_counter() - start
+
+    print(f"导入 {imported} 只宠物，跳过 {skipped} 个文件，耗时 {elapsed:.2f} 秒")
+    print(f"目标: {os.path.abspath(db_path)}，共 {target.count()} 只宠物")
+    target.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -1,15 +1,59 @@
 import pygame
 import os
 import math
-import random
-import sys
+from collections import OrderedDict
+
+from actions import pet_actions
+from fonts import get_font
+from dog import FIELD_BITS
+from dirty_rects import DirtyRegions
+from particles import ParticleSystem
+from rng import RandomStream
+from text_cache import render_text
+
+# 按钮动作 -> (宠物动作, 参数, 播放的动画)
+BUTTON_ACTIONS = {
+    "feed_normal": ("feed", {"food_type": "普通狗粮"}, "eat"),
+    "feed_premium": ("feed", {"food_type": "高级狗粮"}, "eat"),
+    "feed_treat": ("feed", {"food_type": "狗狗零食"}, "eat"),
+    "feed_chicken": ("feed", {"food_type": "鸡肉"}, "eat"),
+    "feed_beef": ("feed", {"food_type": "牛肉"}, "eat"),
+    "play_normal": ("play", {"game_type": "普通玩耍"}, "play"),
+    "play_frisbee": ("play", {"game_type": "接飞盘"}, "play"),
+    "play_ball": ("play", {"game_type": "追球"}, "play"),
+    "play_rope": ("play", {"game_type": "拔河"}, "play"),
+    "play_puzzle": ("play", {"game_type": "智力游戏"}, "play"),
+    "train_sit": ("train", {"skill": "坐下"}, None),
+    "train_handshake": ("train", {"skill": "握手"}, None),
+    "train_roll": ("train", {"skill": "打滚"}, None),
+    "train_frisbee": ("train", {"skill": "接飞盘"}, None),
+    "train_fetch": ("train", {"skill": "捡球"}, None),
+    "train_stay": ("train", {"skill": "原地等待"}, None),
+    "bath": ("clean", {}, "bath"),
+    "sleep": ("sleep", {"duration": 8}, "sleep"),
+    "pet": ("pet", {}, None),
+}
+
+# 状态栏和宠物信息面板依赖的属性，只有这些属性变化时才重新渲染面板上的文字
+STATUS_BAR_BITS = (FIELD_BITS["hunger"] | FIELD_BITS["happiness"] | FIELD_BITS["health"]
+                   | FIELD_BITS["cleanliness"] | FIELD_BITS["energy"])
+DOG_INFO_BITS = FIELD_BITS["age"] | FIELD_BITS["growth_stage"] | FIELD_BITS["affection"] | FIELD_BITS["skills"]
 
 class UI:
-    def __init__(self, screen, dog):
+    def __init__(self, screen, dog, rng=None, quality="high"):
         self.screen = screen
         self.dog = dog
+        # 随机数流（由游戏会话注入，便于重现）
+        self.rng = rng if rng is not None else RandomStream()
         self.width, self.height = screen.get_size()
         
+        # 合成好的背景（原图缩放并叠加季节、夜晚滤镜）按 (场景, 季节, 是否白天, 窗口尺寸) 缓存，
+        # 只在这些变化时重新合成，每帧只需一次 blit
+        self.background_cache = OrderedDict()
+        self.background_cache_size = 8
+        self.background_scene = None  # 当前背景原图所属的场景，没有背景图时为 None
+        self.scene_backgrounds = {}  # 场景 -> 背景原图（切换场景时不再重新读盘）
+        
         # 添加长按检测变量
         self.press_start_time = 0
         self.is_pressing = False
@@ -37,55 +81,10 @@ class UI:
             "winter_color": (230, 230, 250)    # 淡紫色
         }
         
-        # 加载字体
-        pygame.font.init()
-        
-        # 加载字体 - 尝试多种方法
-        try:
-            # 尝试方法1：使用特定的中文字体
-            self.font_small = pygame.font.SysFont('simhei', 16)
-            self.font_medium = pygame.font.SysFont('simhei', 20)
-            self.font_large = pygame.font.SysFont('simhei', 24)
-            # 测试字体是否能渲染中文
-            test_surface = self.font_small.render('测试中文', True, (0, 0, 0))
-            if test_surface.get_width() < 10:
-                raise Exception("所选字体无法正确渲染中文")
-        except Exception as e:
-            print(f"使用SimHei字体失败: {e}")
-            try:
-                # 尝试方法2：使用微软雅黑
-                self.font_small = pygame.font.SysFont('microsoftyahei', 16)
-                self.font_medium = pygame.font.SysFont('microsoftyahei', 20)
-                self.font_large = pygame.font.SysFont('microsoftyahei', 24)
-            except Exception as e:
-                print(f"使用微软雅黑字体失败: {e}")
-                try:
-                    # 尝试方法3：根据操作系统查找可用字体
-                    if sys.platform.startswith('win'):
-                        # Windows字体路径
-                        font_path = os.path.join(os.environ['WINDIR'], 'Fonts', 'simhei.ttf')
-                    elif sys.platform.startswith('darwin'):
-                        # macOS字体路径
-                        font_path = '/System/Library/Fonts/PingFang.ttc'
-                    else:
-                        # Linux字体路径
-                        font_path = '/usr/share/fonts/truetype/droid/DroidSansFallbackFull.ttf'
-                        
-                    if os.path.exists(font_path):
-                        self.font_small = pygame.font.Font(font_path, 16)
-                        self.font_medium = pygame.font.Font(font_path, 20)
-                        self.font_large = pygame.font.Font(font_path, 24)
-                    else:
-                        raise Exception(f"字体文件不存在: {font_path}")
-                except Exception as e:
-                    print(f"查找系统字体失败: {e}")
-                    # 最后的方案：使用默认字体
-                    print("使用默认字体")
-                    self.font_small = pygame.font.Font(None, 16)
-                    self.font_medium = pygame.font.Font(None, 20)
-                    self.font_large = pygame.font.Font(None, 24)
-        
-        print(f"成功加载字体")
+        # 加载字体（能显示中文的字体由字体管理器查找并缓存，各模块共享同一组字体对象）
+        self.font_small = get_font("text", 16)
+        self.font_medium = get_font("text", 20)
+        self.font_large = get_font("text", 24)
         
         # 加载图像资源
         self.load_images()
@@ -121,6 +120,21 @@ class UI:
             "toys": []
         }
         
+        # 状态栏和宠物信息面板上已渲染的文字（宠物属性变化时重建）
+        self.status_bar_texts = None
+        self.dog_info_texts = None
+        
+        # 帧计数和当前帧宠物的 (图像, 位置)，由 update_frame 更新
+        self.frame_count = 0
+        self.dog_sprite = None
+        
+        # 天气粒子（粒子数量按画质设置缩放）
+        self.particles = ParticleSystem(self.width, self.height, self.rng.spawn("particles"), quality)
+        
+        # 局部重绘的区域（Game 可以再登记自己绘制的覆盖层）
+        self.regions = DirtyRegions(self.screen.get_rect())
+        self.setup_regions()
+        
         # 确保在启动时加载家庭场景
         self.load_background("home")
     
@@ -330,6 +344,8 @@ class UI:
                             # 保存原始背景图片
                             self.images["background_original"] = bg_img
                             self.images["background"] = pygame.transform.scale(bg_img, (self.width, self.height))
+                            self.scene_backgrounds[folder] = bg_img
+                            self.background_scene = folder
                             print(f"成功加载背景图片: {file} (从 {folder} 文件夹)")
                             bg_loaded = True
                             break
@@ -352,6 +368,7 @@ class UI:
                         # 保存原始背景图片
                         self.images["background_original"] = bg_img
                         self.images["background"] = pygame.transform.scale(bg_img, (self.width, self.height))
+                        self.background_scene = bg_file
                         print(f"成功加载背景图片: {bg_file}")
                         bg_loaded = True
                         break
@@ -516,76 +533,17 @@ class UI:
             self.load_background("garden")
             return None
         
-        # 喂食动作
-        if action.startswith("feed_"):
-            food_map = {
-                "feed_normal": "普通狗粮",
-                "feed_premium": "高级狗粮",
-                "feed_treat": "狗狗零食",
-                "feed_chicken": "鸡肉",
-                "feed_beef": "牛肉"
-            }
-            food_type = food_map.get(action)
-            if food_type:
-                self.display_message(self.dog.feed(food_type))
-                self.current_animation = "eat"
-                self.animation_frame = 0
-                self.animation_time = pygame.time.get_ticks()
-                return None
-        
-        # 玩耍动作
-        elif action.startswith("play_"):
-            if action.startswith("play_minigame_"):
-                # 返回迷你游戏启动指令
-                return action
-            
-            game_map = {
-                "play_normal": "普通玩耍",
-                "play_frisbee": "接飞盘",
-                "play_ball": "追球",
-                "play_rope": "拔河",
-                "play_puzzle": "智力游戏"
-            }
-            game_type = game_map.get(action)
-            if game_type:
-                self.display_message(self.dog.play(game_type))
-                self.current_animation = "play"
+        # 宠物动作（喂食、玩耍、训练等），与 Web 端共用同一个动作注册表
+        button = BUTTON_ACTIONS.get(action)
+        if button is not None:
+            name, params, animation = button
+            if name == "sleep":
+                params = dict(params, is_day=self.time_info["is_day"])
+            self.display_message(pet_actions.dispatch(name, self.dog, params))
+            if animation:
+                self.current_animation = animation
                 self.animation_frame = 0
                 self.animation_time = pygame.time.get_ticks()
-                return None
-        
-        # 训练动作
-        elif action.startswith("train_"):
-            skill_map = {
-                "train_sit": "坐下",
-                "train_handshake": "握手",
-                "train_roll": "打滚",
-                "train_frisbee": "接飞盘",
-                "train_fetch": "捡球",
-                "train_stay": "原地等待"
-            }
-            skill_name = skill_map.get(action)
-            if skill_name:
-                self.display_message(self.dog.train(skill_name))
-                return None
-        
-        # 其他动作
-        elif action == "bath":
-            self.display_message(self.dog.bath())
-            self.current_animation = "bath"
-            self.animation_frame = 0
-            self.animation_time = pygame.time.get_ticks()
-            return None
-        
-        elif action == "sleep":
-            self.display_message(self.dog.sleep(hours=8, is_day=self.time_info["is_day"]))
-            self.current_animation = "sleep"
-            self.animation_frame = 0
-            self.animation_time = pygame.time.get_ticks()
-            return None
-        
-        elif action == "pet":
-            self.display_message(self.dog.pet())
             return None
         
         # 将动作返回给游戏主循环
@@ -619,21 +577,12 @@ class UI:
     
     def update_time(self, time_info):
         """更新时间信息"""
+        changed = time_info["is_day"] != self.time_info.get("is_day")
         self.time_info = time_info
         
-        # 只有当没有加载背景图片时才使用纯色背景
-        if not isinstance(self.images.get("background_original"), pygame.Surface):
-            # 根据时间更新背景颜色
-            if time_info["is_day"]:
-                # 白天背景
-                self.colors["background"] = self.colors["day_bg"]
-            else:
-                # 夜晚背景
-                self.colors["background"] = self.colors["night_bg"]
-            
-            # 重新创建背景图像
-            self.images["background"] = pygame.Surface((self.width, self.height))
-            self.images["background"].fill(self.colors["background"])
+        # 日夜变化时换成对应的背景（已合成过的直接从缓存取出）
+        if changed:
+            self.update_environment(self.environment)
     
     def display_message(self, text, duration=3000):
         """显示消息"""
@@ -643,22 +592,29 @@ class UI:
             self.message_duration = duration  # 设置消息持续时间为3秒
     
     def update_environment(self, environment):
-        """更新环境信息"""
+        """更新环境信息（每帧调用，背景只在场景、季节、日夜或窗口尺寸变化时重新合成）"""
         self.environment = environment
         
+        key = (self.background_scene, environment["season"], self.time_info["is_day"], (self.width, self.height))
+        background = self.background_cache.get(key)
+        if background is None:
+            background = self.background_cache[key] = self.compose_background(*key)
+            if len(self.background_cache) > self.background_cache_size:
+                self.background_cache.popitem(last=False)
+        else:
+            self.background_cache.move_to_end(key)
+        self.images["background"] = background
+    
+    def compose_background(self, scene, season, is_day, size):
+        """合成一张背景：有背景图时缩放并叠加季节和夜晚滤镜，否则按季节和日夜混合出纯色背景"""
+        season_color = self.colors.get(f"{season}_color", (255, 255, 255))
+        
         # 如果没有背景图片，则使用纯色背景
-        if "background_original" not in self.images or not isinstance(self.images["background_original"], pygame.Surface):
-            # 根据季节调整背景色调
-            if self.time_info["is_day"]:
-                base_color = self.colors["day_bg"]
-            else:
-                base_color = self.colors["night_bg"]
-            
-            # 混合季节颜色
-            season_color = self.colors.get(f"{self.environment['season']}_color", (255, 255, 255))
+        if scene is None or not isinstance(self.images.get("background_original"), pygame.Surface):
+            base_color = self.colors["day_bg"] if is_day else self.colors["night_bg"]
             
             # 根据季节和日夜调整背景颜色
-            if self.time_info["is_day"]:
+            if is_day:
                 # 白天：季节色彩更明显
                 r = int(base_color[0] * 0.7 + season_color[0] * 0.3)
                 g = int(base_color[1] * 0.7 + season_color[1] * 0.3)
@@ -668,49 +624,52 @@ class UI:
                 r = int(base_color[0] * 0.9 + season_color[0] * 0.1)
                 g = int(base_color[1] * 0.9 + season_color[1] * 0.1)
                 b = int(base_color[2] * 0.9 + season_color[2] * 0.1)
-                
-            # 确保RGB值在0-255范围内
-            r = max(0, min(255, r))
-            g = max(0, min(255, g))
-            b = max(0, min(255, b))
             
-            # 更新背景颜色
-            self.colors["background"] = (r, g, b)
-            
-            # 重新创建背景图像
-            if "background" not in self.images:
-                self.images["background"] = pygame.Surface((self.width, self.height))
-            self.images["background"].fill(self.colors["background"])
+            # 确保RGB值在0-255范围内
+            self.colors["background"] = (max(0, min(255, r)), max(0, min(255, g)), max(0, min(255, b)))
+            bg_img = pygame.Surface(size)
+            bg_img.fill(self.colors["background"])
         else:
-            # 使用已加载的背景图片
-            # 复制原始背景以进行处理
-            bg_img = self.images["background_original"].copy()
-            bg_img = pygame.transform.scale(bg_img, (self.width, self.height))
+            # 缩放原始背景
+            bg_img = pygame.transform.scale(self.images["background_original"], size)
             
             # 添加季节色彩滤镜
-            season_color = self.colors.get(f"{self.environment['season']}_color", (255, 255, 255))
-            season_overlay = pygame.Surface((self.width, self.height), pygame.SRCALPHA)
-            
-            if self.time_info["is_day"]:
+            season_overlay = pygame.Surface(size, pygame.SRCALPHA)
+            if is_day:
                 # 白天：季节色彩轻微叠加
                 season_overlay.fill((season_color[0], season_color[1], season_color[2], 40))  # 透明度低
             else:
                 # 晚上：使背景变暗并添加轻微季节色彩
-                dark_overlay = pygame.Surface((self.width, self.height), pygame.SRCALPHA)
+                dark_overlay = pygame.Surface(size, pygame.SRCALPHA)
                 dark_overlay.fill((0, 0, 30, 150))  # 蓝色调的暗色覆盖层
                 bg_img.blit(dark_overlay, (0, 0))
                 season_overlay.fill((season_color[0], season_color[1], season_color[2], 20))  # 更低的透明度
-            
             bg_img.blit(season_overlay, (0, 0))
-            self.images["background"] = bg_img
+        
+        # 转成与屏幕相同的像素格式，每帧 blit 时不再逐像素转换
+        if pygame.display.get_surface() is not None:
+            bg_img = bg_img.convert()
+        return bg_img
+    
+    def update_frame(self):
+        """每帧绘制前更新动画、消息和宠物图像（整屏重绘和局部重绘共用，各绘制函数本身不改变状态）"""
+        self.frame_count += 1
+        self.update_animation()
+        if self.message and pygame.time.get_ticks() - self.message_time >= self.message_duration:
+            self.message = ""
+        self.dog_sprite = self.select_dog_sprite()
+        self.particles.update(self.environment["weather"], pygame.time.get_ticks() / 1000)
     
     def render(self):
-        """渲染界面"""
+        """渲染界面（整屏重绘）"""
+        self.update_frame()
+        
         # 绘制背景
         self.screen.blit(self.images["background"], (0, 0))
         
         # 绘制环境元素（天气和季节）
         self.render_environment()
+        self.render_weather()
         
         # 绘制时间信息
         self.render_time_info()
@@ -731,24 +690,61 @@ class UI:
         self.render_buttons()
         
         # 绘制消息
-        current_time = pygame.time.get_ticks()
-        if self.message and current_time - self.message_time < self.message_duration:
-            message_surf = self.font_medium.render(self.message, True, self.colors["text"])
-            message_rect = message_surf.get_rect(center=(self.width//2, 150))
+        self.render_message()
+    
+    def render_dirty(self):
+        """局部重绘：只重绘外观有变化的区域，返回需要推送到窗口的矩形"""
+        self.update_frame()
+        rects = self.regions.collect()
+        self.regions.redraw(self.screen, self.images["background"], rects)
+        return rects
+    
+    def setup_regions(self):
+        """登记局部重绘的区域（按绘制顺序），每个区域提供矩形、决定外观的状态和绘制函数"""
+        screen_rect = self.screen.get_rect()
+        self.regions.add("background", lambda: screen_rect, lambda: self.images["background"])
+        self.regions.add("environment", self.environment_bounds,
+                         lambda: (self.environment["weather"], self.environment["season"], self.time_info["is_day"]),
+                         self.render_environment)
+        # 雨、雪、云的粒子每帧都在移动（云只占画面上方的一条）
+        self.regions.add("weather", self.particles.bounds, lambda: self.particles.version, self.render_weather)
+        self.regions.add("time", self.time_info_bounds,
+                         lambda: (self.time_info["day"], self.time_info["hour"], self.time_info["minute"], self.time_info["is_day"]),
+                         self.render_time_info)
+        self.regions.add("dog", lambda: self.dog_sprite[1], lambda: self.dog_sprite[0], self.render_dog)
+        self.regions.add("toys", self.toys_bounds,
+                         lambda: tuple((toy["type"], tuple(toy["position"])) for toy in self.environment["toys"]),
+                         self.render_toys)
+        self.regions.add("status_bars", self.status_bars_bounds,
+                         lambda: tuple((int(value), int(value / 100 * 150)) for value in self.status_values()),
+                         self.render_status_bars)
+        self.regions.add("dog_info", self.dog_info_bounds,
+                         lambda: (self.dog.name, self.dog.breed, self.dog.personality, int(self.dog.age),
+                                  self.dog.growth_stage, int(self.dog.affection), tuple(self.dog.skills.items())),
+                         self.render_dog_info)
+        self.regions.add("buttons", self.buttons_bounds, self.buttons_state, self.render_buttons)
+        self.regions.add("message", lambda: self.message_box()[2] if self.message else None,
+                         lambda: self.message, self.render_message)
+    
+    def render_message(self):
+        """渲染消息框"""
+        if self.message:
+            message_surf, message_rect, box_rect = self.message_box()
             # 绘制消息背景
-            pygame.draw.rect(self.screen, (255, 255, 255, 200), 
-                            (message_rect.left - 10, message_rect.top - 5, 
-                             message_rect.width + 20, message_rect.height + 10))
-            pygame.draw.rect(self.screen, (100, 100, 100), 
-                            (message_rect.left - 10, message_rect.top - 5, 
-                             message_rect.width + 20, message_rect.height + 10), 2)
+            pygame.draw.rect(self.screen, (255, 255, 255, 200), box_rect)
+            pygame.draw.rect(self.screen, (100, 100, 100), box_rect, 2)
             self.screen.blit(message_surf, message_rect)
-        elif current_time - self.message_time >= self.message_duration:
-            self.message = ""
     
-    def render_environment(self):
-        """渲染环境元素"""
-        # 绘制天气和季节信息
+    def message_box(self):
+        """消息的 (文字, 文字位置, 背景框)"""
+        message_surf = render_text(self.font_medium, self.message, self.colors["text"])
+        message_rect = message_surf.get_rect(center=(self.width//2, 150))
+        box_rect = pygame.Rect(message_rect.left - 10, message_rect.top - 5,
+                               message_rect.width + 20, message_rect.height + 10)
+        return message_surf, message_rect, box_rect
+    
+    def environment_texts(self):
+        """天气和季节信息的 [(文字, 位置)]"""
         weather_names = {
             "sunny": "晴天",
             "rainy": "雨天",
@@ -766,71 +762,55 @@ class UI:
         weather_text = f"天气：{weather_names.get(self.environment['weather'], self.environment['weather'])}"
         season_text = f"季节：{season_names.get(self.environment['season'], self.environment['season'])}"
         
-        # 绘制天气信息
-        weather_surf = self.font_small.render(weather_text, True, (255, 255, 255) if not self.time_info["is_day"] else (50, 50, 50))
-        self.screen.blit(weather_surf, (20, 20))
-        
-        # 绘制季节信息
-        season_surf = self.font_small.render(season_text, True, (255, 255, 255) if not self.time_info["is_day"] else (50, 50, 50))
-        self.screen.blit(season_surf, (20, 40))
-        
-        # 根据天气添加实时效果
-        if self.environment["weather"] == "rainy":
-            # 绘制雨滴
-            for _ in range(100):
-                x = random.randint(0, self.width)
-                y = random.randint(0, self.height)
-                pygame.draw.line(self.screen, (200, 200, 255), 
-                                (x, y), (x - 5, y + 15), 1)
-        elif self.environment["weather"] == "cloudy":
-            # 绘制云朵
-            for _ in range(5):
-                x = random.randint(50, self.width - 100)
-                y = random.randint(50, 150)
-                cloud_color = (220, 220, 220)
-                # 创建一个带透明度的表面
-                cloud_surface = pygame.Surface((100, 60), pygame.SRCALPHA)
-                pygame.draw.circle(cloud_surface, cloud_color, (30, 30), 30)
-                pygame.draw.circle(cloud_surface, cloud_color, (50, 20), 25)
-                pygame.draw.circle(cloud_surface, cloud_color, (70, 30), 35)
-                # 调整整个表面的透明度
-                cloud_surface.set_alpha(180)
-                self.screen.blit(cloud_surface, (x, y))
-        elif self.environment["weather"] == "snowy":
-            # 绘制雪花
-            for _ in range(50):
-                x = random.randint(0, self.width)
-                y = random.randint(0, self.height)
-                pygame.draw.circle(self.screen, (255, 255, 255), (x, y), 2)
+        color = (255, 255, 255) if not self.time_info["is_day"] else (50, 50, 50)
+        return [(render_text(self.font_small, weather_text, color), (20, 20)),
+                (render_text(self.font_small, season_text, color), (20, 40))]
+    
+    def environment_bounds(self):
+        return pygame.Rect(0, 0, 0, 0).unionall([surf.get_rect(topleft=pos) for surf, pos in self.environment_texts()])
+    
+    def render_environment(self):
+        """渲染环境元素（天气和季节信息）"""
+        for surf, pos in self.environment_texts():
+            self.screen.blit(surf, pos)
+    
+    def render_weather(self):
+        """根据天气添加实时效果（雨、雪、云的粒子）"""
+        self.particles.render(self.screen)
+    
+    def toy_image(self, toy_type):
+        """玩具类型对应的图像"""
+        # 根据玩具类型选择图像
+        image = self.images.get(f"toy_{toy_type}")
+        if image is None:
+            # 如果没有对应图像，使用占位图形
+            image = self.images.get("toy_placeholder")
+            if image is None:
+                image = self.images["toy_placeholder"] = pygame.Surface((30, 30))
+                image.fill((255, 0, 0))
+        return image
+    
+    def toys_bounds(self):
+        rects = [self.toy_image(toy["type"]).get_rect(center=toy["position"]) for toy in self.environment["toys"]]
+        return rects[0].unionall(rects[1:]) if rects else None
     
     def render_toys(self):
         """渲染场景中的玩具"""
         for toy in self.environment["toys"]:
-            toy_type = toy["type"]
-            position = toy["position"]
-            
-            # 根据玩具类型选择图像
-            if toy_type == "ball" and "toy_ball" in self.images:
-                toy_image = self.images["toy_ball"]
-            elif toy_type == "frisbee" and "toy_frisbee" in self.images:
-                toy_image = self.images["toy_frisbee"]
-            elif toy_type == "rope" and "toy_rope" in self.images:
-                toy_image = self.images["toy_rope"]
-            elif toy_type == "puzzle" and "toy_puzzle" in self.images:
-                toy_image = self.images["toy_puzzle"]
-            else:
-                # 如果没有对应图像，创建一个占位图形
-                toy_image = pygame.Surface((30, 30))
-                toy_image.fill((255, 0, 0))
+            toy_image = self.toy_image(toy["type"])
             
             # 绘制玩具
-            toy_rect = toy_image.get_rect(center=position)
+            toy_rect = toy_image.get_rect(center=toy["position"])
             self.screen.blit(toy_image, toy_rect)
     
+    def time_info_bounds(self):
+        # 日夜图标（含光芒）从 width - 237 开始，文字从 (width - 200, 20) 开始
+        return pygame.Rect(self.width - 237, 8, 237, max(34, 12 + self.font_medium.get_linesize()))
+    
     def render_time_info(self):
         """渲染时间信息"""
         time_text = f"第 {self.time_info['day'] + 1} 天  {self.time_info['hour']:02d}:{self.time_info['minute']:02d}"
-        time_surf = self.font_medium.render(time_text, True, (255, 255, 255) if not self.time_info["is_day"] else (50, 50, 50))
+        time_surf = render_text(self.font_medium, time_text, (255, 255, 255) if not self.time_info["is_day"] else (50, 50, 50))
         self.screen.blit(time_surf, (self.width - 200, 20))
         
         # 绘制日夜图标
@@ -872,11 +852,8 @@ class UI:
         # 默认返回normal状态
         return "normal"
     
-    def render_dog(self):
-        """渲染宠物"""
-        # 更新动画
-        self.update_animation()
-        
+    def select_dog_sprite(self):
+        """当前帧宠物的 (图像, 位置)"""
         # 确定狗狗当前状态
         dog_state = self.determine_dog_state()
         
@@ -906,7 +883,19 @@ class UI:
         
         # 添加简单的动画效果
         dog_y_offset = math.sin(pygame.time.get_ticks() * 0.005) * 5  # 轻微上下浮动
-        self.screen.blit(dog_image, dog_image.get_rect(center=(self.width//2, 250 + dog_y_offset)))
+        return dog_image, dog_image.get_rect(center=(self.width//2, 250 + dog_y_offset))
+    
+    def render_dog(self):
+        """渲染宠物"""
+        dog_image, dog_rect = self.dog_sprite
+        self.screen.blit(dog_image, dog_rect)
+    
+    def status_values(self):
+        return (self.dog.hunger, self.dog.happiness, self.dog.health, self.dog.cleanliness, self.dog.energy)
+    
+    def status_bars_bounds(self):
+        # 名称、状态栏和数值（最多三位数）所占的范围
+        return pygame.Rect(30, 60, 255, 4 * 30 + max(15, self.font_small.get_linesize()))
     
     def render_status_bars(self):
         """渲染状态栏"""
@@ -926,9 +915,17 @@ class UI:
             {"name": "精力值", "value": self.dog.energy, "color": self.colors["energy_bar"]}
         ]
         
+        # 数值有变化时才重新渲染文字
+        if self.dog.take_dirty(STATUS_BAR_BITS) or self.status_bar_texts is None:
+            self.status_bar_texts = [
+                (render_text(self.font_small, bar["name"], self.colors["text"]),
+                 render_text(self.font_small, f"{int(bar['value'])}", self.colors["text"]))
+                for bar in status_bars
+            ]
+        
         for i, bar in enumerate(status_bars):
+            name_surf, value_surf = self.status_bar_texts[i]
             # 绘制状态名称
-            name_surf = self.font_small.render(bar["name"], True, self.colors["text"])
             self.screen.blit(name_surf, (start_x, start_y + i * bar_spacing))
             
             # 绘制状态栏背景
@@ -941,9 +938,15 @@ class UI:
             pygame.draw.rect(self.screen, bar["color"], bar_fill_rect)
             
             # 绘制状态值，略微向左移动数值位置
-            value_surf = self.font_small.render(f"{int(bar['value'])}", True, self.colors["text"])
             self.screen.blit(value_surf, (start_x + 60 + bar_width + 5, start_y + i * bar_spacing))
     
+    def dog_info_bounds(self):
+        # 信息和技能列表从 (620, 60) 开始，右侧到窗口边缘
+        bottom = 60 + 5 * 25 + self.font_small.get_linesize()
+        if self.dog.skills:
+            bottom = 60 + 6 * 25 + 10 + 25 + (len(self.dog.skills) - 1) * 22 + self.font_small.get_linesize()
+        return pygame.Rect(620, 60, self.width - 620, bottom - 60)
+    
     def render_dog_info(self):
         """渲染宠物信息"""
         # 宠物基本信息
@@ -960,28 +963,43 @@ class UI:
             {"name": "亲密度", "value": f"{int(self.dog.affection)}/100"}
         ]
         
-        for i, item in enumerate(info_items):
-            # 绘制信息名称
-            name_surf = self.font_small.render(f"{item['name']}:", True, self.colors["text"])
-            self.screen.blit(name_surf, (info_x, info_y + i * info_spacing))
+        # 信息有变化时才重新渲染文字
+        if self.dog.take_dirty(DOG_INFO_BITS) or self.dog_info_texts is None:
+            texts = []
+            for i, item in enumerate(info_items):
+                # 信息名称，信息值固定距离确保对齐
+                texts.append((render_text(self.font_small, f"{item['name']}:", self.colors["text"]),
+                              (info_x, info_y + i * info_spacing)))
+                texts.append((render_text(self.font_small, item["value"], self.colors["text"]),
+                              (info_x + 75, info_y + i * info_spacing)))
             
-            # 绘制信息值，固定距离确保对齐
-            value_surf = self.font_small.render(item["value"], True, self.colors["text"])
-            self.screen.blit(value_surf, (info_x + 75, info_y + i * info_spacing))
-        
-        # 绘制技能信息
-        if self.dog.skills:
-            # 技能标题位置
-            skill_y = info_y + len(info_items) * info_spacing + 10
-            skill_title = self.font_medium.render("已学技能:", True, self.colors["text"])
-            self.screen.blit(skill_title, (info_x, skill_y))
-            
-            # 绘制各技能信息，合理安排位置，更紧凑但不重叠
-            skill_spacing = 22  # 技能间距略小，更紧凑
-            for i, (skill_name, skill_level) in enumerate(self.dog.skills.items()):
-                skill_text = f"{skill_name} Lv.{skill_level}"
-                skill_surf = self.font_small.render(skill_text, True, self.colors["text"])
-                self.screen.blit(skill_surf, (info_x + 15, skill_y + 25 + i * skill_spacing))
+            # 技能信息
+            if self.dog.skills:
+                # 技能标题位置
+                skill_y = info_y + len(info_items) * info_spacing + 10
+                texts.append((render_text(self.font_medium, "已学技能:", self.colors["text"]), (info_x, skill_y)))
+                
+                # 各技能信息，合理安排位置，更紧凑但不重叠
+                skill_spacing = 22  # 技能间距略小，更紧凑
+                for i, (skill_name, skill_level) in enumerate(self.dog.skills.items()):
+                    skill_text = f"{skill_name} Lv.{skill_level}"
+                    texts.append((render_text(self.font_small, skill_text, self.colors["text"]),
+                                  (info_x + 15, skill_y + 25 + i * skill_spacing)))
+            self.dog_info_texts = texts
+        
+        for surf, pos in self.dog_info_texts:
+            self.screen.blit(surf, pos)
+    
+    def buttons_bounds(self):
+        rects = [button["rect"] for button in self.buttons.get(self.current_menu, [])]
+        return rects[0].unionall(rects[1:]) if rects else None
+    
+    def buttons_state(self):
+        """当前菜单和鼠标悬停的按钮"""
+        mouse_pos = pygame.mouse.get_pos()
+        hovered = next((i for i, button in enumerate(self.buttons.get(self.current_menu, []))
+                        if button["rect"].collidepoint(mouse_pos)), None)
+        return self.current_menu, hovered
     
     def render_buttons(self):
         """渲染按钮"""
@@ -997,7 +1015,7 @@ class UI:
             pygame.draw.rect(self.screen, (50, 50, 50), button["rect"], 2)  # 边框
             
             # 绘制按钮文字
-            text_surf = self.font_small.render(button["text"], True, self.colors["button_text"])
+            text_surf = render_text(self.font_small, button["text"], self.colors["button_text"])
             text_rect = text_surf.get_rect(center=button["rect"].center)
             self.screen.blit(text_surf, text_rect)
     
@@ -1007,6 +1025,14 @@ class UI:
         if scene_type not in ["home", "park", "garden", "shop"]:
             print(f"不支持的场景类型: {scene_type}")
             return
+        
+        # 已经加载过的场景直接使用缓存的原图
+        bg_img = self.scene_backgrounds.get(scene_type)
+        if bg_img is not None:
+            self.images["background_original"] = bg_img
+            self.background_scene = scene_type
+            self.update_environment(self.environment)
+            return
             
         # 构建背景图片路径
         bg_folder = os.path.join(os.path.dirname(__file__), "assets/images/backgrounds", scene_type)
@@ -1036,7 +1062,8 @@ class UI:
             bg_img = pygame.image.load(bg_path)
             # 保存原始背景图片
             self.images["background_original"] = bg_img
-            self.images["background"] = pygame.transform.scale(bg_img, (self.width, self.height))
+            self.scene_backgrounds[scene_type] = bg_img
+            self.background_scene = scene_type
             print(f"成功加载{scene_type}场景背景: {bg_file}")
             
             # 更新环境信息